@@ -0,0 +1,16 @@
+-- Publishes a notification on every DDL command so the application's schema cache
+-- (services/schema_catalog.py, refresh_mode="notify") can reload without a restart.
+CREATE OR REPLACE FUNCTION notify_schema_catalog_changed() RETURNS event_trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM pg_notify('schema_catalog_changed', tg_tag);
+END;
+$$;
+
+DROP EVENT TRIGGER IF EXISTS schema_catalog_changed_ddl;
+CREATE EVENT TRIGGER schema_catalog_changed_ddl ON ddl_command_end
+    EXECUTE FUNCTION notify_schema_catalog_changed();
+
+DROP EVENT TRIGGER IF EXISTS schema_catalog_changed_drop;
+CREATE EVENT TRIGGER schema_catalog_changed_drop ON sql_drop
+    EXECUTE FUNCTION notify_schema_catalog_changed();
@@ -19,7 +19,7 @@ CREATE TABLE orders (
     order_date DATE NOT NULL,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
-a compra CREATE TABLE order_items (
+CREATE TABLE order_items (
     id SERIAL PRIMARY KEY,
     order_id INTEGER REFERENCES orders(id),
     item_id INTEGER REFERENCES items(id),
@@ -2,15 +2,29 @@
 # File: agents/agent_factory.py
 # Description: Factory for creating and configuring all AI agents.
 
+import logging
+import os
+import time
+from typing import Any, Dict, Generator, Iterator, List
+
+import psycopg2
 from agno.agent import Agent
 from agno.models.groq import Groq
+from agno.run.response import RunResponseContentEvent, ToolCallCompletedEvent, ToolCallStartedEvent
 
 from tools.database_tools import (
     list_available_schemas,
     list_tables_in_schema,
     fetch_table_schema,
-    execute_sql_query
+    fetch_table_schemas,
+    execute_sql_query,
+    get_schema_catalog
 )
+from agents.model_cascade import cascade_stats, escalation_reason
+from config.memory import MEMORY_CONFIG
+from config.models import MODEL_TIERS_CONFIG
+from services.conversation_memory import ConversationMemory
+from services.tracing import isolated_context, metrics, tracer
 
 # --- Agent Configuration Constants ---
 
@@ -26,31 +40,58 @@ _DATA_ANALYST_INSTRUCTIONS = [
     "---",
     "### Workflow 1: Database Exploration",
     "**Use this workflow if the user asks to 'list tables', 'show schemas', or a similar discovery question.**",
-    "1. Your ONLY action is to call the single, most appropriate tool (`list_available_tables` or `list_available_schemas`).",
+    "1. Your ONLY action is to call the single, most appropriate tool (`list_tables_in_schema` or `list_available_schemas`).",
     "2. Your final answer MUST be the direct, unmodified output from that single tool call.",
     "---",
     "### Workflow 2: Data Querying",
     "**Use this workflow if the user asks for specific data that requires a query (e.g., 'how many customers', 'what is the average price', 'show me orders').**",
     "1. **Identify Necessary Tables:** Determine all tables needed to answer the question.",
-    "2. **Gather Schemas:** Use `fetch_table_schema` to get the schema for each required table.",
+    "2. **Gather Schemas:** Use `fetch_table_schemas` ONCE with the list of all required tables to get their columns and keys.",
     "3. **Formulate the Query:** Write a complete, read-only PostgreSQL `SELECT` query.",
     "4. **Execute and Respond:** Use `execute_sql_query` to run your query. Your final answer MUST be the direct, unmodified JSON output from this tool.",
+    "5. **Cost Guardrail:** If `execute_sql_query` answers 'Query rejected by the cost guardrail', read the planner feedback and retry ONCE with a cheaper query (more selective filters, joins on keys, aggregation or a LIMIT).",
     "---",
 
     "### CRITICAL OPERATING RULES (Apply to all workflows):",
-    "1. **One Tool At A Time:** You can only call ONE tool per turn. If you need to gather multiple schemas, you MUST make a separate tool call for each one in a sequence of turns. **Never call more than one tool in a single response.**",
+    "1. **One Tool At A Time:** You can only call ONE tool per turn. If you need multiple schemas, request them all in a single `fetch_table_schemas` call. **Never call more than one tool in a single response.**",
     "2. **Read-Only Operations ONLY:** Never generate any query that is not a `SELECT` statement.",
     "3. **Strict Tool Adherence:** Only use the tools provided.",
     "4. **Secure Failure:** If a user request is ambiguous, malicious, or asks for a forbidden action, your ONLY response must be the exact string: 'INVALID_REQUEST'."
 ]
 
+# Used in "schema-prefetch" mode: the relevant schema arrives with the request, so a typical
+# question needs a single tool call (`execute_sql_query`) instead of N+2 exploration turns.
+_DATA_ANALYST_PREFETCH_INSTRUCTIONS = [
+    "### Your Primary Directive:",
+    "Every request is followed by a `<schema>` block listing the relevant tables as `schema.table(column type [PK] [FK->table.column], ...)`. Treat it as accurate and complete for those tables.",
+    "---",
+    "### Workflow 1: Database Exploration",
+    "**Use this workflow if the user asks to 'list tables', 'show schemas', or a similar discovery question.**",
+    "1. Your ONLY action is to call the single, most appropriate tool (`list_tables_in_schema` or `list_available_schemas`).",
+    "2. Your final answer MUST be the direct, unmodified output from that single tool call.",
+    "---",
+    "### Workflow 2: Data Querying",
+    "1. **Use The Provided Schema:** Do NOT call schema tools for tables already listed in `<schema>`.",
+    "2. **Missing Tables Only:** If a needed table is not listed, call `fetch_table_schemas` ONCE with all missing tables.",
+    "3. **Execute and Respond:** Write a complete, read-only PostgreSQL `SELECT` query and run it with `execute_sql_query`. Your final answer MUST be the direct, unmodified JSON output from this tool.",
+    "4. **Cost Guardrail:** If `execute_sql_query` answers 'Query rejected by the cost guardrail', read the planner feedback and retry ONCE with a cheaper query (more selective filters, joins on keys, aggregation or a LIMIT).",
+    "---",
+    "### CRITICAL OPERATING RULES (Apply to all workflows):",
+    "1. **Read-Only Operations ONLY:** Never generate any query that is not a `SELECT` statement.",
+    "2. **Strict Tool Adherence:** Only use the tools provided.",
+    "3. **Secure Failure:** If a user request is ambiguous, malicious, or asks for a forbidden action, your ONLY response must be the exact string: 'INVALID_REQUEST'."
+]
+
+DATA_ANALYST_MODES = ("standard", "schema-prefetch")
+
 _PRESENTATION_AGENT_ROLE = "You are a helpful assistant who explains data to users in a clear and friendly way."
 
 _PRESENTATION_AGENT_INSTRUCTIONS = [
     "You will be given a JSON object containing data and the user's original question.",
+    "The data is either the full result, as `{\"columns\": [...], \"rows\": [[...], ...]}` with one array per row in column order, or, for large results, a `summary` with the total `row_count`, per-column aggregates (`min`, `max`, `mean`, `sum`, or the most frequent `top` values) and the first rows as `sample`. Use the aggregates for totals and ranges instead of adding up the sample.",
     "Your task is to answer the user's question in a single, natural, and helpful sentence, using the provided data.",
     "Do not show the raw JSON. Just provide the conversational answer.",
-    "For example, if the data is `[{\"count\": 5}]` and the question was 'how many items are there?', a good response would be: 'There are a total of 5 items.'"
+    "For example, if the data is `{\"columns\": [\"count\"], \"rows\": [[5]]}` and the question was 'how many items are there?', a good response would be: 'There are a total of 5 items.'"
 ]
 
 _RAG_DOCS_AGENT_ROLE = "You are a helpful and friendly document assistant."
@@ -63,29 +104,273 @@ _RAG_DOCS_AGENT_INSTRUCTIONS = [
 ]
 
 
+def count_model_turns(run_response: Any) -> int:
+    """Counts the model calls (assistant messages) made during a single agent run."""
+    return sum(1 for message in (run_response.messages or [])
+               if message.role == "assistant" and not getattr(message, "from_history", False))
+
+
+def conversation_scope(agent: Any) -> str | None:
+    """The agent's session id once it has earlier runs (which a follow-up request may refer to), else ``None``."""
+    runs = getattr(getattr(agent, "memory", None), "runs", None)
+    if isinstance(runs, dict):
+        runs = runs.get(agent.session_id)
+    return (agent.session_id or str(id(agent))) if runs else None
+
+
+def extract_executed_sql(run_response: Any) -> str | None:
+    """Returns the last query the agent ran through ``execute_sql_query`` in this run, if any."""
+    for execution in reversed(run_response.tools or []):
+        if execution.tool_name == "execute_sql_query" and not execution.tool_call_error:
+            return (execution.tool_args or {}).get("query")
+    return None
+
+
+def _sum_metric(value: Any) -> int:
+    """agno reports token metrics either as a number or as one value per model call."""
+    if isinstance(value, list):
+        return sum(v for v in value if isinstance(v, (int, float)))
+    return value if isinstance(value, (int, float)) else 0
+
+
+def _annotate_run(span: Any, run_response: Any) -> None:
+    metrics = getattr(run_response, "metrics", None) or {}
+    span.set(input_tokens=_sum_metric(metrics.get("input_tokens")),
+             output_tokens=_sum_metric(metrics.get("output_tokens")),
+             model_turns=count_model_turns(run_response),
+             tool_calls=len(getattr(run_response, "tools", None) or []))
+
+
+def run_with_events(agent: Agent, message: Any, stream: bool = False,
+                    emit_tokens: bool = True) -> Generator[Dict[str, Any], None, Any]:
+    """Runs ``agent`` and returns its ``RunResponse`` (use with ``yield from``).
+
+    When ``stream`` is true, the run is streamed and its progress is yielded as events:
+    ``{"type": "token", "text": ...}`` for answer text (unless ``emit_tokens`` is false, e.g.
+    for the data agent's raw JSON), and ``{"type": "tool_started" | "tool_completed",
+    "tool": ..., "args": ...}`` around every tool call. Otherwise nothing is yielded.
+    """
+    if not stream:
+        return agent.run(message)
+    for event in agent.run(message, stream=True, stream_intermediate_steps=True):
+        if isinstance(event, RunResponseContentEvent):
+            if emit_tokens and isinstance(event.content, str) and event.content:
+                yield {"type": "token", "text": event.content}
+        elif isinstance(event, (ToolCallStartedEvent, ToolCallCompletedEvent)) and event.tool is not None:
+            completed = isinstance(event, ToolCallCompletedEvent)
+            yield {"type": "tool_completed" if completed else "tool_started",
+                   "tool": event.tool.tool_name, "args": event.tool.tool_args or {},
+                   "error": bool(event.tool.tool_call_error) if completed else False}
+    return agent.run_response
+
+
+class TracedAgent(Agent):
+    """An agent whose runs are recorded as ``agent.<name>`` spans with token counts.
+
+    Streamed runs keep the span open until the stream is consumed and record the
+    ``time_to_first_token`` of the answer. With a ``conversation_memory``, the history agno adds to
+    each run is compacted by it first.
+
+    With ``tiers`` (models, smallest first) every run is a cascade: each model runs the request
+    in turn until :func:`escalation_reason` accepts the result, and the last one's result is
+    returned as is. Rejected attempts are dropped from the agent's memory, and every attempt
+    is counted in ``cascade_stats``. A streamed cascade also yields the events of the rejected
+    attempts, so it suits agents whose answer tokens are not shown (the data analyst).
+    """
+
+    conversation_memory: ConversationMemory | None = None
+    tiers: List[Any] | None = None
+    escalate_on_empty: bool = False
+
+    def get_run_messages(self, **kwargs: Any) -> Any:
+        run_messages = super().get_run_messages(**kwargs)
+        if self.conversation_memory is not None:
+            self.conversation_memory.compact(run_messages)
+        return run_messages
+
+    def run(self, message: Any = None, **kwargs: Any) -> Any:
+        # agno remembers the last ``stream`` flag on the agent; passing it explicitly keeps one
+        # streamed run from turning later plain ``run()`` calls into streams.
+        kwargs["stream"] = bool(kwargs.get("stream"))
+        if self.tiers:
+            return self._cascade_stream(message, **kwargs) if kwargs["stream"] else \
+                self._cascade(message, **kwargs)
+        return self._run_model(message, **kwargs)
+
+    def _run_model(self, message: Any, **kwargs: Any) -> Any:
+        if kwargs["stream"]:
+            return self._traced_stream(message, **kwargs)
+        with tracer.span(f"agent.{self.name}", model=self.model.id) as span:
+            response = super().run(message, **kwargs)
+            _annotate_run(span, response)
+            return response
+
+    # --- Model cascade -------------------------------------------------------
+
+    def _forget_run(self, run_response: Any) -> None:
+        """Removes a rejected attempt from agno's memory so later runs do not see it as history."""
+        runs = getattr(self.memory, "runs", None)
+        if isinstance(runs, dict):
+            session_runs = runs.get(self.session_id) or []
+            runs[self.session_id] = [run for run in session_runs if run.run_id != run_response.run_id]
+
+    def _judge(self, number: int, started: float, response: Any, error: Exception | None) -> bool:
+        """Records an attempt; returns whether the cascade should stop with it."""
+        last = number == len(self.tiers)
+        reason = "error" if error is not None else escalation_reason(response, self.escalate_on_empty)
+        cascade_stats.record(self.model.id, time.perf_counter() - started, reason,
+                             escalated=not last and reason is not None)
+        if reason is None or last:
+            return True
+        logging.info(f"{self.model.id} answer rejected ({reason}); escalating to {self.tiers[number].id}.")
+        if response is not None:
+            self._forget_run(response)
+        return False
+
+    def _cascade(self, message: Any, **kwargs: Any) -> Any:
+        with tracer.span(f"cascade.{self.name}", tiers=len(self.tiers)) as span:
+            for number, model in enumerate(self.tiers, 1):
+                self.model, started, response, error = model, time.perf_counter(), None, None
+                try:
+                    response = self._run_model(message, **kwargs)
+                except Exception as e:
+                    if number == len(self.tiers):
+                        raise
+                    error = e
+                if self._judge(number, started, response, error):
+                    span.set(tier=number, model=model.id)
+                    return response
+
+    @isolated_context
+    def _cascade_stream(self, message: Any, **kwargs: Any) -> Iterator[Any]:
+        with tracer.span(f"cascade.{self.name}", tiers=len(self.tiers), stream=True) as span:
+            for number, model in enumerate(self.tiers, 1):
+                self.model, started, response, error = model, time.perf_counter(), None, None
+                try:
+                    yield from self._traced_stream(message, **kwargs)
+                    response = self.run_response
+                except Exception as e:
+                    if number == len(self.tiers):
+                        raise
+                    error = e
+                if self._judge(number, started, response, error):
+                    span.set(tier=number, model=model.id)
+                    return
+
+    async def _acascade(self, message: Any, **kwargs: Any) -> Any:
+        with tracer.span(f"cascade.{self.name}", tiers=len(self.tiers)) as span:
+            for number, model in enumerate(self.tiers, 1):
+                self.model, started, response, error = model, time.perf_counter(), None, None
+                try:
+                    response = await self._arun_model(message, **kwargs)
+                except Exception as e:
+                    if number == len(self.tiers):
+                        raise
+                    error = e
+                if self._judge(number, started, response, error):
+                    span.set(tier=number, model=model.id)
+                    return response
+
+    @isolated_context
+    def _traced_stream(self, message: Any, **kwargs: Any) -> Iterator[Any]:
+        with tracer.span(f"agent.{self.name}", model=self.model.id, stream=True) as span:
+            for event in super().run(message, **kwargs):
+                if isinstance(event, RunResponseContentEvent) and event.content:
+                    span.mark("time_to_first_token")
+                yield event
+            if self.run_response is not None:
+                _annotate_run(span, self.run_response)
+
+    async def arun(self, message: Any = None, **kwargs: Any) -> Any:
+        kwargs["stream"] = bool(kwargs.get("stream"))
+        if self.tiers and not kwargs["stream"]:
+            return await self._acascade(message, **kwargs)
+        return await self._arun_model(message, **kwargs)
+
+    async def _arun_model(self, message: Any, **kwargs: Any) -> Any:
+        with tracer.span(f"agent.{self.name}", model=self.model.id) as span:
+            response = await super().arun(message, **kwargs)
+            if not kwargs.get("stream"):
+                _annotate_run(span, response)
+            return response
+
+
+class SchemaPrefetchAgent(TracedAgent):
+    """An agent that receives a compact summary of the relevant schema with every request."""
+
+    def _with_schema(self, message: Any) -> Any:
+        if not isinstance(message, str):
+            return message
+        try:
+            with tracer.span("schema.prefetch") as span:
+                summary = get_schema_catalog().relevant_schema_summary(message)
+                span.set(bytes=len(summary))
+        except psycopg2.Error as e:
+            logging.warning(
+                f"Schema prefetch failed, continuing without it: {e}")
+            return message
+        return f"{message}\n\n<schema>\n{summary}\n</schema>"
+
+    def run(self, message: Any = None, **kwargs: Any) -> Any:
+        return super().run(self._with_schema(message), **kwargs)
+
+    async def arun(self, message: Any = None, **kwargs: Any) -> Any:
+        return await super().arun(self._with_schema(message), **kwargs)
+
+
 class AgentFactory:
     """Encapsulates the logic for creating different types of agents."""
 
-    def create_data_analyst_agent(self) -> Agent:
-        """Builds the autonomous database analyst agent."""
-        return Agent(
+    def create_data_analyst_agent(self, mode: str | None = None, tiers: List[str] | None = None) -> Agent:
+        """Builds the autonomous database analyst agent.
+
+        ``mode`` is ``"standard"`` (explore the schema with tools) or ``"schema-prefetch"``
+        (inject the relevant schema up front). Defaults to the ``DATA_ANALYST_MODE``
+        environment variable, then ``"standard"``.
+
+        ``tiers`` are the Groq model ids the agent cascades through, smallest first
+        (default: ``MODEL_TIERS_CONFIG["data_analyst_tiers"]``); a single id disables the cascade.
+        """
+        mode = mode or os.getenv("DATA_ANALYST_MODE", "standard")
+        if mode not in DATA_ANALYST_MODES:
+            raise ValueError(
+                f"Unknown data analyst mode '{mode}'. Expected one of {DATA_ANALYST_MODES}.")
+        tiers = tiers or MODEL_TIERS_CONFIG["data_analyst_tiers"]
+        models = [Groq(id=model_id) for model_id in tiers]
+
+        prefetch = mode == "schema-prefetch"
+        agent_class = SchemaPrefetchAgent if prefetch else TracedAgent
+        managed = MEMORY_CONFIG["enabled"]
+        agent = agent_class(
             name="Autonomous_DB_Analyst_Agent",
             role=_DATA_ANALYST_ROLE,
-            model=Groq(id="llama3-70b-8192"),
+            model=models[-1],
             tools=[
                 list_available_schemas,
                 list_tables_in_schema,
                 fetch_table_schema,
+                fetch_table_schemas,
                 execute_sql_query
             ],
-            instructions=_DATA_ANALYST_INSTRUCTIONS,
+            instructions=_DATA_ANALYST_PREFETCH_INSTRUCTIONS if prefetch else _DATA_ANALYST_INSTRUCTIONS,
             add_history_to_messages=True,
-            num_history_responses=5,
+            num_history_responses=MEMORY_CONFIG["history_runs"] if managed else 5,
         )
+        if len(models) > 1:
+            agent.tiers = models
+            agent.escalate_on_empty = MODEL_TIERS_CONFIG["escalate_on_empty_result"]
+        if managed:
+            agent.conversation_memory = ConversationMemory(
+                recent_turns=MEMORY_CONFIG["recent_turns"],
+                answer_chars=MEMORY_CONFIG["answer_chars"],
+                summary_tokens=MEMORY_CONFIG["summary_tokens"],
+                max_prompt_tokens=MEMORY_CONFIG["max_prompt_tokens"],
+            )
+        return agent
 
     def create_presentation_agent(self) -> Agent:
         """Builds the agent responsible for user-friendly responses."""
-        return Agent(
+        return TracedAgent(
             name="Presentation_Agent",
             role=_PRESENTATION_AGENT_ROLE,
             model=Groq(id="llama3-8b-8192"),
@@ -95,7 +380,7 @@ class AgentFactory:
 
     def create_rag_docs_agent(self) -> Agent:
         """Builds the agent that answers questions based on document context."""
-        return Agent(
+        return TracedAgent(
             name="RAG_DOCS_Agent",
             role=_RAG_DOCS_AGENT_ROLE,
             model=Groq(id="llama3-8b-8192"),
@@ -106,3 +391,4 @@ class AgentFactory:
 
 # Create a single, reusable instance of the factory.
 agent_factory = AgentFactory()
+metrics.register_collector("model_tiers", cascade_stats.stats)
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+# File: agents/model_cascade.py
+# Description: Acceptance checks and per-tier statistics for data analyst runs that cascade from a small
+#              model to a larger one.
+
+import re
+import threading
+from typing import Any, Dict
+
+from services.result_set import ResultSet, is_error_result
+
+# Tools that answer from the schema catalog; a run that only used these needs no SQL.
+_CATALOG_TOOLS = frozenset({"list_available_schemas", "list_tables_in_schema",
+                            "fetch_table_schema", "fetch_table_schemas"})
+
+
+def escalation_reason(run_response: Any, escalate_on_empty: bool = False) -> str | None:
+    """Why a data analyst run should be retried on a larger model, or ``None`` to accept it.
+
+    The answer is only trusted when it is backed by the database: the last SQL the agent
+    executed must have succeeded (the query ran through ``execute_sql_query``, so it was
+    validated by the planner and the guardrails), and with ``escalate_on_empty`` it must
+    have returned rows. Runs that only inspected the catalog are accepted unless they
+    return rows that no query produced.
+    """
+    content = run_response.content
+    text = content.strip() if isinstance(content, str) else content
+    if not text:
+        return "empty_answer"
+    if text == "INVALID_REQUEST":
+        return "invalid_request"
+
+    tools = run_response.tools or []
+    queries = [tool for tool in tools if tool.tool_name == "execute_sql_query"]
+    if not queries:
+        catalog_only = any(tool.tool_name in _CATALOG_TOOLS and not tool.tool_call_error for tool in tools)
+        return None if catalog_only and ResultSet.from_payload(content) is None else "no_query"
+
+    last = queries[-1]
+    if last.tool_call_error or is_error_result(last.result):
+        return "sql_error"
+    if escalate_on_empty:
+        table = ResultSet.from_payload(last.result)
+        if table is not None and len(table) == 0:
+            return "empty_result"
+    return None
+
+
+class CascadeStats:
+    """Thread-safe attempt, acceptance and latency counters per model tier, plus escalation reasons."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tiers: Dict[str, Dict[str, float]] = {}
+        self._escalations: Dict[str, int] = {}
+
+    def record(self, model_id: str, seconds: float, reason: str | None, escalated: bool) -> None:
+        """Records one attempt; ``reason`` is why it was rejected (``None`` when accepted)."""
+        with self._lock:
+            tier = self._tiers.setdefault(model_id, {"attempts": 0, "accepted": 0, "seconds": 0.0})
+            tier["attempts"] += 1
+            tier["accepted"] += reason is None
+            tier["seconds"] += seconds
+            if escalated:
+                self._escalations[reason] = self._escalations.get(reason, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Flat numeric values, e.g. ``llama3_8b_8192_success_rate`` and ``escalated_sql_error``."""
+        with self._lock:
+            stats: Dict[str, Any] = {"escalations": sum(self._escalations.values())}
+            for model_id, tier in self._tiers.items():
+                key = re.sub(r"\W+", "_", model_id)
+                stats[f"{key}_attempts"] = tier["attempts"]
+                stats[f"{key}_accepted"] = tier["accepted"]
+                stats[f"{key}_success_rate"] = tier["accepted"] / tier["attempts"]
+                stats[f"{key}_avg_seconds"] = tier["seconds"] / tier["attempts"]
+            stats.update({f"escalated_{reason}": count for reason, count in self._escalations.items()})
+        return stats
+
+    def tiers(self) -> Dict[str, Dict[str, float]]:
+        """Per-model counters, keyed by the model id."""
+        with self._lock:
+            return {model_id: dict(tier) for model_id, tier in self._tiers.items()}
+
+
+# Shared by every data analyst agent, so agents created per request still add up.
+cascade_stats = CascadeStats()
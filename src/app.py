@@ -5,12 +5,38 @@
 import streamlit as st
 from dotenv import load_dotenv
 import json
-import pandas as pd
-from typing import Any
+import logging
+import time
+from typing import Any, Dict, Iterator
 
-from agents.agent_factory import agent_factory
+from agents.agent_factory import agent_factory, conversation_scope, count_model_turns, run_with_events
+from config.observability import TRACING_CONFIG
+from config.routing import ROUTER_CONFIG
 from services.rag_service import RAGService
-from main import JsonDecimalEncoder  # Reusing the custom encoder
+from main import (JsonDecimalEncoder, build_presentation_prompt, build_response_cache, fast_path_answer,  # Reusing the orchestrator helpers
+                  remember_response, render_answer, text_event)
+from services.answer_renderer import AnswerRenderer
+from services.fast_path import FastPath
+from services.resources import registry
+from services.response_cache import ResponseCache
+from services.result_set import ResultSet
+from services.router import RequestRouter, build_request_router
+from services.tracing import isolated_context, metrics, tracer
+
+# The app's cache also matches near-duplicate questions with the shared embedding model.
+registry.register("response_cache", lambda: build_response_cache(
+    embedding_model=registry.get("embedding_model")))
+
+
+def _create_request_router() -> RequestRouter:
+    from tools.database_tools import get_schema_catalog
+    router = build_request_router(embedding_model=registry.get("embedding_model"),
+                                  catalog=lambda: get_schema_catalog().snapshot())
+    metrics.register_collector("router", router.stats)
+    return router
+
+
+registry.register("request_router", _create_request_router)
 
 
 class ChatUI:
@@ -40,11 +66,33 @@ class ChatUI:
                     return
 
                 with st.spinner("Processing documents..."):
-                    raw_text = rag_service.extract_text_from_pdfs(pdf_docs)
-                    text_chunks = rag_service.get_text_chunks(raw_text)
-                    st.session_state.vector_store = rag_service.create_vector_store(
-                        text_chunks)
-                    st.success("Documents processed successfully!")
+                    # Already indexed PDFs (same content hash) are skipped; new ones are appended.
+                    try:
+                        st.session_state.vector_store = rag_service.index_documents(
+                            pdf_docs)
+                        st.success("Documents processed successfully!")
+                    except Exception as e:
+                        st.session_state.vector_store = rag_service.document_index
+                        st.error(f"Could not process the documents: {e}")
+
+            self._show_indexed_documents(rag_service)
+
+    def _show_indexed_documents(self, rag_service: RAGService):
+        """Lists the persisted documents with a delete button, plus index compaction."""
+        index = rag_service.document_index
+        documents = index.live_documents()
+        if not documents:
+            return
+        st.subheader("Indexed Documents")
+        for content_hash, entry in documents.items():
+            col_name, col_delete = st.columns([4, 1])
+            col_name.write(entry["name"])
+            if col_delete.button("Delete", key=f"delete_{content_hash}"):
+                index.delete_document(content_hash)
+                st.rerun()
+        if len(documents) < len(index.registry) and st.button("Compact Index"):
+            index.compact()
+            st.rerun()
 
     def display_chat_history(self):
         """Displays the entire chat history from the session state."""
@@ -62,13 +110,18 @@ class ChatUI:
 class AppController:
     """Handles the core application logic, including routing and agent orchestration."""
 
-    def __init__(self, data_agent, presentation_agent, rag_agent, rag_service):
+    def __init__(self, data_agent, presentation_agent, rag_agent, rag_service,
+                 response_cache: ResponseCache | None = None, router: RequestRouter | None = None,
+                 fast_path: FastPath | None = None, answer_renderer: AnswerRenderer | None = None):
         self.data_agent = data_agent
         self.presentation_agent = presentation_agent
         self.rag_agent = rag_agent
         self.rag_service = rag_service
-        self.db_keywords = ['table', 'database', 'sql',
-                            'customer', 'order', 'item', 'schema']
+        self.response_cache = response_cache
+        self.fast_path = fast_path
+        self.answer_renderer = answer_renderer
+        # Without an embedding model the router falls back to its keyword classifier.
+        self.router = router or build_request_router()
 
     def _format_response(self, raw_data: Any) -> str:
         """Intelligently formats the raw data from the agent into a displayable string."""
@@ -76,53 +129,121 @@ class AppController:
             return raw_data
         if isinstance(raw_data, list) and all(isinstance(i, str) for i in raw_data):
             return "Here are the results I found:\n\n" + "\n".join([f"- `{item}`" for item in raw_data])
-        if isinstance(raw_data, list) and raw_data and isinstance(raw_data[0], dict):
-            df = pd.DataFrame(raw_data)
-            return "Here are the results I found:\n\n" + df.to_markdown(index=False)
+        table = ResultSet.from_payload(raw_data)
+        if table is not None:
+            return self._format_table(table)
 
         # Fallback for any other data type
         return f"```json\n{json.dumps(raw_data, indent=2, cls=JsonDecimalEncoder, ensure_ascii=False)}\n```"
 
-    def _handle_database_request(self, prompt: str) -> str:
-        """Orchestrates the database agent and presentation agent."""
-        with st.spinner("Analyzing your question and querying the database..."):
-            # The orchestrator from main.py is no longer needed here.
-            # We directly call the agents.
-            data_response = self.data_agent.run(prompt)
+    @staticmethod
+    def _format_table(table: ResultSet) -> str:
+        """A markdown table of the result, noting when it was truncated."""
+        if table.truncated:
+            total = table.total_estimate
+            note = f" (showing the first {len(table)} of ~{total} rows)" if total else \
+                f" (showing the first {len(table)} rows)"
+        else:
+            note = ""
+        return f"Here are the results I found{note}:\n\n" + table.to_markdown()
+
+    def _database_events(self, prompt: str, stream: bool) -> Iterator[Dict[str, Any]]:
+        """Orchestrates the database agent and presentation agent, yielding stream events."""
+        # Follow-ups may refer to earlier turns, so they are cached for this conversation only.
+        scope = conversation_scope(self.data_agent)
+        cached = self.response_cache.get(
+            prompt, scope) if self.response_cache else None
+        fast = None if cached else fast_path_answer(self.fast_path, self.response_cache, prompt, scope)
+        if cached:
+            logging.info(
+                f"Response cache hit ({cached['source']}); skipping the Data Analyst Agent.")
+            raw_data = cached["data"]
+        elif fast is not None:
+            raw_data = fast.data
+        else:
+            started = time.perf_counter()
+            data_response = yield from run_with_events(self.data_agent, prompt, stream, emit_tokens=False)
             raw_data = data_response.content
+            model_turns = count_model_turns(data_response)
+            logging.info(
+                f"Data Analyst Agent finished in {model_turns} model turn(s).")
+            if self.fast_path is not None:
+                self.fast_path.record_agent(time.perf_counter() - started, model_turns)
+            if self.response_cache:
+                remember_response(self.response_cache,
+                                  prompt, data_response, scope)
+
+        if raw_data == "INVALID_REQUEST":
+            yield text_event("The request was deemed invalid by the data agent.")
+        elif "json" in prompt.lower():
+            yield text_event(self._format_response(raw_data))
+        elif cached and cached["answer"]:
+            yield text_event(cached["answer"])
+        elif (answer := render_answer(self.answer_renderer, raw_data, prompt)) is not None:
+            yield text_event(answer)
+            if self.response_cache:
+                self.response_cache.set_answer(prompt, answer, scope)
+        else:
+            # Show the table right away; the presentation agent's summary streams in below it.
+            # The agent's content is JSON text, so it is parsed rather than shown as is.
+            table = ResultSet.from_payload(raw_data)
+            table = self._format_table(table) + "\n\n" if table is not None else ""
+            if table:
+                yield text_event(table)
+            presentation_prompt = build_presentation_prompt(
+                raw_data, prompt)
+            presentation_response = yield from run_with_events(
+                self.presentation_agent, presentation_prompt, stream)
+            if not stream:
+                yield text_event(presentation_response.content)
+            if self.response_cache:
+                self.response_cache.set_answer(
+                    prompt, table + presentation_response.content, scope)
 
-            if raw_data == "INVALID_REQUEST":
-                return "The request was deemed invalid by the data agent."
-
-            if "json" in prompt.lower():
-                return self._format_response(raw_data)
-            else:
-                presentation_prompt = (
-                    f"Here is the data: {json.dumps(raw_data, cls=JsonDecimalEncoder)}\n\n"
-                    f"Based on this data, please answer the user's original question: '{prompt}'"
-                )
-                presentation_response = self.presentation_agent.run(
-                    presentation_prompt)
-                return presentation_response.content
-
-    def _handle_rag_request(self, prompt: str) -> str:
-        """Handles a request for document analysis."""
+    def _rag_events(self, prompt: str, stream: bool) -> Iterator[Dict[str, Any]]:
+        """Handles a request for document analysis, yielding stream events."""
         if not st.session_state.get("vector_store"):
-            return "Please upload and process documents before asking questions about them."
+            yield text_event("Please upload and process documents before asking questions about them.")
+            return
+
+        context = self.rag_service.get_context_from_query(
+            st.session_state.vector_store, prompt)
+        rag_prompt = f"Context:\n{context}\n\nQuestion: {prompt}"
+        rag_response = yield from run_with_events(self.rag_agent, rag_prompt, stream)
+        if not stream:
+            yield text_event(rag_response.content)
 
-        with st.spinner("Searching documents..."):
-            context = self.rag_service.get_context_from_query(
-                st.session_state.vector_store, prompt)
-            rag_prompt = f"Context:\n{context}\n\nQuestion: {prompt}"
-            rag_response = self.rag_agent.run(rag_prompt)
-            return rag_response.content
+    def _events(self, route: str, prompt: str, stream: bool) -> Iterator[Dict[str, Any]]:
+        if route == "database":
+            return self._database_events(prompt, stream)
+        if route == "documents":
+            return self._rag_events(prompt, stream)
+        return iter([text_event(ROUTER_CONFIG["small_talk_reply"])])
+
+    def _route(self, span, prompt: str) -> str:
+        decision = self.router.route(prompt)
+        span.set(route=decision.route, route_method=decision.method,
+                 route_confidence=round(decision.confidence, 3))
+        return decision.route
 
     def handle_prompt(self, prompt: str) -> str:
         """Routes the user prompt to the correct handler and returns the final response."""
-        if any(keyword in prompt.lower() for keyword in self.db_keywords):
-            return self._handle_database_request(prompt)
-        else:
-            return self._handle_rag_request(prompt)
+        with tracer.span("app.handle_prompt", profile=True, request_chars=len(prompt)) as span:
+            route = self._route(span, prompt)
+            spinner = "Searching documents..." if route == "documents" \
+                else "Analyzing your question and querying the database..."
+            with st.spinner(spinner):
+                events = self._events(route, prompt, stream=False)
+                return "".join(event["text"] for event in events if event["type"] == "token")
+
+    @isolated_context
+    def stream_prompt(self, prompt: str) -> Iterator[Dict[str, Any]]:
+        """Like :meth:`handle_prompt`, but yields tool events and answer tokens as they happen."""
+        with tracer.span("app.handle_prompt", profile=True, request_chars=len(prompt), stream=True) as span:
+            for event in self._events(self._route(span, prompt), prompt, stream=True):
+                if event["type"] == "token":
+                    span.mark("time_to_first_token")
+                yield event
 
 
 class ChatApplication:
@@ -131,17 +252,26 @@ class ChatApplication:
     def __init__(self):
         load_dotenv()
         self.ui = ChatUI(title="Helo")
-        self.controller = self._initialize_controller()
+        # Streamlit re-runs this script on every interaction: build the controller (and its
+        # agents, whose history is per user) once per session, on top of process-wide services.
+        if TRACING_CONFIG["metrics_port"]:
+            registry.get("metrics_exporter")  # Started once per process.
+        if "controller" not in st.session_state:
+            st.session_state.controller = self._initialize_controller()
+        self.controller = st.session_state.controller
         self._initialize_session_state()
 
     def _initialize_controller(self) -> AppController:
         """Initializes all necessary services and agents for the controller."""
-        rag_service = RAGService()
         return AppController(
             data_agent=agent_factory.create_data_analyst_agent(),
             presentation_agent=agent_factory.create_presentation_agent(),
             rag_agent=agent_factory.create_rag_docs_agent(),
-            rag_service=rag_service
+            rag_service=registry.get("rag_service"),
+            response_cache=registry.get("response_cache"),
+            router=registry.get("request_router"),
+            fast_path=registry.get("fast_path"),
+            answer_renderer=registry.get("answer_renderer"),
         )
 
     def _initialize_session_state(self):
@@ -149,7 +279,27 @@ class ChatApplication:
         if "messages" not in st.session_state:
             st.session_state.messages = []
         if "vector_store" not in st.session_state:
-            st.session_state.vector_store = None
+            # Documents indexed in earlier sessions are available right away.
+            document_index = self.controller.rag_service.document_index
+            st.session_state.vector_store = document_index if document_index else None
+
+    def _stream_answer(self, prompt: str) -> Iterator[str]:
+        """Yields the answer text for ``st.write_stream`` and shows tool calls in a status box."""
+        status = None
+        for event in self.controller.stream_prompt(prompt):
+            if event["type"] == "tool_started":
+                if status is None:
+                    status = st.status("Querying the database...")
+                status.write(f"Running `{event['tool']}`...")
+            elif event["type"] == "tool_completed" and event["error"] and status is not None:
+                status.write(f"`{event['tool']}` failed; the agent will retry.")
+            elif event["type"] == "token":
+                if status is not None:
+                    status.update(label="Data retrieved", state="complete", expanded=False)
+                    status = None
+                yield event["text"]
+        if status is not None:
+            status.update(state="complete", expanded=False)
 
     def run(self):
         """Runs the main application loop."""
@@ -160,8 +310,7 @@ class ChatApplication:
             self.ui.add_message("user", prompt)
 
             with st.chat_message("assistant"):
-                response = self.controller.handle_prompt(prompt)
-                st.markdown(response, unsafe_allow_html=True)
+                response = st.write_stream(self._stream_answer(prompt))
                 # Add the final assistant message to history *after* displaying it
                 st.session_state.messages.append(
                     {"role": "assistant", "content": response})
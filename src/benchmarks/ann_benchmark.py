@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+# File: benchmarks/ann_benchmark.py
+# Description: Recall/latency benchmark of the ANN index types against the exact flat index.
+#
+# Usage (from src/):
+#   python -m benchmarks.ann_benchmark --vectors 50000
+#   python -m benchmarks.ann_benchmark --vectors 200000 --nprobe 8 16 32 --ef-search 32 64 128
+
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from services.document_index import DEFAULT_INDEX_PARAMS, apply_search_params, build_faiss_index
+
+
+def make_corpus(vectors: int, queries: int, dimension: int, seed: int = 7):
+    """Clustered Gaussian vectors, normalized like sentence embeddings."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, vectors // 500), dimension))
+    data = centers[rng.integers(0, len(centers), vectors)] + \
+        0.3 * rng.normal(size=(vectors, dimension))
+    data /= np.linalg.norm(data, axis=1, keepdims=True)
+    query_ids = rng.choice(vectors, queries, replace=False)
+    noisy = data[query_ids] + 0.05 * rng.normal(size=(queries, dimension))
+    return data.astype("float32"), noisy.astype("float32")
+
+
+def measure(index: faiss.Index, queries: np.ndarray, k: int):
+    latencies, results = [], []
+    for query in queries:
+        started = time.perf_counter()
+        _, ids = index.search(query.reshape(1, -1), k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        results.append(ids[0])
+    return np.array(results), np.percentile(latencies, [50, 95])
+
+
+def recall(results: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(found) & set(expected)) for found, expected in zip(results, truth))
+    return hits / truth.size
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="ANN recall/latency vs the flat index.")
+    parser.add_argument("--vectors", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("-k", type=int, default=4)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 64, 256])
+    args = parser.parse_args()
+
+    data, queries = make_corpus(args.vectors, args.queries, args.dimension)
+    print(f"{args.vectors} vectors, d={args.dimension}, {args.queries} queries, k={args.k}\n")
+    print(f"{'index':<8}{'param':<16}{'build s':>9}{'p50 ms':>9}{'p95 ms':>9}{'recall':>9}{'MB':>9}")
+
+    truth = None
+    for index_type in ("flat", "hnsw", "ivf", "ivfpq"):
+        params = dict(DEFAULT_INDEX_PARAMS)
+        index = build_faiss_index(index_type, args.dimension, args.vectors, params)
+        started = time.perf_counter()
+        if not index.is_trained:
+            index.train(data[:params["max_train_vectors"]])
+        index.add(data)
+        build_seconds = time.perf_counter() - started
+        size_mb = faiss.serialize_index(index).nbytes / 1e6
+
+        if index_type == "hnsw":
+            settings = [("ef_search", value) for value in args.ef_search]
+        elif index_type in ("ivf", "ivfpq"):
+            settings = [("nprobe", value) for value in args.nprobe]
+        else:
+            settings = [(None, None)]
+
+        for name, value in settings:
+            if name:
+                params[name] = value
+                apply_search_params(index, params)
+            results, (p50, p95) = measure(index, queries, args.k)
+            if truth is None:
+                truth = results
+            label = f"{name}={value}" if name else "exact"
+            print(f"{index_type:<8}{label:<16}{build_seconds:>9.2f}{p50:>9.3f}{p95:>9.3f}"
+                  f"{recall(results, truth):>9.3f}{size_mb:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
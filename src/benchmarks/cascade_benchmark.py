@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+# File: benchmarks/cascade_benchmark.py
+# Description: Latency of the data analyst on the large model alone vs the small -> large cascade.
+#
+# Both tiers are ReplayModels over benchmarks/recordings with a fixed per-call latency. The small
+# tier replays the recorded tool calls for the first --small-solves questions of docs/TESTS.md
+# and a failing query for the rest, which the cascade must detect and escalate. Tools are the
+# offline stand-ins of the memory benchmark, so no database or API key is needed.
+#
+# Usage (from src/):
+#   python -m benchmarks.cascade_benchmark
+#   python -m benchmarks.cascade_benchmark --small-ms 150 --large-ms 700 --small-solves 8
+
+import argparse
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List
+
+from agents.model_cascade import cascade_stats
+from benchmarks.memory_benchmark import _RECORDINGS, offline_tools
+from benchmarks.replay_model import ReplayModel
+
+_FAILED_ATTEMPT = [
+    {"tool_calls": [{"name": "execute_sql_query", "arguments": {"query": "SELECT revenue FROM sales"}}]},
+    {"content": "{last_tool_result}"},
+]
+
+
+def tools_with_errors(result_rows: int) -> List[Any]:
+    """The offline tools, except that queries on the missing ``sales`` table fail like Postgres would."""
+    tools = offline_tools(result_rows)
+    execute = tools[-1]
+
+    def execute_sql_query(query: str) -> Any:
+        if "sales" in query:
+            # The same Python list run_read_only_query returns; agno stores its str().
+            return [{"error": 'Error executing SQL query: relation "sales" does not exist'}]
+        return execute(query)
+
+    return tools[:-1] + [execute_sql_query]
+
+
+def run(questions: List[str], tiers: List[ReplayModel]) -> List[float]:
+    from agents.agent_factory import agent_factory
+
+    timings = []
+    for question in questions:
+        # A fresh agent per question, as the async orchestrator and the batch mode use.
+        agent = agent_factory.create_data_analyst_agent(mode="standard", tiers=["replay"])
+        agent.tools = tools_with_errors(5)
+        agent.model = tiers[-1]
+        agent.tiers = tiers if len(tiers) > 1 else None
+        started = time.perf_counter()
+        agent.run(question)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Large model alone vs small -> large cascade.")
+    parser.add_argument("--small-ms", type=float, default=120.0, help="Latency per small-model call.")
+    parser.add_argument("--large-ms", type=float, default=600.0, help="Latency per large-model call.")
+    parser.add_argument("--small-solves", type=int, default=6,
+                        help="Questions (in docs/TESTS.md order) the small model answers correctly.")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    os.environ.setdefault("AGNO_TELEMETRY", "false")
+
+    recordings: Dict[str, Any] = json.loads(_RECORDINGS.read_text(encoding="utf-8"))
+    questions = list(recordings)
+    small_recordings = {question: turns if index < args.small_solves else _FAILED_ATTEMPT
+                        for index, (question, turns) in enumerate(recordings.items())}
+    large = ReplayModel(id="large", recordings=recordings, latency_ms=args.large_ms)
+    small = ReplayModel(id="small", recordings=small_recordings, latency_ms=args.small_ms)
+
+    baseline = run(questions, [large])
+    cascade = run(questions, [small, large])
+
+    print(f"{len(questions)} questions, small model solves {args.small_solves}; "
+          f"{args.small_ms:.0f} ms / {args.large_ms:.0f} ms per call\n")
+    print(f"{'variant':<14}{'total s':>9}{'avg s':>8}{'simple avg s':>14}{'hard avg s':>12}")
+    for name, timings in (("large only", baseline), ("cascade", cascade)):
+        simple, hard = timings[:args.small_solves], timings[args.small_solves:]
+        print(f"{name:<14}{sum(timings):>9.2f}{sum(timings) / len(timings):>8.2f}"
+              f"{sum(simple) / max(len(simple), 1):>14.2f}{sum(hard) / max(len(hard), 1):>12.2f}")
+    print()
+    for model_id, tier in cascade_stats.tiers().items():
+        print(f"tier {model_id:<6} attempts {tier['attempts']:>3}, accepted {tier['accepted']:>3} "
+              f"({tier['accepted'] / tier['attempts']:.0%}), avg {tier['seconds'] / tier['attempts']:.2f}s")
+    stats = cascade_stats.stats()
+    reasons = {key[len("escalated_"):]: value for key, value in stats.items() if key.startswith("escalated_")}
+    print(f"escalations: {stats['escalations']} {reasons}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+# File: benchmarks/fast_path_benchmark.py
+# Description: Hit rate, matching latency and avoided model turns of the deterministic fast path.
+#
+# Questions come from docs/TESTS.md (EN and PT-BR) plus a few templated shapes seen in production.
+# The catalog comes from .devcontainer/postgres/schema.sql and queries are not executed, so no
+# database is needed; pass --live to run the matched SQL on the configured database. Model turns
+# avoided are read from the recorded agent runs (benchmarks/recordings), and the time saved is
+# estimated with --turn-seconds per llama3-70b turn.
+#
+# Usage (from src/):
+#   python -m benchmarks.fast_path_benchmark
+#   python -m benchmarks.fast_path_benchmark --show-sql --turn-seconds 1.2
+#   python -m benchmarks.fast_path_benchmark --live
+
+import argparse
+import json
+import logging
+import time
+from pathlib import Path
+
+from benchmarks.latency_benchmark import _DOCS_DIR, load_questions, percentile
+from benchmarks.routing_benchmark import schema_snapshot
+from config.fast_path import FAST_PATH_CONFIG
+from services.fast_path import FastPath
+from services.schema_catalog import SchemaCatalog
+
+_RECORDINGS = Path(__file__).resolve().parent / "recordings" / "data_analyst.json"
+TEMPLATED = [
+    "List all the tables in the database.",
+    "How many items are there?",
+    "How many order items are in the database?",
+    "What are the top 3 most expensive products in the database? Please provide the results in JSON format only.",
+    "Show me the 5 cheapest items.",
+    "What are the top 5 items by stock quantity?",
+    "What is the average price of an item?",
+    "Quais tabelas existem no banco?",
+    "Quantos itens existem?",
+    "Quais são os 3 produtos mais baratos?",
+    # Similar shapes that need the agent.
+    "How many orders were made by Ana Silva?",
+    "What is the total revenue of October 2023?",
+]
+
+
+class OfflineCatalog:
+    """The two SchemaCatalog methods the fast path uses, over a fixed snapshot."""
+
+    referenced_tables = SchemaCatalog.referenced_tables
+
+    def __init__(self, snapshot):
+        self._snapshot = snapshot
+
+    def snapshot(self):
+        return self._snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deterministic fast path hit rate and savings.")
+    parser.add_argument("--turn-seconds", type=float, default=0.8,
+                        help="Assumed latency of one data agent model turn, for the time saved.")
+    parser.add_argument("--live", action="store_true", help="Execute the matched SQL on the configured database.")
+    parser.add_argument("--show-sql", action="store_true")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    if args.live:
+        from tools.database_tools import get_schema_catalog, run_read_only_query
+        catalog, executor = get_schema_catalog, run_read_only_query
+    else:
+        offline = OfflineCatalog(schema_snapshot())
+        catalog, executor = (lambda: offline), (lambda sql: [])
+    fast_path = FastPath(catalog, executor, entity_aliases=FAST_PATH_CONFIG["entity_aliases"],
+                         price_columns=FAST_PATH_CONFIG["price_columns"], max_limit=FAST_PATH_CONFIG["max_limit"])
+    recordings = json.loads(_RECORDINGS.read_text(encoding="utf-8"))
+
+    suites = [("docs/TESTS.md", [q["question"] for q in load_questions(_DOCS_DIR / "TESTS.md", all_languages=True)]),
+              ("templated", TEMPLATED)]
+    for name, questions in suites:
+        timings, hits, turns_saved = [], 0, 0
+        print(f"\n{name}: {len(questions)} questions")
+        for question in questions:
+            started = time.perf_counter()
+            answer = fast_path.answer(question)
+            timings.append((time.perf_counter() - started) * 1000)
+            if answer is not None:
+                hits += 1
+                turns_saved += len(recordings.get(question, []))
+            label = answer.intent if answer else "agent"
+            print(f"  {label:<12}{question[:90]}")
+            if args.show_sql and answer is not None:
+                print(f"  {'':<12}-> {answer.sql or json.dumps(answer.data)}")
+            if args.live and answer is not None and answer.sql:
+                print(f"  {'':<12}=> {str(answer.data)[:100]}")
+        print(f"hit rate {hits / len(questions):.0%} ({hits}/{len(questions)}), fast path p50 "
+              f"{percentile(timings, 50):.3f} ms, p95 {percentile(timings, 95):.3f} ms")
+        if turns_saved:
+            print(f"recorded agent turns avoided: {turns_saved} (~{turns_saved * args.turn_seconds:.1f}s "
+                  f"at {args.turn_seconds}s per turn)")
+    stats = fast_path.stats()
+    print(f"\nlookups {stats['lookups']}, hits {stats['hits']}, misses {stats['misses']}, "
+          f"ambiguous {stats['ambiguous']}, errors {stats['errors']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+# -*- coding: utf-8 -*-
+# File: benchmarks/latency_benchmark.py
+# Description: Replays the docs/ test questions through the entry points with a local stand-in model and
+#              reports per-stage latency percentiles, allocations and DB round-trips.
+#
+# Needs a reachable Postgres (DB_CONFIG); a `bench_scale_<n>` database is created from schema.sql.
+#
+# Usage (from src/):
+#   python -m benchmarks.latency_benchmark
+#   python -m benchmarks.latency_benchmark --scale 100 --iterations 50 --model-latency-ms 300
+#   python -m benchmarks.latency_benchmark --save-baseline benchmarks/baselines/latency.json
+#   python -m benchmarks.latency_benchmark --baseline benchmarks/baselines/latency.json --tolerance 0.25
+#   python -m benchmarks.latency_benchmark --record benchmarks/recordings/data_analyst.json  # real Groq runs
+
+import argparse
+import json
+import logging
+import math
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List
+
+from benchmarks.pg_fixture import CountingConnection, create_fixture_database, round_trips
+from config.database import DB_CONFIG
+from config.models import MODEL_TIERS_CONFIG
+from config.rag import RAG_CONFIG
+
+_DOCS_DIR = Path(__file__).resolve().parents[2] / "docs"
+_RECORDINGS = Path(__file__).resolve().parent / "recordings" / "data_analyst.json"
+_QUESTION_HEADING = re.compile(r"^###\s+(\d+)\.")
+_QUESTION_LINE = re.compile(r"^\*\s+\*\*(EN|PT-BR):\*\*\s*(.*)$")
+
+_PRESENTATION_TURNS = [{"content": "Here is the answer to your question, based on the data provided."}]
+_RAG_TURNS = [{"content": "According to the financial report, here is the answer to your question."}]
+# Recordings come from (and replay as) the largest data analyst model alone, without the cascade.
+_SINGLE_TIER = MODEL_TIERS_CONFIG["data_analyst_tiers"][-1:]
+
+
+def load_questions(path: Path, all_languages: bool = False) -> List[Dict[str, str]]:
+    """Parses a docs/*TESTS.md file into ``{"id", "question"}`` (EN, or PT-BR when EN is empty).
+
+    With ``all_languages`` every EN and PT-BR question is returned, with ids ending in ``/en`` or ``/pt``.
+    """
+    questions, current = [], None
+    for line in path.read_text(encoding="utf-8").splitlines():
+        heading = _QUESTION_HEADING.match(line.strip())
+        if heading:
+            current = {"id": f"{path.stem}#{heading.group(1)}", "pt": "", "en": ""}
+            questions.append(current)
+            continue
+        match = _QUESTION_LINE.match(line.strip())
+        if current is not None and match:
+            current["en" if match.group(1) == "EN" else "pt"] = match.group(2).strip()
+    if all_languages:
+        return [{"id": f"{q['id']}/{language}", "question": q[language]}
+                for q in questions for language in ("en", "pt") if q[language]]
+    return [{"id": q["id"], "question": q["en"] or q["pt"]} for q in questions if q["en"] or q["pt"]]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+class StageRecorder:
+    """Collects per-stage latency, DB round-trips and (when tracing) peak allocations.
+
+    Stages nest (a tool runs inside a request), and every stage is reported on its own.
+    Meant for the single-threaded replay loop below.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.trace_allocations = False
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.round_trips: Dict[str, List[int]] = defaultdict(list)
+        self.allocations: Dict[str, List[int]] = defaultdict(list)
+        self._alloc_stack: List[List[int]] = []  # [start_bytes, peak_bytes] per open stage
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        if self.trace_allocations:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._alloc_stack:
+                self._alloc_stack[-1][1] = max(self._alloc_stack[-1][1], peak)
+            tracemalloc.reset_peak()
+            self._alloc_stack.append([current, current])
+        trips_before = round_trips.value
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            if self.trace_allocations:
+                frame = self._alloc_stack.pop()
+                frame[1] = max(frame[1], tracemalloc.get_traced_memory()[1])
+                if self._alloc_stack:
+                    self._alloc_stack[-1][1] = max(self._alloc_stack[-1][1], frame[1])
+                self.allocations[name].append(frame[1] - frame[0])
+            else:
+                # Allocation passes are slowed down by tracemalloc, so they only record memory.
+                self.latencies[name].append(elapsed)
+                self.round_trips[name].append(round_trips.value - trips_before)
+
+    def wrap(self, name: str, func: Callable) -> Callable:
+        def wrapper(*args, **kwargs):
+            with self.stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def tool_hook(self, function_name: str, function_call: Callable, arguments: Dict[str, Any]) -> Any:
+        """agno ``tool_hooks`` entry that times every tool call."""
+        with self.stage(f"tool.{function_name}"):
+            return function_call(**arguments)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        result = {}
+        for name, samples in self.latencies.items():
+            ms = [s * 1000 for s in samples]
+            trips = self.round_trips[name]
+            allocs = self.allocations.get(name)
+            result[name] = {
+                "count": len(ms),
+                "p50_ms": percentile(ms, 50),
+                "p95_ms": percentile(ms, 95),
+                "p99_ms": percentile(ms, 99),
+                "db_round_trips": sum(trips) / len(trips),
+                "peak_alloc_kib": max(allocs) / 1024 if allocs else None,
+            }
+        return result
+
+
+def _replay_agents(recorder: StageRecorder, recordings: Dict[str, Any], mode: str | None,
+                   latency_ms: float) -> Dict[str, Any]:
+    """Factory-built agents whose models are swapped for instrumented replay models."""
+    from agents.agent_factory import agent_factory
+    from benchmarks.replay_model import ReplayModel
+
+    agents = {
+        "data_analyst": (agent_factory.create_data_analyst_agent(mode=mode, tiers=_SINGLE_TIER),
+                         ReplayModel(recordings=recordings, latency_ms=latency_ms)),
+        "presentation": (agent_factory.create_presentation_agent(),
+                         ReplayModel(default_turns=_PRESENTATION_TURNS, latency_ms=latency_ms)),
+        "rag_docs": (agent_factory.create_rag_docs_agent(),
+                     ReplayModel(default_turns=_RAG_TURNS, latency_ms=latency_ms)),
+    }
+    for name, (agent, model) in agents.items():
+        model.invoke = recorder.wrap(f"llm.{name}", model.invoke)
+        agent.model = model
+        agent.tool_hooks = [recorder.tool_hook]
+    presentation = agents["presentation"][0]
+    presentation.run = recorder.wrap("presentation", presentation.run)
+    return {name: agent for name, (agent, _) in agents.items()}
+
+
+def _build_orchestrator(recorder: StageRecorder, agents: Dict[str, Any]) -> Callable[[str], str]:
+    from main import AgentOrchestrator, RequestValidator
+
+    validator = RequestValidator()
+    validator.is_safe = recorder.wrap("validation", validator.is_safe)
+    orchestrator = AgentOrchestrator(agents["data_analyst"], agents["presentation"], validator)
+    return orchestrator.run
+
+
+def _build_app_controller(recorder: StageRecorder, agents: Dict[str, Any],
+                          real_embeddings: bool) -> Callable[[str], str]:
+    import streamlit as st
+    from app import AppController
+    from services.rag_service import RAGService
+
+    if real_embeddings:
+        from langchain_community.embeddings import SentenceTransformerEmbeddings
+        embeddings = SentenceTransformerEmbeddings(model_name=RAG_CONFIG["embedding_model"])
+    else:
+        from langchain_core.embeddings import FakeEmbeddings
+        embeddings = FakeEmbeddings(size=384)
+
+    rag_service = RAGService(embedding_model=embeddings)
+    with open(_DOCS_DIR / "financial-report.pdf", "rb") as pdf:
+        st.session_state.vector_store = rag_service.index_documents([pdf])
+    rag_service.get_context_from_query = recorder.wrap("retrieval", rag_service.get_context_from_query)
+    controller = AppController(agents["data_analyst"], agents["presentation"], agents["rag_docs"],
+                               rag_service)
+    return controller.handle_prompt
+
+
+def _replay(recorder: StageRecorder, entry_point: Callable[[str], str], questions: List[Dict[str, str]],
+            iterations: int) -> None:
+    for _ in range(iterations):
+        for question in questions:
+            with recorder.stage("request"):
+                entry_point(question["question"])
+
+
+def run_entry_point(name: str, build: Callable[[StageRecorder], Callable[[str], str]],
+                    questions: List[Dict[str, str]], iterations: int) -> Dict[str, Dict[str, float]]:
+    recorder = StageRecorder()
+    entry_point = build(recorder)
+
+    recorder.enabled = False  # Warm-up: fills the pool, the schema catalog and import caches.
+    _replay(recorder, entry_point, questions, 1)
+    recorder.enabled = True
+    _replay(recorder, entry_point, questions, iterations)
+
+    recorder.trace_allocations = True
+    tracemalloc.start()
+    try:
+        _replay(recorder, entry_point, questions, 1)
+    finally:
+        tracemalloc.stop()
+    return recorder.summary()
+
+
+def print_report(name: str, summary: Dict[str, Dict[str, float]]) -> None:
+    print(f"\n== {name}")
+    print(f"{'stage':<34} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'db rt':>6} {'alloc KiB':>10}")
+    for stage in sorted(summary):
+        s = summary[stage]
+        alloc = f"{s['peak_alloc_kib']:.0f}" if s["peak_alloc_kib"] is not None else "-"
+        print(f"{stage:<34} {s['count']:>5} {s['p50_ms']:>9.2f} {s['p95_ms']:>9.2f} {s['p99_ms']:>9.2f} "
+              f"{s['db_round_trips']:>6.1f} {alloc:>10}")
+
+
+def compare_to_baseline(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float,
+                        min_delta_ms: float) -> List[str]:
+    """Returns a description of every stage that got slower, chattier or hungrier than the baseline."""
+    regressions = []
+    if baseline.get("scale") != results["scale"]:
+        logging.warning(f"Baseline was recorded at scale {baseline.get('scale')}, this run uses {results['scale']}.")
+    for entry_point, stages in baseline["entry_points"].items():
+        current = results["entry_points"].get(entry_point)
+        if current is None:
+            continue
+        for stage, base in stages.items():
+            now = current.get(stage)
+            if now is None:
+                continue
+            for metric in ("p50_ms", "p95_ms", "p99_ms"):
+                if now[metric] > base[metric] * (1 + tolerance) and now[metric] - base[metric] > min_delta_ms:
+                    regressions.append(f"{entry_point}/{stage}: {metric} {base[metric]:.2f} -> {now[metric]:.2f}")
+            if now["db_round_trips"] > base["db_round_trips"] + 0.01:
+                regressions.append(f"{entry_point}/{stage}: db round-trips "
+                                   f"{base['db_round_trips']:.1f} -> {now['db_round_trips']:.1f}")
+            if base.get("peak_alloc_kib") and now.get("peak_alloc_kib") and \
+                    now["peak_alloc_kib"] > base["peak_alloc_kib"] * (1 + tolerance) + 64:
+                regressions.append(f"{entry_point}/{stage}: peak alloc "
+                                   f"{base['peak_alloc_kib']:.0f} -> {now['peak_alloc_kib']:.0f} KiB")
+    return regressions
+
+
+def record(path: Path, questions: List[Dict[str, str]], mode: str | None) -> None:
+    """Runs the real data analyst agent on every question and saves its tool-call sequences."""
+    from agents.agent_factory import agent_factory
+    from benchmarks.replay_model import recording_from_run
+
+    recordings = json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+    agent = agent_factory.create_data_analyst_agent(mode=mode, tiers=_SINGLE_TIER)
+    for question in questions:
+        recordings[question["question"]] = recording_from_run(agent.run(question["question"]))
+        print(f"recorded {question['id']}")
+    path.write_text(json.dumps(recordings, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Replay docs/TESTS.md and docs/FINANCIAL_REPORT_TESTS.md through the entry points "
+                    "and report per-stage latency, allocations and DB round-trips.")
+    parser.add_argument("--scale", type=int, default=1,
+                        help="Multiplies the schema.sql row counts (1 keeps the documented answers).")
+    parser.add_argument("--fresh", action="store_true", help="Recreate the benchmark database.")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--entry-points", nargs="+", default=["orchestrator", "app"],
+                        choices=["orchestrator", "app"])
+    parser.add_argument("--mode", default=None, help="Data analyst mode (see DATA_ANALYST_MODES).")
+    parser.add_argument("--model-latency-ms", type=float, default=0.0,
+                        help="Fixed delay per simulated LLM call.")
+    parser.add_argument("--real-embeddings", action="store_true",
+                        help="Embed documents with the configured SentenceTransformer instead of fake vectors.")
+    parser.add_argument("--recordings", type=Path, default=_RECORDINGS)
+    parser.add_argument("--record", type=Path, default=None,
+                        help="Record real (Groq) tool-call sequences to this file instead of benchmarking.")
+    parser.add_argument("--save-baseline", type=Path, default=None)
+    parser.add_argument("--baseline", type=Path, default=None)
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed relative slowdown before a stage counts as a regression.")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0,
+                        help="Ignore latency regressions smaller than this (timer noise).")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s - %(message)s")
+    # agno reports every run over HTTP by default, which would dominate the measurements.
+    os.environ.setdefault("AGNO_TELEMETRY", "false")
+
+    db_questions = load_questions(_DOCS_DIR / "TESTS.md")
+    doc_questions = load_questions(_DOCS_DIR / "FINANCIAL_REPORT_TESTS.md")
+
+    # The fixture must be in place before the tools module creates its pool from DB_CONFIG.
+    fixture_config = create_fixture_database(dict(DB_CONFIG), scale=args.scale, fresh=args.fresh)
+    DB_CONFIG.update(fixture_config, connection_factory=CountingConnection)
+
+    if args.record:
+        record(args.record, db_questions, args.mode)
+        return
+
+    recordings = json.loads(args.recordings.read_text(encoding="utf-8"))
+    missing = [q["id"] for q in db_questions if q["question"] not in recordings]
+    if missing:
+        logging.warning(f"No recording for {', '.join(missing)}; they will fail. Re-record with --record.")
+
+    results = {"scale": args.scale, "iterations": args.iterations,
+               "model_latency_ms": args.model_latency_ms, "entry_points": {}}
+    with tempfile.TemporaryDirectory() as index_dir:
+        RAG_CONFIG["index_dir"] = index_dir
+        for name in args.entry_points:
+            if name == "orchestrator":
+                def build(recorder):
+                    return _build_orchestrator(recorder, _replay_agents(
+                        recorder, recordings, args.mode, args.model_latency_ms))
+                questions = db_questions
+            else:
+                def build(recorder):
+                    return _build_app_controller(recorder, _replay_agents(
+                        recorder, recordings, args.mode, args.model_latency_ms), args.real_embeddings)
+                questions = db_questions + doc_questions
+            try:
+                summary = run_entry_point(name, build, questions, args.iterations)
+            except ImportError as e:
+                print(f"\n== {name}: skipped ({e})")
+                continue
+            results["entry_points"][name] = summary
+            print_report(name, summary)
+
+    if args.save_baseline:
+        args.save_baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.save_baseline.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+        print(f"\nBaseline saved to {args.save_baseline}")
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare_to_baseline(results, baseline, args.tolerance, args.min_delta_ms)
+        if regressions:
+            print("\nRegressions against the baseline:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            sys.exit(1)
+        print("\nNo regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
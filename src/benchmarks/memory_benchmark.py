@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+# File: benchmarks/memory_benchmark.py
+# Description: Prompt tokens per turn of the data analyst agent over one long session, with agno's raw
+#              history vs the compacted ConversationMemory.
+#
+# The recorded tool-call sequences (benchmarks/recordings) are replayed in a single session. The tools
+# are offline stand-ins that return a schema string and a result of --result-rows rows, so no
+# database is needed; tokens are estimated as characters / 4.
+#
+# Usage (from src/):
+#   python -m benchmarks.memory_benchmark
+#   python -m benchmarks.memory_benchmark --turns 24 --result-rows 50
+
+import argparse
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, List
+
+from agno.models.message import Message
+
+from benchmarks.replay_model import ReplayModel
+from config.memory import MEMORY_CONFIG
+from config.models import MODEL_TIERS_CONFIG
+from services.conversation_memory import ConversationMemory, _message_tokens
+from services.result_set import ResultSet
+
+_RECORDINGS = Path(__file__).resolve().parent / "recordings" / "data_analyst.json"
+
+
+def offline_tools(result_rows: int) -> List[Any]:
+    """Tools with the data analyst's names that answer without a database."""
+    def list_available_schemas() -> str:
+        return json.dumps(["public"])
+
+    def list_tables_in_schema(schema_name: str = "public") -> str:
+        return json.dumps(["customers", "items", "order_items", "orders"])
+
+    def fetch_table_schema(table_name: str, schema: str = "public") -> str:
+        return fetch_table_schemas([table_name], schema)
+
+    def fetch_table_schemas(table_names: List[str], schema: str = "public") -> str:
+        return "\n".join(f"{schema}.{name}(id integer PK, name varchar, category varchar, price numeric, "
+                         f"created_at timestamptz)" for name in table_names)
+
+    def execute_sql_query(query: str) -> str:
+        rows = [(i, f"name {i}", "Electronics", 10.5 * i, "2023-10-01T00:00:00") for i in range(result_rows)]
+        return ResultSet.from_rows(["id", "name", "category", "price", "created_at"], rows).to_json()
+
+    return [list_available_schemas, list_tables_in_schema, fetch_table_schema, fetch_table_schemas,
+            execute_sql_query]
+
+
+class MeasuringReplayModel(ReplayModel):
+    """Records the estimated tokens of every model call."""
+
+    def __post_init__(self):
+        super().__post_init__()
+        self.calls: List[int] = []
+
+    def invoke(self, messages: List[Message], **kwargs) -> Dict[str, Any]:
+        self.calls.append(sum(_message_tokens(message) for message in messages))
+        return super().invoke(messages, **kwargs)
+
+
+def run_session(managed: bool, questions: List[str], recordings: Dict[str, Any], result_rows: int) -> List[Dict[str, int]]:
+    from agents.agent_factory import agent_factory
+
+    agent = agent_factory.create_data_analyst_agent(mode="standard", tiers=MODEL_TIERS_CONFIG["data_analyst_tiers"][-1:])
+    model = MeasuringReplayModel(recordings=recordings)
+    agent.model = model
+    agent.tools = offline_tools(result_rows)
+    if managed:
+        agent.num_history_runs = MEMORY_CONFIG["history_runs"]
+        agent.conversation_memory = ConversationMemory(
+            recent_turns=MEMORY_CONFIG["recent_turns"], answer_chars=MEMORY_CONFIG["answer_chars"],
+            summary_tokens=MEMORY_CONFIG["summary_tokens"], max_prompt_tokens=MEMORY_CONFIG["max_prompt_tokens"])
+    else:
+        agent.num_history_runs = 5
+        agent.conversation_memory = None
+
+    turns = []
+    for question in questions:
+        model.calls.clear()
+        agent.run(question)
+        turns.append({"first_call": model.calls[0], "all_calls": sum(model.calls), "calls": len(model.calls)})
+    return turns
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Data analyst prompt tokens per turn: raw vs compacted history.")
+    parser.add_argument("--turns", type=int, default=12, help="Questions asked in the session (recordings cycle).")
+    parser.add_argument("--result-rows", type=int, default=20, help="Rows returned by every query.")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    os.environ.setdefault("AGNO_TELEMETRY", "false")
+
+    recordings = json.loads(_RECORDINGS.read_text(encoding="utf-8"))
+    questions = [list(recordings)[i % len(recordings)] for i in range(args.turns)]
+    raw = run_session(False, questions, recordings, args.result_rows)
+    compact = run_session(True, questions, recordings, args.result_rows)
+
+    print(f"{args.turns} turns, {args.result_rows} rows per query result, budget "
+          f"{MEMORY_CONFIG['max_prompt_tokens']} tokens\n")
+    print(f"{'turn':>4}{'raw first':>11}{'raw run':>10}{'compact first':>15}{'compact run':>13}{'calls':>7}")
+    for number, (before, after) in enumerate(zip(raw, compact), 1):
+        print(f"{number:>4}{before['first_call']:>11}{before['all_calls']:>10}"
+              f"{after['first_call']:>15}{after['all_calls']:>13}{after['calls']:>7}")
+    total_raw = sum(turn["all_calls"] for turn in raw)
+    total_compact = sum(turn["all_calls"] for turn in compact)
+    print(f"\nprompt tokens over the session: raw {total_raw}, compact {total_compact} "
+          f"({1 - total_compact / total_raw:.0%} fewer); largest first call: raw "
+          f"{max(t['first_call'] for t in raw)}, compact {max(t['first_call'] for t in compact)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+# File: benchmarks/orchestrator_load_test.py
+# Description: Compares requests/sec of the sync AgentOrchestrator with the AsyncAgentOrchestrator.
+#
+# Usage (from src/):
+#   python -m benchmarks.orchestrator_load_test --requests 40 --concurrency 8
+#   python -m benchmarks.orchestrator_load_test --live   # real Groq + Postgres, costs API calls
+
+import argparse
+import asyncio
+import logging
+import time
+
+from agents.agent_factory import agent_factory
+from main import AgentOrchestrator, AsyncAgentOrchestrator, RequestValidator
+
+_REQUESTS = [
+    "How many customers are registered in total?",
+    "What is the most expensive item available and what is its price?",
+    "How many orders were made in total?",
+    "List the dates of all orders made by the customer 'Ana Silva'.",
+]
+
+
+class _Response:
+    def __init__(self, content):
+        self.content = content
+        self.messages = []
+        self.tools = []
+
+
+class SimulatedAgent:
+    """Stands in for an agno Agent: sleeps for the given latency instead of calling Groq."""
+
+    def __init__(self, latency: float, content: str):
+        self.latency = latency
+        self.content = content
+
+    def run(self, message, **kwargs):
+        time.sleep(self.latency)
+        return _Response(self.content)
+
+    async def arun(self, message, **kwargs):
+        await asyncio.sleep(self.latency)
+        return _Response(self.content)
+
+
+def _agent_factories(args):
+    if args.live:
+        return agent_factory.create_data_analyst_agent, agent_factory.create_presentation_agent
+    return (lambda: SimulatedAgent(args.data_latency, '[{"count": 5}]'),
+            lambda: SimulatedAgent(args.presentation_latency, "There are 5 customers."))
+
+
+def run_sync(args, requests):
+    data_factory, presentation_factory = _agent_factories(args)
+    orchestrator = AgentOrchestrator(
+        data_agent=data_factory(),
+        presentation_agent=presentation_factory(),
+        validator=RequestValidator(),
+    )
+    started = time.perf_counter()
+    for request in requests:
+        orchestrator.run(request)
+    return time.perf_counter() - started
+
+
+def run_async(args, requests):
+    data_factory, presentation_factory = _agent_factories(args)
+    orchestrator = AsyncAgentOrchestrator(
+        data_agent_factory=data_factory,
+        presentation_agent_factory=presentation_factory,
+        validator=RequestValidator(),
+        max_concurrency=args.concurrency,
+        request_timeout=args.timeout,
+    )
+    started = time.perf_counter()
+    try:
+        asyncio.run(orchestrator.run_many(requests))
+    finally:
+        orchestrator.close()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Sync vs async orchestrator throughput.")
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--data-latency", type=float, default=0.5,
+                        help="Simulated data-agent latency in seconds.")
+    parser.add_argument("--presentation-latency", type=float, default=0.2,
+                        help="Simulated presentation-agent latency in seconds.")
+    parser.add_argument("--live", action="store_true",
+                        help="Use the real agents instead of simulated ones.")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    requests = [_REQUESTS[i % len(_REQUESTS)] for i in range(args.requests)]
+    sync_elapsed = run_sync(args, requests)
+    async_elapsed = run_async(args, requests)
+
+    print(f"{'path':<8}{'requests':>10}{'seconds':>10}{'req/s':>10}")
+    for name, elapsed in (("sync", sync_elapsed), ("async", async_elapsed)):
+        print(f"{name:<8}{len(requests):>10}{elapsed:>10.2f}{len(requests) / elapsed:>10.2f}")
+    print(f"speed-up: {sync_elapsed / async_elapsed:.1f}x at concurrency {args.concurrency}")
+
+
+if __name__ == "__main__":
+    main()
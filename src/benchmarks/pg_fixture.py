@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+# File: benchmarks/pg_fixture.py
+# Description: Benchmark Postgres fixture seeded from .devcontainer/postgres/schema.sql, plus round-trip counting.
+
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict
+
+import psycopg2
+from psycopg2 import sql
+from psycopg2.extensions import connection as _connection
+from psycopg2.extensions import cursor as _cursor
+
+SCHEMA_SQL = Path(__file__).resolve().parents[2] / ".devcontainer" / "postgres" / "schema.sql"
+
+# Synthetic rows added per extra unit of scale, on top of the 9 items / 5 customers /
+# 6 orders of schema.sql. Values are derived from generate_series, so every run is identical.
+_SCALE_QUERIES = (
+    """
+    INSERT INTO items (name, category, price, stock_quantity)
+    SELECT 'Item ' || g,
+           (ARRAY['Electronics', 'Furniture', 'Appliances', 'Apparel'])[1 + g % 4],
+           round((5 + (g * 37) % 1500)::numeric, 2), (g * 13) % 400
+    FROM generate_series(1, %(extra)s * 9) AS g
+    """,
+    """
+    INSERT INTO customers (first_name, last_name, email)
+    SELECT 'First' || g, 'Last' || g, 'customer' || g || '@bench.example'
+    FROM generate_series(1, %(extra)s * 5) AS g
+    """,
+    """
+    INSERT INTO orders (customer_id, order_date)
+    SELECT 1 + g % (SELECT count(*) FROM customers), DATE '2023-01-01' + g % 365
+    FROM generate_series(1, %(extra)s * 6) AS g
+    """,
+    """
+    INSERT INTO order_items (order_id, item_id, quantity, unit_price)
+    SELECT o.id, i.id, 1 + (o.id + k) % 3, i.price
+    FROM orders o
+    CROSS JOIN generate_series(0, 1) AS k
+    JOIN items i ON i.id = 1 + (o.id * 7 + k * 3) % (SELECT count(*) FROM items)
+    WHERE o.id > 6
+    """,
+)
+
+
+class RoundTripCounter:
+    """Thread-safe count of statements and fetches sent to the server."""
+
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def increment(self) -> None:
+        with self._lock:
+            self._value += 1
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+
+round_trips = RoundTripCounter()
+
+
+class _CountingCursorMixin:
+    def execute(self, query, vars=None):
+        round_trips.increment()
+        return super().execute(query, vars)
+
+    def executemany(self, query, vars_list):
+        round_trips.increment()
+        return super().executemany(query, vars_list)
+
+    # Named (server-side) cursors go back to the server for every fetch.
+    def fetchone(self):
+        if self.name is not None:
+            round_trips.increment()
+        return super().fetchone()
+
+    def fetchmany(self, size=None):
+        if self.name is not None:
+            round_trips.increment()
+        return super().fetchmany(size) if size is not None else super().fetchmany()
+
+    def fetchall(self):
+        if self.name is not None:
+            round_trips.increment()
+        return super().fetchall()
+
+
+class CountingConnection(_connection):
+    """psycopg2 connection that counts round-trips in :data:`round_trips`.
+
+    Pass it as ``connection_factory`` (e.g. in ``DB_CONFIG``); cursors keep whatever
+    ``cursor_factory`` the caller asks for.
+    """
+
+    _cursor_classes: Dict[type, type] = {}
+
+    def cursor(self, *args, **kwargs):
+        factory = kwargs.get("cursor_factory") or self.cursor_factory or _cursor
+        counting = self._cursor_classes.get(factory)
+        if counting is None:
+            counting = type(f"Counting{factory.__name__}", (_CountingCursorMixin, factory), {})
+            self._cursor_classes[factory] = counting
+        kwargs["cursor_factory"] = counting
+        return super().cursor(*args, **kwargs)
+
+    def commit(self):
+        round_trips.increment()
+        return super().commit()
+
+    def rollback(self):
+        round_trips.increment()
+        return super().rollback()
+
+
+def _fixture_comment(scale: int) -> str:
+    return f"benchmark fixture: schema.sql, scale={scale}"
+
+
+def create_fixture_database(admin_config: Dict[str, Any], scale: int = 1, fresh: bool = False) -> Dict[str, Any]:
+    """Creates (or reuses) ``bench_scale_<scale>`` seeded from schema.sql and returns its config.
+
+    ``scale`` multiplies the row counts of schema.sql; scale 1 is the original data, so the
+    expected answers in docs/TESTS.md hold. An existing database is reused unless ``fresh``.
+    """
+    dbname = f"bench_scale_{scale}"
+    admin = psycopg2.connect(**admin_config)
+    admin.autocommit = True
+    try:
+        with admin.cursor() as cur:
+            cur.execute("SELECT shobj_description(oid, 'pg_database') FROM pg_database WHERE datname = %s",
+                        (dbname,))
+            row = cur.fetchone()
+            if row is not None and row[0] == _fixture_comment(scale) and not fresh:
+                logging.info(f"Reusing benchmark database '{dbname}'.")
+                return {**admin_config, "dbname": dbname}
+            cur.execute(sql.SQL("DROP DATABASE IF EXISTS {}").format(sql.Identifier(dbname)))
+            cur.execute(sql.SQL("CREATE DATABASE {}").format(sql.Identifier(dbname)))
+    finally:
+        admin.close()
+
+    config = {**admin_config, "dbname": dbname}
+    conn = psycopg2.connect(**config)
+    try:
+        with conn, conn.cursor() as cur:
+            cur.execute(SCHEMA_SQL.read_text(encoding="utf-8"))
+            for query in _SCALE_QUERIES if scale > 1 else ():
+                cur.execute(query, {"extra": scale - 1})
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute("ANALYZE")
+            cur.execute(sql.SQL("COMMENT ON DATABASE {} IS {}").format(
+                sql.Identifier(dbname), sql.Literal(_fixture_comment(scale))))
+    finally:
+        conn.close()
+    logging.info(f"Created benchmark database '{dbname}' (scale {scale}).")
+    return config
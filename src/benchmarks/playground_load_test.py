@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+# File: benchmarks/playground_load_test.py
+# Description: Throughput and tail latency of a running playground server at increasing concurrency.
+#
+# Every request is a new Playground session asking one of the docs/TESTS.md questions, so the
+# agents (and Groq) do real work: expect API costs. Requests refused with 503 by the bounded
+# queue are counted apart from errors; latency percentiles cover answered requests only.
+#
+# Usage (from src/):
+#   python playground.py --production --workers 4 &
+#   python -m benchmarks.playground_load_test
+#   python -m benchmarks.playground_load_test --levels 1,8,32,128 --requests 64 --stream
+#   python -m benchmarks.playground_load_test --agent presentation-agent   # no database work
+
+import argparse
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List
+from uuid import uuid4
+
+import httpx
+
+from benchmarks.latency_benchmark import _DOCS_DIR, load_questions, percentile
+
+
+async def one_request(client: httpx.AsyncClient, url: str, question: str, stream: bool) -> Dict[str, Any]:
+    form = {"message": question, "stream": str(stream).lower(), "session_id": str(uuid4())}
+    started = time.perf_counter()
+    first_byte = None
+    try:
+        async with client.stream("POST", url, data=form) as response:
+            async for _ in response.aiter_bytes():
+                if first_byte is None:
+                    first_byte = time.perf_counter() - started
+            status = response.status_code
+    except httpx.HTTPError as e:
+        logging.warning(f"Request failed: {e}")
+        status = 0
+    return {"status": status, "seconds": time.perf_counter() - started, "first_byte": first_byte}
+
+
+async def run_level(base_url: str, agent: str, questions: List[str], concurrency: int, requests: int,
+                    stream: bool, timeout: float) -> Dict[str, Any]:
+    url = f"{base_url}/v1/playground/agents/{agent}/runs"
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        async def bounded(index: int) -> Dict[str, Any]:
+            async with semaphore:
+                return await one_request(client, url, questions[index % len(questions)], stream)
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(bounded(i) for i in range(requests)))
+        elapsed = time.perf_counter() - started
+
+    answered = [r for r in results if r["status"] == 200]
+    latencies = [r["seconds"] for r in answered] or [0.0]
+    first_bytes = [r["first_byte"] for r in answered if r["first_byte"] is not None] or [0.0]
+    return {"concurrency": concurrency, "ok": len(answered),
+            "rejected": sum(r["status"] == 503 for r in results),
+            "errors": sum(r["status"] not in (200, 503) for r in results),
+            "throughput": len(answered) / elapsed, "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95), "p99": percentile(latencies, 99),
+            "ttfb_p95": percentile(first_bytes, 95)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test of the playground serving mode.")
+    parser.add_argument("--url", default="http://localhost:7777")
+    parser.add_argument("--agent", default="autonomous-db-analyst-agent", help="Agent id to run.")
+    parser.add_argument("--levels", default="1,2,4,8,16,32", help="Comma-separated concurrency levels.")
+    parser.add_argument("--requests", type=int, default=32, help="Requests per concurrency level.")
+    parser.add_argument("--stream", action="store_true", help="Stream the answers (reports time to first byte).")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    ready = httpx.get(f"{args.url}/ready", timeout=10.0)
+    print(f"/ready: {ready.status_code} {ready.json()}\n")
+    questions = [q["question"] for q in load_questions(_DOCS_DIR / "TESTS.md")]
+
+    print(f"{'conc.':>6}{'ok':>6}{'503':>6}{'errors':>8}{'req/s':>8}{'p50 s':>8}{'p95 s':>8}{'p99 s':>8}"
+          f"{'ttfb p95':>10}")
+    for level in (int(value) for value in args.levels.split(",")):
+        row = asyncio.run(run_level(args.url, args.agent, questions, level, args.requests,
+                                    args.stream, args.timeout))
+        print(f"{row['concurrency']:>6}{row['ok']:>6}{row['rejected']:>6}{row['errors']:>8}"
+              f"{row['throughput']:>8.2f}{row['p50']:>8.2f}{row['p95']:>8.2f}{row['p99']:>8.2f}"
+              f"{row['ttfb_p95']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+# File: benchmarks/replay_model.py
+# Description: Deterministic, offline stand-in for the Groq models that replays recorded tool-call sequences.
+
+import json
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterator, List
+
+from agno.models.base import Model
+from agno.models.message import Message
+from agno.models.response import ModelResponse
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+@dataclass
+class ReplayModel(Model):
+    """An agno ``Model`` that answers from recordings instead of calling an LLM.
+
+    ``recordings`` maps a question to the turns the model took for it::
+
+        {"How many customers are registered in total?": [
+            {"tool_calls": [{"name": "execute_sql_query",
+                             "arguments": {"query": "SELECT COUNT(*) FROM customers"}}]},
+            {"content": "{last_tool_result}"}]}
+
+    A recording is picked when its question appears in the latest user message (the longest
+    match wins, so prompts that embed the question, e.g. presentation prompts, also match).
+    The turn is the number of assistant messages since that user message. ``content`` may use
+    ``{last_tool_result}`` and ``{question}``. Unmatched prompts use ``default_turns``.
+    ``latency_ms`` adds a fixed delay per call to simulate network/inference time (the time to
+    first token when streaming); streamed answers arrive word by word, ``token_latency_ms`` apart.
+    """
+
+    id: str = "replay"
+    name: str = "Replay"
+    provider: str = "Replay"
+
+    recordings: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+    default_turns: List[Dict[str, Any]] | None = None
+    latency_ms: float = 0.0
+    token_latency_ms: float = 0.0
+
+    def __post_init__(self):
+        super().__post_init__()
+        self._recordings = {_normalize(question): turns for question, turns in self.recordings.items()}
+
+    def _select_turn(self, messages: List[Message]) -> tuple[Dict[str, Any], str, str]:
+        user_index = max((i for i, m in enumerate(messages) if m.role == "user" and not m.from_history),
+                         default=None)
+        if user_index is None:
+            raise ValueError("ReplayModel needs a user message to replay against.")
+        prompt = messages[user_index].get_content_string()
+        turn_number = sum(1 for m in messages[user_index + 1:] if m.role == "assistant")
+        last_tool_result = next((m.get_content_string() for m in reversed(messages[user_index + 1:])
+                                 if m.role == "tool"), "")
+
+        normalized = _normalize(prompt)
+        matches = [question for question in self._recordings if question in normalized]
+        if matches:
+            question = max(matches, key=len)
+            turns = self._recordings[question]
+        elif self.default_turns is not None:
+            question, turns = prompt, self.default_turns
+        else:
+            raise ValueError(f"No recording matches the prompt: {prompt[:120]!r}")
+        if turn_number >= len(turns):
+            raise ValueError(f"Recording for {question[:80]!r} has no turn {turn_number + 1}.")
+        return turns[turn_number], question, last_tool_result
+
+    def invoke(self, messages: List[Message], **kwargs) -> Dict[str, Any]:
+        turn, question, last_tool_result = self._select_turn(messages)
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        response = {"role": "assistant", "content": None, "tool_calls": []}
+        for i, call in enumerate(turn.get("tool_calls", [])):
+            response["tool_calls"].append({
+                "id": f"call_{len(messages)}_{i}",
+                "type": "function",
+                "function": {"name": call["name"], "arguments": json.dumps(call.get("arguments", {}))},
+            })
+        if "content" in turn:
+            response["content"] = turn["content"].replace(
+                "{last_tool_result}", last_tool_result).replace("{question}", question)
+        return response
+
+    async def ainvoke(self, messages: List[Message], **kwargs) -> Dict[str, Any]:
+        return self.invoke(messages, **kwargs)
+
+    def invoke_stream(self, messages: List[Message], **kwargs) -> Iterator[Dict[str, Any]]:
+        response = self.invoke(messages, **kwargs)
+        if response["tool_calls"] or not response["content"]:
+            yield response
+            return
+        # Stream the answer word by word, like a provider streaming tokens.
+        for i, chunk in enumerate(re.findall(r"\S+\s*|\s+", response["content"])):
+            if i and self.token_latency_ms:
+                time.sleep(self.token_latency_ms / 1000)
+            yield {"role": "assistant", "content": chunk, "tool_calls": []}
+
+    async def ainvoke_stream(self, messages: List[Message], **kwargs) -> AsyncIterator[Dict[str, Any]]:
+        for chunk in self.invoke_stream(messages, **kwargs):
+            yield chunk
+
+    def parse_provider_response(self, response: Dict[str, Any], **kwargs) -> ModelResponse:
+        return ModelResponse(role=response["role"], content=response["content"],
+                             tool_calls=response["tool_calls"])
+
+    def parse_provider_response_delta(self, response: Dict[str, Any]) -> ModelResponse:
+        return self.parse_provider_response(response)
+
+
+def recording_from_run(run_response: Any) -> List[Dict[str, Any]]:
+    """Converts a real agent run (``RunResponse``) into replayable turns."""
+    messages = [m for m in run_response.messages or [] if not m.from_history]
+    user_index = max((i for i, m in enumerate(messages) if m.role == "user"), default=-1)
+    turns = []
+    for message in messages[user_index + 1:]:
+        if message.role != "assistant":
+            continue
+        if message.tool_calls:
+            turns.append({"tool_calls": [
+                {"name": call["function"]["name"],
+                 "arguments": json.loads(call["function"].get("arguments") or "{}")}
+                for call in message.tool_calls]})
+        else:
+            turns.append({"content": message.get_content_string()})
+    return turns
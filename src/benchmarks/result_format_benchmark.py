@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+# File: benchmarks/result_format_benchmark.py
+# Description: Compares per-row dict results with the columnar ResultSet on build time, memory and payload size.
+#
+# Usage (from src/):
+#   python -m benchmarks.result_format_benchmark
+#   python -m benchmarks.result_format_benchmark --rows 1000 --columns 40
+
+import argparse
+import datetime
+import json
+import time
+import tracemalloc
+from decimal import Decimal
+
+from config.database import RESULT_SUMMARY_CONFIG
+from main import JsonDecimalEncoder
+from services.result_set import ResultSet, ResultSetBuilder
+
+
+def make_rows(rows: int, columns: int):
+    """A wide result mixing the types Postgres returns: ints, numerics, text, dates and NULLs."""
+    names = [f"column_name_{i}" for i in range(columns)]
+    base = datetime.date(2024, 1, 1)
+    makers = [
+        lambda r: r,
+        lambda r: Decimal(r % 997) / 4,
+        lambda r: f"value {r % 53}",
+        lambda r: base + datetime.timedelta(days=r % 365),
+        lambda r: None if r % 7 == 0 else r * 3,
+    ]
+    data = [tuple(makers[c % len(makers)](r) for c in range(columns)) for r in range(rows)]
+    return names, data
+
+
+def legacy(names, data):
+    records = [dict(zip(names, row)) for row in data]
+    tool_output = json.dumps(records, cls=JsonDecimalEncoder, default=str)
+    prompt = json.dumps(records, cls=JsonDecimalEncoder, default=str)
+    return records, tool_output, prompt
+
+
+def columnar(names, data):
+    builder = ResultSetBuilder(names)
+    for start in range(0, len(data), 200):  # fetchmany() batches, as in fetch_bounded.
+        builder.extend(data[start:start + 200])
+    result = builder.build()
+    tool_output = result.to_json()
+    prompt = result.for_prompt(**RESULT_SUMMARY_CONFIG)
+    return result, tool_output, prompt
+
+
+def measure(fn, names, data, iterations: int):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn(names, data)
+    elapsed_ms = (time.perf_counter() - started) * 1000 / iterations
+
+    tracemalloc.start()
+    kept, tool_output, prompt = fn(names, data)
+    _, peak = tracemalloc.get_traced_memory()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return elapsed_ms, peak, retained, len(tool_output), len(prompt)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Per-row dicts vs columnar ResultSet for query results.")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--columns", type=int, default=30)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    names, data = make_rows(args.rows, args.columns)
+    print(f"{args.rows} rows x {args.columns} columns, {args.iterations} iterations\n")
+    print(f"{'format':<10}{'ms':>9}{'peak KB':>10}{'kept KB':>10}{'tool chars':>12}{'prompt chars':>14}")
+    for label, fn in (("dicts", legacy), ("columnar", columnar)):
+        elapsed_ms, peak, retained, tool_chars, prompt_chars = measure(fn, names, data, args.iterations)
+        print(f"{label:<10}{elapsed_ms:>9.1f}{peak / 1024:>10.0f}{retained / 1024:>10.0f}"
+              f"{tool_chars:>12}{prompt_chars:>14}")
+    print("\nchars / 4 approximates prompt tokens.")
+
+
+if __name__ == "__main__":
+    main()
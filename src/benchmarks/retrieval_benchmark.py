@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+# File: benchmarks/retrieval_benchmark.py
+# Description: Context size, answer-term coverage and latency of dense top-k vs the hybrid retrieval pipeline
+#              on the docs/FINANCIAL_REPORT_TESTS.md questions over docs/financial-report.pdf.
+#
+# Questions are asked in EN and PT-BR. "coverage" is the share of the words and numbers of the
+# expected PT-BR answer (the report is in Portuguese) found in the context.
+# Fake (random) embeddings make the dense search meaningless, so pass --real-embeddings
+# for representative numbers.
+#
+# Usage (from src/):
+#   python -m benchmarks.retrieval_benchmark --real-embeddings
+#   python -m benchmarks.retrieval_benchmark --real-embeddings --max-tokens 800 --reranker cross-encoder/ms-marco-MiniLM-L-6-v2
+
+import argparse
+import logging
+import re
+import tempfile
+import time
+from typing import Callable, Dict, List, Tuple
+
+from benchmarks.latency_benchmark import _DOCS_DIR, _QUESTION_HEADING, load_questions, percentile
+from config.rag import RAG_CONFIG
+from services.rag_service import RAGService
+from services.retrieval import CrossEncoderReranker, HybridRetriever, estimate_tokens, tokenize
+
+_EXPECTED = re.compile(r"^\*\s+\*\*Expected Answer:\*\*\s*(.*)$")
+
+
+def expected_terms() -> Dict[str, set]:
+    """Distinctive terms of each PT-BR expected answer, by question number."""
+    answers, number = {}, None
+    for line in (_DOCS_DIR / "FINANCIAL_REPORT_TESTS.md").read_text(encoding="utf-8").splitlines():
+        heading = _QUESTION_HEADING.match(line.strip())
+        if heading:
+            number = heading.group(1)
+        match = _EXPECTED.match(line.strip())
+        if match and number:
+            portuguese = match.group(1).split(" / ")[0]
+            answers[number] = {term for term in tokenize(portuguese) if len(term) > 2}
+    return answers
+
+
+def dense_top_k(store, question: str) -> Tuple[str, int]:
+    """The previous behavior: the top ``search_k`` chunks joined as they are."""
+    docs = store.similarity_search(question, k=RAG_CONFIG["search_k"])
+    return "\n".join(doc.page_content for doc in docs), len(docs)
+
+
+def pipeline(retriever: HybridRetriever, store) -> Callable[[str], Tuple[str, int]]:
+    def retrieve(question: str) -> Tuple[str, int]:
+        context, docs = retriever.retrieve(store, question)
+        return context, len(docs)
+    return retrieve
+
+
+def evaluate(name: str, retrieve: Callable[[str], Tuple[str, int]], questions: List[Dict[str, str]],
+             answers: Dict[str, set], iterations: int) -> None:
+    timings, tokens, chunks, coverage = [], [], [], []
+    for _ in range(iterations):
+        for question in questions:
+            terms = answers[question["id"].split("#")[1].split("/")[0]]
+            started = time.perf_counter()
+            context, used = retrieve(question["question"])
+            timings.append((time.perf_counter() - started) * 1000)
+            tokens.append(estimate_tokens(context))
+            chunks.append(used)
+            found = set(tokenize(context))
+            coverage.append(len(terms & found) / len(terms) if terms else 1.0)
+    print(f"{name:<20}{sum(tokens) / len(tokens):>12.0f}{max(tokens):>12}{sum(chunks) / len(chunks):>8.1f}"
+          f"{sum(coverage) / len(coverage):>10.1%}{percentile(timings, 50):>9.2f}{percentile(timings, 95):>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dense top-k vs hybrid retrieval on the financial report.")
+    parser.add_argument("--real-embeddings", action="store_true",
+                        help="Embed with the configured SentenceTransformer instead of fake vectors.")
+    parser.add_argument("--max-tokens", type=int, default=RAG_CONFIG["context_max_tokens"])
+    parser.add_argument("--reranker", default=RAG_CONFIG["reranker_model"],
+                        help="Cross-encoder model name for the reranked variant.")
+    parser.add_argument("--iterations", type=int, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    if args.real_embeddings:
+        from langchain_community.embeddings import SentenceTransformerEmbeddings
+        embeddings = SentenceTransformerEmbeddings(model_name=RAG_CONFIG["embedding_model"])
+    else:
+        from langchain_core.embeddings import FakeEmbeddings
+        embeddings = FakeEmbeddings(size=384)
+
+    questions = load_questions(_DOCS_DIR / "FINANCIAL_REPORT_TESTS.md", all_languages=True)
+    answers = expected_terms()
+    with tempfile.TemporaryDirectory() as index_dir:
+        from services.document_index import DocumentIndex
+        service = RAGService(embedding_model=embeddings)
+        service._document_index = DocumentIndex(index_dir, embeddings, index_type="flat")
+        with open(_DOCS_DIR / "financial-report.pdf", "rb") as pdf:
+            store = service.index_documents([pdf])
+        store.keyword_index  # Built up front, as the first search would.
+
+        options = dict(max_chunks=RAG_CONFIG["search_k"], candidate_k=RAG_CONFIG["candidate_k"],
+                       max_tokens=args.max_tokens, chunk_overlap=RAG_CONFIG["chunk_overlap"])
+        variants = [
+            ("dense top-k", lambda q: dense_top_k(store, q)),
+            ("dense + mmr", pipeline(HybridRetriever(hybrid=False, **options), store)),
+            ("hybrid", pipeline(HybridRetriever(**options), store)),
+        ]
+        if args.reranker:
+            reranker = CrossEncoderReranker(args.reranker, batch_size=RAG_CONFIG["rerank_batch_size"])
+            variants.append(("hybrid + rerank", pipeline(HybridRetriever(reranker=reranker, **options), store)))
+
+        print(f"{len(questions)} questions, {len(store.keyword_index)} chunks, "
+              f"{'real' if args.real_embeddings else 'fake'} embeddings, budget {args.max_tokens} tokens\n")
+        print(f"{'retrieval':<20}{'avg tokens':>12}{'max tokens':>12}{'chunks':>8}{'coverage':>10}"
+              f"{'p50 ms':>9}{'p95 ms':>9}")
+        for name, retrieve in variants:
+            evaluate(name, retrieve, questions, answers, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
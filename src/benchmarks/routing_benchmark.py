@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+# File: benchmarks/routing_benchmark.py
+# Description: Routing accuracy and latency of the request router on the docs/ test questions.
+#
+# docs/TESTS.md questions are labeled "database", docs/FINANCIAL_REPORT_TESTS.md ones "documents"
+# (EN and PT-BR), plus a few small-talk prompts that are not among the router's examples.
+# The catalog comes from .devcontainer/postgres/schema.sql, so no database is needed.
+#
+# Usage (from src/):
+#   python -m benchmarks.routing_benchmark
+#   python -m benchmarks.routing_benchmark --no-embeddings          # keyword classifier only
+#   python -m benchmarks.routing_benchmark --min-similarity 0.4 --min-margin 0.05 --show-misroutes
+
+import argparse
+import logging
+import re
+import time
+from typing import Callable, Dict, List
+
+from benchmarks.latency_benchmark import _DOCS_DIR, load_questions, percentile
+from benchmarks.pg_fixture import SCHEMA_SQL
+from config.rag import RAG_CONFIG
+from config.routing import ROUTER_CONFIG
+from services.router import ROUTES, RequestRouter
+from services.schema_catalog import CatalogSnapshot
+
+SMALL_TALK = [
+    "Hey there!", "Good afternoon", "Thank you, that helps.", "How's it going?", "See you later",
+    "Are you a bot?", "Oi, como vai?", "Boa tarde", "Valeu, obrigado!", "Quem é você?",
+]
+# The hard-coded list AppController used before the router.
+LEGACY_KEYWORDS = ['table', 'database', 'sql', 'customer', 'order', 'item', 'schema']
+_CREATE_TABLE = re.compile(r"CREATE TABLE (\w+) \((.*?)\);", re.DOTALL)
+# schema.sql type names as pg_catalog's format_type() reports them.
+_FORMAT_TYPE = {"serial": "integer", "varchar": "character varying", "timestamp": "timestamp with time zone"}
+
+
+def labeled_questions() -> List[Dict[str, str]]:
+    questions = [dict(q, route="database") for q in load_questions(_DOCS_DIR / "TESTS.md", all_languages=True)]
+    questions += [dict(q, route="documents")
+                  for q in load_questions(_DOCS_DIR / "FINANCIAL_REPORT_TESTS.md", all_languages=True)]
+    questions += [{"id": f"small_talk#{i}", "question": text, "route": "small_talk"}
+                  for i, text in enumerate(SMALL_TALK, 1)]
+    return questions
+
+
+def schema_snapshot() -> CatalogSnapshot:
+    """The catalog of schema.sql, built without connecting to Postgres."""
+    rows = []
+    for table, body in _CREATE_TABLE.findall(SCHEMA_SQL.read_text(encoding="utf-8")):
+        for line in body.split(",\n"):
+            column, data_type = line.split()[:2]
+            data_type = data_type.lower().split("(")[0]
+            rows.append({"schema_name": "public", "table_name": table, "column_name": column,
+                         "data_type": _FORMAT_TYPE.get(data_type, data_type)})
+    return CatalogSnapshot(rows)
+
+
+def legacy_route(prompt: str) -> str:
+    return "database" if any(keyword in prompt.lower() for keyword in LEGACY_KEYWORDS) else "documents"
+
+
+def evaluate(name: str, route: Callable[[str], str], questions: List[Dict[str, str]],
+             show_misroutes: bool) -> None:
+    timings, correct, per_route = [], 0, {r: [0, 0] for r in ROUTES}
+    misroutes = []
+    for question in questions:
+        started = time.perf_counter()
+        predicted = route(question["question"])
+        timings.append((time.perf_counter() - started) * 1000)
+        per_route[question["route"]][1] += 1
+        if predicted == question["route"]:
+            correct += 1
+            per_route[question["route"]][0] += 1
+        else:
+            misroutes.append(f"    {question['id']}: {predicted} <- {question['question']}")
+    by_route = "  ".join(f"{r} {ok}/{total}" for r, (ok, total) in per_route.items())
+    print(f"{name:<22}{correct / len(questions):>8.1%}{percentile(timings, 50):>9.3f}"
+          f"{percentile(timings, 95):>9.3f}   {by_route}")
+    if show_misroutes:
+        print("\n".join(misroutes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Request router accuracy and latency on docs/ questions.")
+    parser.add_argument("--embedding-model", default=RAG_CONFIG["embedding_model"])
+    parser.add_argument("--no-embeddings", action="store_true", help="Only evaluate the keyword classifier.")
+    parser.add_argument("--min-similarity", type=float, default=ROUTER_CONFIG["min_similarity"])
+    parser.add_argument("--min-margin", type=float, default=ROUTER_CONFIG["min_margin"])
+    parser.add_argument("--show-misroutes", action="store_true")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    questions = labeled_questions()
+    snapshot = schema_snapshot()
+    print(f"{len(questions)} questions, catalog: {len(snapshot.columns)} tables from {SCHEMA_SQL.name}\n")
+    print(f"{'router':<22}{'accuracy':>8}{'p50 ms':>9}{'p95 ms':>9}   correct per route")
+    evaluate("legacy keywords", legacy_route, questions, args.show_misroutes)
+
+    classifier = RequestRouter(catalog=lambda: snapshot)
+    evaluate("keyword classifier", lambda q: classifier.route(q).route, questions, args.show_misroutes)
+    if args.no_embeddings:
+        return
+
+    from langchain_community.embeddings import SentenceTransformerEmbeddings
+    embeddings = SentenceTransformerEmbeddings(model_name=args.embedding_model)
+    for label, catalog in (("embeddings", None), ("embeddings + catalog", lambda: snapshot)):
+        router = RequestRouter(embedding_model=embeddings, catalog=catalog,
+                               min_similarity=args.min_similarity, min_margin=args.min_margin)
+        started = time.perf_counter()
+        router.centroids()
+        build_ms = (time.perf_counter() - started) * 1000
+        evaluate(label, lambda q: router.route(q).route, questions, args.show_misroutes)
+        stats = router.stats()
+        print(f"{'':<22}centroids built in {build_ms:.0f} ms; decided by embedding {stats['embedding']}, "
+              f"classifier {stats['classifier']}, default {stats['default']}")
+
+
+if __name__ == "__main__":
+    main()
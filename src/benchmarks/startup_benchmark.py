@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+# File: benchmarks/startup_benchmark.py
+# Description: Measures the import (cold start) time of each entry point and which heavy modules it loads.
+#
+# Usage (from src/):
+#   python -m benchmarks.startup_benchmark
+#   python -m benchmarks.startup_benchmark --runs 10 --entry-points main app
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+_SRC_DIR = Path(__file__).resolve().parents[1]
+
+ENTRY_POINTS = ("main", "app", "playground")
+HEAVY_MODULES = ("pandas", "langchain", "langchain_community", "faiss", "torch",
+                 "sentence_transformers", "streamlit", "pypdf")
+
+# Runs in a fresh interpreter so every measurement is a true cold start.
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module: str) -> dict:
+    """Imports ``module`` in a subprocess and returns its import time and loaded heavy modules."""
+    completed = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        cwd=_SRC_DIR, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr else
+                           f"import {module} failed")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Measure the cold-start import time of each entry point.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--entry-points", nargs="+", default=list(ENTRY_POINTS))
+    args = parser.parse_args()
+
+    print(f"{'entry point':<12} {'median s':>9} {'min s':>7}  heavy modules loaded")
+    for module in args.entry_points:
+        try:
+            runs = [measure(module) for _ in range(args.runs)]
+        except RuntimeError as e:
+            print(f"{module:<12} failed: {e}")
+            continue
+        seconds = [run["seconds"] for run in runs]
+        loaded = ", ".join(runs[-1]["loaded"]) or "-"
+        print(f"{module:<12} {statistics.median(seconds):>9.3f} {min(seconds):>7.3f}  {loaded}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+# File: benchmarks/validator_benchmark.py
+# Description: Cost of the request and SQL validators as the blocked-phrase list grows.
+#
+# Usage (from src/):
+#   python -m benchmarks.validator_benchmark
+#   python -m benchmarks.validator_benchmark --sizes 10 100 1000 10000 --iterations 2000
+
+import argparse
+import logging
+import random
+import re
+import string
+import time
+
+from config.security import REQUEST_VALIDATION_CONFIG, SQL_VALIDATION_CONFIG
+from services.validation import RequestValidator, SqlValidator
+
+PROMPTS = [
+    "What are the top 3 most expensive products in the database?",
+    "Which customers placed more than five orders since the start of the year, and what did they spend?",
+    "Quais pedidos foram atualizados na última semana e quem são os clientes responsáveis por eles?",
+]
+QUERY = ("WITH recent AS (SELECT customer_id, SUM(total) AS spent, MAX(updated_at) AS updated_at "
+         "FROM orders WHERE created_at >= now() - interval '30 days' GROUP BY customer_id) "
+         "SELECT c.name, r.spent, r.updated_at FROM recent r JOIN customers c ON c.id = r.customer_id "
+         "ORDER BY r.spent DESC LIMIT 10")
+
+
+def random_phrases(count: int, seed: int = 3) -> list[str]:
+    """Blocked phrases on top of the configured ones; two-word phrases that never occur in PROMPTS."""
+    rng = random.Random(seed)
+    words = lambda: "".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9)))
+    return REQUEST_VALIDATION_CONFIG["blocked_phrases"] + [f"{words()} {words()}" for _ in range(count)]
+
+
+def per_pattern_loop(patterns: list[str]):
+    """The previous approach: one re.search per pattern per request."""
+    def is_safe(request: str) -> bool:
+        return not any(re.search(pattern, request, re.IGNORECASE) for pattern in patterns)
+    return is_safe
+
+
+def flat_alternation(phrases: list[str]):
+    """One regex, but without prefix sharing: every phrase is tried at every position."""
+    compiled = re.compile(r"\b(?:" + "|".join(re.escape(p) for p in phrases) + r")\b", re.IGNORECASE)
+    return lambda request: compiled.search(request) is None
+
+
+def time_us(check, iterations: int) -> float:
+    started = time.perf_counter()
+    for i in range(iterations):
+        check(PROMPTS[i % len(PROMPTS)])
+    return (time.perf_counter() - started) * 1e6 / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Request/SQL validator cost vs number of blocked phrases.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    print(f"µs per request (safe prompts, so every check scans the whole text)\n")
+    print(f"{'phrases':>8}{'compile ms':>12}{'combined':>10}{'flat alt':>10}{'per-pattern':>13}")
+    for size in args.sizes:
+        phrases = random_phrases(size)
+        started = time.perf_counter()
+        validator = RequestValidator(blocked_phrases=phrases, blocked_patterns=[], patterns_file=None)
+        compile_ms = (time.perf_counter() - started) * 1000
+        combined = time_us(validator.is_safe, args.iterations)
+        flat = time_us(flat_alternation(phrases), args.iterations)
+        # The per-pattern loop also compiles on first use; re's cache holds only 512 patterns.
+        loop_iterations = max(10, args.iterations // max(1, size // 10))
+        loop = time_us(per_pattern_loop(phrases), loop_iterations)
+        print(f"{len(phrases):>8}{compile_ms:>12.1f}{combined:>10.1f}{flat:>10.1f}{loop:>13.1f}")
+
+    sql_validator = SqlValidator(**SQL_VALIDATION_CONFIG)
+    keywords = SQL_VALIDATION_CONFIG["forbidden_keywords"]
+    started = time.perf_counter()
+    for _ in range(args.iterations):
+        sql_validator.check(QUERY)
+    tokenized = (time.perf_counter() - started) * 1e6 / args.iterations
+    started = time.perf_counter()
+    for _ in range(args.iterations):
+        any(keyword in QUERY.upper() for keyword in keywords)
+    substring = (time.perf_counter() - started) * 1e6 / args.iterations
+    print(f"\nSQL check on a {len(QUERY)}-char query: tokenizer {tokenized:.1f} µs, "
+          f"substring scan {substring:.1f} µs (which rejects it: "
+          f"{any(keyword in QUERY.upper() for keyword in keywords)})")
+
+
+if __name__ == "__main__":
+    main()
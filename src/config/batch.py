@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+# File: config/batch.py
+# Description: Defaults for the batch mode of main.py (see services/batch.py).
+
+import os
+
+BATCH_CONFIG = {
+    "concurrency": int(os.getenv("BATCH_CONCURRENCY", "4")),   # Questions answered at the same time.
+    # Groq model calls per minute across all workers (the free tier allows 30). A question
+    # takes several calls: one per data agent turn plus the presentation agent.
+    "requests_per_minute": float(os.getenv("GROQ_REQUESTS_PER_MINUTE", "30")),
+    "burst": 5,                     # Calls allowed back to back before the rate applies.
+    "request_timeout": 300.0,       # Seconds per question, rate-limit waits included.
+}
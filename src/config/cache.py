@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+# File: config/cache.py
+# Description: Configuration for the response cache in front of the data analyst agent.
+
+RESPONSE_CACHE_CONFIG = {
+    "max_entries": 256,
+    "result_ttl": 300.0,            # Seconds a cached result (and answer) is served as-is.
+    "sql_ttl": 86400.0,             # Seconds the generated SQL is reused (re-executed on a stale result).
+    "similarity_threshold": 0.92,   # Cosine similarity for semantic hits (needs an embedding model).
+}
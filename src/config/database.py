@@ -9,3 +9,79 @@ DB_CONFIG = {
     "user": "postgres",
     "password": "postgres",  # Ideally, use environment variables for credentials
 }
+
+
+# Servers of the cluster. Each endpoint inherits the DB_CONFIG settings it does not override,
+# and may override POOL_CONFIG through "pool". Read-only traffic (execute_sql_query and
+# catalog loads) is balanced across healthy replicas by "weight"; writes and
+# pg_stat-based change detection stay on the primary.
+DB_ENDPOINTS = [
+    {"name": "primary", "role": "primary"},
+    # {"name": "replica-1", "role": "replica", "host": "replica-1", "weight": 2,
+    #  "pool": {"max_size": 20}},
+]
+
+# Routing of read-only traffic between DB_ENDPOINTS.
+ROUTING_CONFIG = {
+    "read_from_replicas": True,
+    "max_replication_lag_seconds": 10.0,  # Replicas further behind are skipped.
+    "lag_check_interval": 5.0,            # Seconds between replication lag probes.
+    "failure_backoff_seconds": 30.0,      # An unreachable endpoint is skipped this long.
+    "fallback_to_primary": True,          # Read from the primary when no replica qualifies.
+}
+
+# Databases selectable per request (one per tenant): request name -> dbname on every endpoint.
+# Requests that name no database use DB_CONFIG["dbname"].
+DATABASES = {
+    # "acme": "acme_analytics",
+}
+
+# Connection pool settings used by tools/database_tools.py::DatabaseManager.
+POOL_CONFIG = {
+    "min_size": 1,               # Connections kept open even when idle.
+    "max_size": 10,              # Hard cap; callers wait once it is reached.
+    "checkout_timeout": 30.0,    # Seconds to wait for a free connection.
+    "max_idle_seconds": 300.0,   # Idle connections above min_size are recycled.
+    "max_lifetime_seconds": 3600.0,  # Connections are replaced after this age.
+    "health_check_after": 30.0,  # Ping connections idle longer than this on checkout.
+}
+
+# Schema metadata cache used by the exploration tools (see services/schema_catalog.py).
+CATALOG_CACHE_CONFIG = {
+    "ttl_seconds": 300.0,
+    # "ttl" | "fingerprint" (poll a cheap catalog checksum) | "notify" (LISTEN for DDL events)
+    "refresh_mode": "ttl",
+    "check_interval": 30.0,
+    "notify_channel": "schema_catalog_changed",
+}
+
+# Result budget for execute_sql_query. Rows are streamed through a server-side cursor and
+# fetching stops as soon as either budget is reached, so memory stays flat for huge tables.
+QUERY_LIMITS_CONFIG = {
+    "max_rows": 1000,
+    "max_bytes": 1_000_000,         # Approximate serialized size of the returned rows.
+    "batch_size": 200,              # Rows per fetchmany() round-trip.
+    "statement_timeout_ms": 30_000,
+    "work_mem": "16MB",             # Per-sort/hash memory for agent queries (SET LOCAL).
+}
+
+# How query results reach the presentation agent (see services/result_set.py). Results whose
+# compact JSON fits in inline_max_chars are sent whole; larger ones as a summary with the row
+# count, per-column aggregates and the first sample_rows rows.
+RESULT_SUMMARY_CONFIG = {
+    "inline_max_chars": 4000,
+    "sample_rows": 10,
+    "top_values": 5,                # Most frequent values listed per text column.
+}
+
+# EXPLAIN-based guardrails applied before execute_sql_query runs a query
+# (see services/query_guard.py).
+QUERY_GUARDRAILS_CONFIG = {
+    "enabled": True,
+    "max_total_cost": 1_000_000.0,  # Planner cost units.
+    "max_plan_rows": 100_000,
+    "on_violation": "limit",        # "limit" (wrap in LIMIT when that is cheap enough) | "reject"
+    "limit_rows": 1000,
+    "history_size": 500,            # Plan cost vs runtime entries kept in memory.
+    "log_path": None,               # Optional JSON-lines file with every entry.
+}
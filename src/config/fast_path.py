@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+# File: config/fast_path.py
+# Description: Templated questions answered without the data analyst agent (see services/fast_path.py).
+
+import os
+
+FAST_PATH_CONFIG = {
+    "enabled": os.getenv("FAST_PATH", "true").lower() != "false",
+    # Words that name a table other than their own (singular, accent-free). Table names
+    # themselves ("customers", "order items") always match.
+    "entity_aliases": {
+        "product": "items", "produto": "items", "iten": "items",
+        "client": "customers", "cliente": "customers",
+        "pedido": "orders", "compra": "orders",
+    },
+    # Columns meant by "expensive"/"cheap", tried in order among the table's numeric columns.
+    "price_columns": ["price", "unit_price", "list_price", "cost", "amount"],
+    "max_limit": 100,               # Largest N accepted in "top N" questions.
+    # Optional JSON file of verified {"question": "SQL"} pairs (e.g. reviewed agent runs),
+    # answered by their SQL when a question matches one exactly (after normalization).
+    "verified_queries_file": os.getenv("FAST_PATH_QUERIES"),
+}
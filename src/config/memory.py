@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+# File: config/memory.py
+# Description: Conversation memory limits for the data analyst agent (see services/conversation_memory.py).
+
+MEMORY_CONFIG = {
+    "enabled": True,               # False = agno's raw history (the last 5 runs, tool results included).
+    "history_runs": 10,            # Previous runs read from agno's memory before compaction.
+    "recent_turns": 2,             # Latest exchanges kept as question/answer messages.
+    "answer_chars": 400,           # Longest answer kept per recent exchange (results are described, not copied).
+    "summary_tokens": 400,         # Cap of the rolling summary of older exchanges.
+    # Budget for everything sent at the start of a run (system prompt, history, request). The
+    # 8k-context llama3-70b-8192 also needs room for tool results and the answer.
+    "max_prompt_tokens": 3000,
+}
@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+# File: config/models.py
+# Description: Model tiers of the data analyst agent (see agents/model_cascade.py).
+
+import os
+
+MODEL_TIERS_CONFIG = {
+    # Groq models tried in order: a request moves to the next one only when the previous
+    # attempt is rejected (an error, INVALID_REQUEST, a failed query, or rows that no query
+    # produced). A single model disables the cascade.
+    "data_analyst_tiers": [model.strip() for model in
+                           os.getenv("DATA_ANALYST_TIERS", "llama3-8b-8192,llama3-70b-8192").split(",")
+                           if model.strip()],
+    # Also retry queries that returned no rows. Off by default: most empty results are valid
+    # answers ("customers without orders"), and retrying them doubles their cost.
+    "escalate_on_empty_result": os.getenv("ESCALATE_ON_EMPTY_RESULT", "false").lower() == "true",
+}
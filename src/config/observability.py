@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+# File: config/observability.py
+# Description: Settings for request tracing, metrics export and slow-request profiling.
+
+import os
+
+TRACING_CONFIG = {
+    "enabled": True,
+    "max_traces": 200,              # Finished traces kept in memory for the JSON dump.
+    "max_spans_per_trace": 1000,    # Extra spans are counted but not stored.
+    # Local HTTP exporter serving /metrics (Prometheus text) and /traces (JSON). Off when unset.
+    "metrics_port": int(os.getenv("METRICS_PORT", "0")) or None,
+    "trace_dump_path": os.getenv("TRACE_DUMP_PATH"),  # Written on CLI exit when set.
+    # Sampling profiler: requests slower than the threshold get a collapsed-stack profile.
+    "profile_slow_requests": os.getenv("PROFILE_SLOW_REQUESTS", "false").lower() == "true",
+    "slow_request_seconds": 10.0,
+    "profile_interval": 0.005,
+    "profile_dir": "profiles",
+}
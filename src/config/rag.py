@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+# File: config/rag.py
+# Description: Configuration for the RAG document pipeline and its persistent vector index.
+
+RAG_CONFIG = {
+    "embedding_model": "all-MiniLM-L6-v2",
+    "chunk_size": 1000,
+    "chunk_overlap": 200,
+    "index_dir": "vector_index",  # Relative paths resolve against the working directory.
+    "mmap": True,                 # Memory-map the FAISS index on load instead of reading it into RAM.
+    "extract_workers": None,      # Processes for PDF page extraction (None = CPU count).
+    "pages_per_task": 16,         # Pages extracted per worker task.
+    "parallel_min_pages": 32,     # Smaller PDFs are extracted inline, without the process pool.
+    "embed_batch_size": 64,       # Chunks embedded and added to the index per batch.
+    # "auto" | "flat" (exact) | "hnsw" | "ivf" | "ivfpq"; see services/document_index.py.
+    "index_type": "auto",
+    # Overrides for DEFAULT_INDEX_PARAMS, e.g. {"nprobe": 32, "ef_search": 128}.
+    "index_params": {},
+    "search_k": 4,                # Most chunks put in the context per question.
+    # Retrieval pipeline (services/retrieval.py): dense + BM25 candidates fused by reciprocal
+    # rank, MMR de-duplication, then a context capped at "context_max_tokens".
+    "hybrid_search": True,        # False = dense search only (still de-duplicated and budgeted).
+    "candidate_k": 20,            # Candidates per search before fusion.
+    "rrf_k": 60,                  # Reciprocal-rank fusion constant.
+    "mmr_diversity": 0.3,         # 0 = pure relevance, 1 = pure novelty.
+    "mmr_max_similarity": 0.8,    # Chunks this similar to a picked one are dropped.
+    "context_max_tokens": 800,    # Approximate tokens of context sent to the RAG agent.
+    # Optional local cross-encoder, e.g. "cross-encoder/ms-marco-MiniLM-L-6-v2" (needs
+    # sentence-transformers); it re-scores the best "rerank_candidates" fused chunks.
+    "reranker_model": None,
+    "rerank_candidates": 20,
+    "rerank_batch_size": 16,
+}
@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+# File: config/rendering.py
+# Description: Limits of the local answer renderer (see services/answer_renderer.py).
+
+# Results simple enough to phrase without the presentation agent: no rows, a single value or
+# row, a short list or a small table. Anything larger goes to the agent.
+ANSWER_RENDERER_CONFIG = {
+    "enabled": True,
+    "max_list_items": 10,
+    "max_table_rows": 10,
+    "max_table_columns": 6,
+}
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+# File: config/routing.py
+# Description: Intent examples and thresholds for services/router.py (database vs documents vs small talk).
+
+import os
+
+ROUTER_CONFIG = {
+    # A prompt goes to the intent whose centroid is most similar, if that similarity is at least
+    # "min_similarity" and beats the runner-up by "min_margin". Otherwise the keyword
+    # classifier decides, and "default_route" is used when that finds nothing either.
+    "min_similarity": 0.30,
+    "min_margin": 0.03,
+    "default_route": "database",
+    # Table/column names from the live catalog form an extra "database" centroid and extend
+    # the classifier's vocabulary. Large catalogs are capped at this many tables.
+    "use_catalog": True,
+    "catalog_max_tables": 200,
+    # Optional JSON file that keeps the centroids across restarts (keyed by the example texts).
+    "centroid_cache_file": os.getenv("ROUTER_CENTROID_CACHE"),
+    "small_talk_reply": ("Hi! I can answer questions about the database or about the documents "
+                         "you upload in the sidebar. What would you like to know?"),
+}
+
+# Example prompts per intent (EN and PT-BR). Each intent's centroid is the mean of their embeddings.
+ROUTE_EXAMPLES = {
+    "database": [
+        "How many rows are in this table?",
+        "List all tables in the database schema.",
+        "Which customers spent the most last month?",
+        "Show the ten most recent records sorted by date.",
+        "What is the average price per category?",
+        "Count the entries grouped by status.",
+        "Which products are low on stock?",
+        "Show me the columns of that table.",
+        "Write a SQL query that joins the two tables.",
+        "Who made the largest purchase?",
+        "Quantos registros existem na tabela?",
+        "Quais clientes compraram mais no último mês?",
+        "Liste as tabelas do banco de dados.",
+        "Qual é o preço médio por categoria?",
+        "Mostre os pedidos feitos nesta semana.",
+    ],
+    "documents": [
+        "What does the report say about revenue?",
+        "Summarize the uploaded document.",
+        "What were the main findings in the PDF?",
+        "According to the financial report, what was the net profit?",
+        "What risks are mentioned in the document?",
+        "What was the operating margin in the quarter?",
+        "Which section of the report discusses expenses?",
+        "What outlook does the report give for next year?",
+        "O que o relatório diz sobre a receita?",
+        "Resuma o documento enviado.",
+        "Qual foi o lucro líquido no trimestre segundo o relatório?",
+        "Quais riscos são mencionados no documento?",
+    ],
+    "small_talk": [
+        "Hi!",
+        "Hello, how are you?",
+        "Good morning",
+        "Thanks a lot!",
+        "Who are you?",
+        "What can you do?",
+        "Bye",
+        "Olá, tudo bem?",
+        "Bom dia",
+        "Obrigado!",
+        "O que você sabe fazer?",
+    ],
+}
+
+# Words the keyword classifier scores besides the example texts (accent-insensitive).
+ROUTE_KEYWORDS = {
+    "database": ["table", "tables", "database", "sql", "schema", "column", "row", "record", "query",
+                 "tabela", "banco", "coluna", "registro", "consulta"],
+    "documents": ["document", "report", "pdf", "page", "section", "quarter", "q1", "q2", "q3", "q4",
+                  "documento", "relatorio", "pagina", "secao", "trimestre"],
+    "small_talk": ["hi", "hello", "hey", "thanks", "thank", "bye", "ola", "oi", "obrigado",
+                   "obrigada", "tchau"],
+}
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+# File: config/security.py
+# Description: Blocked prompt phrases and SQL statement rules used by services/validation.py.
+
+import os
+
+REQUEST_VALIDATION_CONFIG = {
+    # Case-insensitive whole words, e.g. "update" but not "updated" or "updated_at".
+    "blocked_keywords": ["delete", "update", "insert", "drop", "alter", "truncate", "grant", "revoke"],
+    # Case-insensitive phrases (any whitespace between words) that must start a word but may
+    # run into a longer one: "roleplay" blocks "roleplaying", "act as" does not block "impact
+    # assessment". Keywords and phrases are compiled into one trie-shaped regex each, so
+    # adding phrases barely changes the cost per request.
+    "blocked_phrases": [
+        "ignore previous instructions", "ignore as instruções anteriores",
+        "act as", "aja como", "agir como",
+        "roleplay", "interprete o papel de",
+        "reveal your instructions", "revele suas instruções",
+    ],
+    # Extra regular expressions OR-ed into the same expression (each one adds to the cost).
+    "blocked_patterns": [],
+    # Optional JSON object with "blocked_keywords"/"blocked_phrases"/"blocked_patterns" lists
+    # replacing the ones above.
+    # It is re-read whenever it changes, so the lists can be edited without a restart.
+    "patterns_file": os.getenv("VALIDATION_PATTERNS_FILE"),
+    "reload_check_interval": 5.0,   # Seconds between checks of the file's modification time.
+}
+
+# Rules for agent-written SQL, checked on tokens, so identifiers such as created_at or
+# strings such as 'update' never match a keyword.
+SQL_VALIDATION_CONFIG = {
+    "allowed_statements": ["SELECT", "WITH"],
+    "forbidden_keywords": [
+        "INSERT", "UPDATE", "DELETE", "MERGE", "DROP", "CREATE", "ALTER", "TRUNCATE",
+        "GRANT", "REVOKE", "COPY", "INTO", "CALL", "LOCK", "VACUUM",
+    ],
+}
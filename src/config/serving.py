@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+# File: config/serving.py
+# Description: Production serving mode of the Agno Playground app (see playground.py --production).
+
+import os
+
+SERVING_CONFIG = {
+    "host": os.getenv("PLAYGROUND_HOST", "0.0.0.0"),
+    "port": int(os.getenv("PLAYGROUND_PORT", "7777")),
+    # Worker processes forked after the warm-up (0: one per CPU).
+    "workers": int(os.getenv("PLAYGROUND_WORKERS", "0")) or os.cpu_count() or 1,
+    # Per worker: agent runs in progress, and requests waiting for one. Requests beyond the
+    # queue, or waiting longer than queue_timeout, get 503 with Retry-After. Keep
+    # max_in_flight within POOL_CONFIG["max_size"] so runs do not wait for connections.
+    "max_in_flight": int(os.getenv("PLAYGROUND_MAX_IN_FLIGHT", "8")),
+    "max_queue": int(os.getenv("PLAYGROUND_MAX_QUEUE", "32")),
+    "queue_timeout": 30.0,
+    "agent_pool_size": 4,           # Prebuilt agents of each kind kept ready per worker.
+    "max_sessions": 500,            # Sessions (one agent each) kept per worker, least recently used first out.
+    "session_idle_seconds": 1800.0,
+    "readiness_check_interval": 5.0,  # Seconds a database check result is reused by /ready.
+    # Postgres URL (postgresql+psycopg://...) where agno stores sessions, so a conversation
+    # continues on any worker and the Playground lists past sessions. Without it, history
+    # lives in the worker that served the session.
+    "session_storage_url": os.getenv("PLAYGROUND_SESSION_DB_URL"),
+}
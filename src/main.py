@@ -6,17 +6,40 @@
 # Version: 1.0.0
 # Description: Object-oriented entry point for the Autonomous Database Analyst Agent.
 
+import argparse
+import asyncio
+import contextlib
+import contextvars
+import functools
 import json
 import logging
 import sys
-import re
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from decimal import Decimal
-from typing import Any, Dict
+from pathlib import Path
+from typing import Any, Callable, Dict, Generator, Iterator, List
 
 import psycopg2
 from dotenv import load_dotenv
 
-from agents.agent_factory import agent_factory
+from agents.agent_factory import (agent_factory, conversation_scope, count_model_turns, extract_executed_sql,
+                                  run_with_events)
+from agents.model_cascade import cascade_stats
+from config.batch import BATCH_CONFIG
+from config.cache import RESPONSE_CACHE_CONFIG
+from config.database import RESULT_SUMMARY_CONFIG
+from config.observability import TRACING_CONFIG
+from services.answer_renderer import AnswerRenderer
+from services.batch import BatchRunner, RateLimiter, format_summary, load_questions, rate_limit_agent
+from services.fast_path import FastAnswer, FastPath
+from services.resources import registry
+from services.response_cache import ResponseCache
+from services.result_set import ResultSet
+from services.tracing import isolated_context, tracer
+from services.validation import RequestValidator
+from tools.database_tools import (current_database, get_schema_catalog, run_read_only_query,
+                                  table_change_counters, use_database)
 
 
 class JsonDecimalEncoder(json.JSONEncoder):
@@ -28,78 +51,344 @@ class JsonDecimalEncoder(json.JSONEncoder):
         return super().default(obj)
 
 
-class RequestValidator:
-    """Validates user requests against a set of security patterns."""
-
-    def __init__(self):
-        self.forbidden_patterns = [
-            r'\b(delete|update|insert|drop|alter|truncate|grant|revoke)\b',
-            r'ignore previous instructions', r'ignore as instruções anteriores',
-            r'act as', r'aja como', r'agir como',
-            r'roleplay', r'interprete o papel de',
-            r'reveal your instructions', r'revele suas instruções'
-        ]
-
-    def is_safe(self, request: str) -> bool:
-        """Checks if the request is safe to process."""
-        for pattern in self.forbidden_patterns:
-            if re.search(pattern, request, re.IGNORECASE):
-                logging.error(
-                    f"Validation failed: Malicious pattern '{pattern}' detected in request.")
-                return False
+def build_response_cache(embedding_model: Any = None) -> ResponseCache:
+    """Creates a response cache wired to the database for SQL re-execution and change detection."""
+    return ResponseCache(
+        **RESPONSE_CACHE_CONFIG,
+        embedding_model=embedding_model,
+        sql_executor=run_read_only_query,
+        change_detector=table_change_counters,
+    )
+
+
+def remember_response(response_cache: ResponseCache, user_request: str, run_response: Any,
+                      scope: str | None = None) -> None:
+    """Stores a data-agent run (result, generated SQL and the tables it reads) in the cache."""
+    sql = extract_executed_sql(run_response)
+    tables = []
+    if sql:
+        try:
+            tables = get_schema_catalog().referenced_tables(sql)
+        except psycopg2.Error as e:
+            logging.warning(f"Could not resolve tables for caching: {e}")
+    response_cache.put(user_request, run_response.content,
+                       sql=sql, tables=tables, scope=scope)
+
+
+def fast_path_answer(fast_path: FastPath | None, response_cache: ResponseCache | None,
+                     user_request: str, scope: str | None = None) -> FastAnswer | None:
+    """Answers a templated request without the data agent and caches it like an agent run."""
+    if fast_path is None:
+        return None
+    with tracer.span("fast_path") as span:
+        answer = fast_path.answer(user_request)
+        span.set(hit=answer is not None, intent=answer.intent if answer else "")
+    if answer is not None and response_cache is not None:
+        response_cache.put(user_request, answer.data, sql=answer.sql, tables=answer.tables, scope=scope)
+    return answer
+
+
+def render_answer(answer_renderer: AnswerRenderer | None, raw_data: Any, user_request: str) -> str | None:
+    """Phrases a simple result locally, or returns ``None`` when the presentation agent is needed."""
+    if answer_renderer is None:
+        return None
+    with tracer.span("answer.render") as span:
+        answer = answer_renderer.render(raw_data, user_request)
+        span.set(local=answer is not None)
+    if answer is not None:
+        logging.info("Simple result; answered without the Presentation Agent.")
+    return answer
+
+
+def build_presentation_prompt(raw_data: Any, user_request: str) -> str:
+    """Builds the prompt that asks the presentation agent to phrase the data.
+
+    Tabular results are sent whole when small and as a bounded summary otherwise.
+    """
+    with tracer.span("serialize.presentation_prompt") as span:
+        table = ResultSet.from_payload(raw_data)
+        if table is not None:
+            data = table.for_prompt(**RESULT_SUMMARY_CONFIG)
+            span.set(rows=len(table))
+        else:
+            data = json.dumps(raw_data, cls=JsonDecimalEncoder)
+        prompt = (
+            f"Here is the data: {data}\n\n"
+            f"Based on this data, please answer the user's original question: '{user_request}'"
+        )
+        span.set(bytes=len(prompt))
+    return prompt
+
+
+def text_event(text: str) -> Dict[str, str]:
+    """A stream event carrying (a chunk of) the answer."""
+    return {"type": "token", "text": text}
+
+
+def is_error_answer(answer: str) -> bool:
+    """Whether an orchestrator answer reports a failure (blocked, invalid, timed out or an error)."""
+    if answer.startswith(("A database error occurred:", "An unexpected error occurred:")):
         return True
+    if answer.startswith("{"):
+        try:
+            return "error" in json.loads(answer)
+        except ValueError:
+            return False
+    return False
+
+
+def serialize_result(raw_data: Any) -> str:
+    """Serializes raw data for JSON output."""
+    with tracer.span("serialize.result") as span:
+        table = ResultSet.from_payload(raw_data)
+        if table is not None:
+            result = table.to_json()
+        else:
+            result = json.dumps(raw_data, indent=2, ensure_ascii=False, cls=JsonDecimalEncoder)
+        span.set(bytes=len(result))
+    return result
 
 
 class AgentOrchestrator:
     """Orchestrates the interaction between the user and the AI agents."""
 
-    def __init__(self, data_agent, presentation_agent, validator):
+    def __init__(self, data_agent, presentation_agent, validator, response_cache: ResponseCache | None = None,
+                 fast_path: FastPath | None = None, answer_renderer: AnswerRenderer | None = None):
         self.data_agent = data_agent
         self.presentation_agent = presentation_agent
         self.validator = validator
+        self.response_cache = response_cache
+        self.fast_path = fast_path
+        self.answer_renderer = answer_renderer
+        self.last_model_turns = 0
+
+    @property
+    def _cache(self) -> ResponseCache | None:
+        # Cached answers belong to the default database; tenant requests bypass the cache.
+        return self.response_cache if current_database() is None else None
+
+    def _get_raw_data(self, user_request: str, stream: bool = False,
+                      scope: str | None = None) -> Generator[Dict[str, Any], None, Any]:
+        """Engages the data agent to fetch raw data from the database (tool events only).
 
-    def _get_raw_data(self, user_request: str) -> Dict[str, Any] | str:
-        """Engages the data agent to fetch raw data from the database."""
+        Templated requests are answered by the fast path instead, without any model turn.
+        """
+        fast = fast_path_answer(self.fast_path, self._cache, user_request, scope)
+        if fast is not None:
+            self.last_model_turns = 0
+            return fast.data
         logging.info("Engaging Data Analyst Agent to fetch data...")
-        response = self.data_agent.run(user_request)
+        started = time.perf_counter()
+        response = yield from run_with_events(self.data_agent, user_request, stream, emit_tokens=False)
+        self.last_model_turns = count_model_turns(response)
+        logging.info(
+            f"Data Analyst Agent finished in {self.last_model_turns} model turn(s).")
+        if self.fast_path is not None:
+            self.fast_path.record_agent(time.perf_counter() - started, self.last_model_turns)
+        if self._cache is not None:
+            remember_response(self._cache, user_request, response, scope)
         return response.content
 
-    def _get_conversational_response(self, raw_data: Any, user_request: str) -> str:
+    def _get_cached_response(self, user_request: str, scope: str | None = None) -> Dict[str, Any] | None:
+        """Looks the request up in the response cache, if one is configured."""
+        if self._cache is None:
+            return None
+        with tracer.span("cache.lookup") as span:
+            cached = self._cache.get(user_request, scope)
+            span.set(hit=cached is not None)
+        if cached is not None:
+            logging.info(
+                f"Response cache hit ({cached['source']}); skipping the Data Analyst Agent.")
+        return cached
+
+    def _get_conversational_response(self, raw_data: Any, user_request: str,
+                                     stream: bool = False) -> Generator[Dict[str, Any], None, str]:
         """Engages the presentation agent to format data into a friendly response."""
         logging.info(
             "Conversational output requested. Engaging Presentation Agent...")
-        presentation_prompt = (
-            f"Here is the data: {json.dumps(raw_data, cls=JsonDecimalEncoder)}\n\n"
-            f"Based on this data, please answer the user's original question: '{user_request}'"
-        )
-        response = self.presentation_agent.run(presentation_prompt)
+        presentation_prompt = build_presentation_prompt(raw_data, user_request)
+        response = yield from run_with_events(self.presentation_agent, presentation_prompt, stream)
+        if not stream:
+            yield text_event(response.content)
         return response.content
 
-    def run(self, user_request: str) -> str:
+    def run(self, user_request: str, database: str | None = None) -> str:
         """
         Executes the main application logic and returns the final response as a string.
+        ``database`` selects one of the configured ``DATABASES`` for this request.
         """
+        with use_database(database), tracer.span("orchestrator.run", profile=True,
+                                                  request_chars=len(user_request),
+                                                  database=database or "default"):
+            return "".join(event["text"] for event in self._answer(user_request, stream=False)
+                           if event["type"] == "token")
+
+    @isolated_context
+    def stream(self, user_request: str, database: str | None = None) -> Iterator[Dict[str, Any]]:
+        """Like :meth:`run`, but yields the answer as it is generated.
+
+        Events are ``{"type": "token", "text": ...}`` chunks of the answer and
+        ``{"type": "tool_started" | "tool_completed", "tool": ..., "args": ...}`` while the
+        data agent works. The time to the first answer token is recorded on the trace.
+        """
+        with use_database(database), tracer.span("orchestrator.run", profile=True,
+                                                  request_chars=len(user_request),
+                                                  database=database or "default", stream=True) as span:
+            for event in self._answer(user_request, stream=True):
+                if event["type"] == "token":
+                    span.mark("time_to_first_token")
+                yield event
+
+    def _answer(self, user_request: str, stream: bool) -> Iterator[Dict[str, Any]]:
         logging.info(f"User Request: {user_request}")
 
-        if not self.validator.is_safe(user_request):
-            return json.dumps({"error": "The user request was blocked by the security filter."}, indent=2)
+        with tracer.span("validation"):
+            safe = self.validator.is_safe(user_request)
+        if not safe:
+            yield text_event(json.dumps({"error": "The user request was blocked by the security filter."}, indent=2))
+            return
 
         logging.info("User request passed security validation.")
         logging.info("-" * 20)
 
         try:
-            raw_data = self._get_raw_data(user_request)
+            # Follow-ups may refer to earlier turns, so they are cached for this conversation only.
+            scope = conversation_scope(self.data_agent)
+            cached = self._get_cached_response(user_request, scope)
+            raw_data = cached["data"] if cached else (yield from self._get_raw_data(user_request, stream, scope))
 
             if raw_data == "INVALID_REQUEST":
                 logging.warning(
                     "Data Analyst Agent deemed the request invalid.")
-                return json.dumps({"error": "Request was deemed invalid by the data agent."}, indent=2)
+                yield text_event(json.dumps({"error": "Request was deemed invalid by the data agent."}, indent=2))
+                return
 
             if "json" in user_request.lower():
                 logging.info("JSON output requested. Returning raw data.")
-                return json.dumps(raw_data, indent=2, ensure_ascii=False, cls=JsonDecimalEncoder)
+                yield text_event(serialize_result(raw_data))
+                return
+            if cached and cached["answer"]:
+                yield text_event(cached["answer"])
+                return
+
+            answer = render_answer(self.answer_renderer, raw_data, user_request)
+            if answer is not None:
+                yield text_event(answer)
             else:
-                return self._get_conversational_response(raw_data, user_request)
+                answer = yield from self._get_conversational_response(raw_data, user_request, stream)
+            if self._cache is not None:
+                self._cache.set_answer(user_request, answer, scope)
+
+        except (psycopg2.Error, ConnectionError, ValueError) as e:
+            logging.error(f"An operational error occurred: {e}")
+            yield text_event(f"A database error occurred: {e}")
+        except Exception as e:
+            logging.error(f"An unexpected error occurred: {e}", exc_info=True)
+            yield text_event(f"An unexpected error occurred: {e}")
+
+
+class AsyncAgentOrchestrator:
+    """An asyncio variant of :class:`AgentOrchestrator` that serves many requests concurrently.
+
+    Agents keep per-run state, so every request gets fresh agents from the given factories.
+    The data agent's tools use blocking psycopg2 calls, so its run is offloaded to a
+    dedicated thread pool (backed by the shared connection pool); the presentation agent
+    has no tools and uses the native ``arun`` API. ``max_concurrency`` bounds in-flight
+    requests and ``request_timeout`` bounds each one. A timed-out or cancelled request
+    returns immediately; a data-agent thread already running finishes in the background and
+    keeps the request's slot until then, so queued requests never wait on a busy pool.
+    """
+
+    def __init__(self, data_agent_factory: Callable[[], Any], presentation_agent_factory: Callable[[], Any],
+                 validator: "RequestValidator", response_cache: ResponseCache | None = None,
+                 max_concurrency: int = 8, request_timeout: float = 120.0, fast_path: FastPath | None = None,
+                 answer_renderer: AnswerRenderer | None = None):
+        self.data_agent_factory = data_agent_factory
+        self.presentation_agent_factory = presentation_agent_factory
+        self.validator = validator
+        self.response_cache = response_cache
+        self.fast_path = fast_path
+        self.answer_renderer = answer_renderer
+        self.max_concurrency = max_concurrency
+        self.request_timeout = request_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="data-agent")
+        # The worker-thread future a request is currently waiting on (one at a time).
+        self._running: contextvars.ContextVar[List[Future]] = contextvars.ContextVar("running")
+
+    @property
+    def _cache(self) -> ResponseCache | None:
+        # Cached answers belong to the default database; tenant requests bypass the cache.
+        return self.response_cache if current_database() is None else None
+
+    async def _in_thread(self, func: Callable, *args: Any) -> Any:
+        # Carry the current trace into the worker thread.
+        context = contextvars.copy_context()
+        future = self._executor.submit(functools.partial(context.run, func, *args))
+        self._running.get([]).append(future)
+        return await asyncio.wrap_future(future)
+
+    async def _get_raw_data(self, user_request: str) -> Dict[str, Any] | str:
+        """Runs a fresh data agent in the worker pool, unless the fast path answers the request."""
+        if self.fast_path is not None:
+            fast = await self._in_thread(fast_path_answer, self.fast_path, self._cache, user_request)
+            if fast is not None:
+                return fast.data
+        logging.info("Engaging Data Analyst Agent to fetch data...")
+        started = time.perf_counter()
+        response = await self._in_thread(self.data_agent_factory().run, user_request)
+        model_turns = count_model_turns(response)
+        logging.info(
+            f"Data Analyst Agent finished in {model_turns} model turn(s).")
+        if self.fast_path is not None:
+            self.fast_path.record_agent(time.perf_counter() - started, model_turns)
+        if self._cache is not None:
+            await self._in_thread(remember_response, self._cache, user_request, response)
+        return response.content
+
+    async def _get_conversational_response(self, raw_data: Any, user_request: str) -> str:
+        """Runs a fresh presentation agent with the async API."""
+        logging.info(
+            "Conversational output requested. Engaging Presentation Agent...")
+        response = await self.presentation_agent_factory().arun(
+            build_presentation_prompt(raw_data, user_request))
+        return response.content
+
+    async def _run(self, user_request: str, database: str | None) -> str:
+        with use_database(database), tracer.span("orchestrator.run", profile=True,
+                                                  request_chars=len(user_request),
+                                                  database=database or "default"):
+            return await self._answer(user_request)
+
+    async def _answer(self, user_request: str) -> str:
+        logging.info(f"User Request: {user_request}")
+
+        with tracer.span("validation"):
+            safe = self.validator.is_safe(user_request)
+        if not safe:
+            return json.dumps({"error": "The user request was blocked by the security filter."}, indent=2)
+
+        try:
+            cached = await self._in_thread(self._cache.get, user_request) \
+                if self._cache is not None else None
+            raw_data = cached["data"] if cached else await self._get_raw_data(user_request)
+
+            if raw_data == "INVALID_REQUEST":
+                logging.warning(
+                    "Data Analyst Agent deemed the request invalid.")
+                return json.dumps({"error": "Request was deemed invalid by the data agent."}, indent=2)
+
+            if "json" in user_request.lower():
+                return serialize_result(raw_data)
+            if cached and cached["answer"]:
+                return cached["answer"]
+
+            answer = render_answer(self.answer_renderer, raw_data, user_request) \
+                or await self._get_conversational_response(raw_data, user_request)
+            if self._cache is not None:
+                self._cache.set_answer(user_request, answer)
+            return answer
 
         except (psycopg2.Error, ConnectionError, ValueError) as e:
             logging.error(f"An operational error occurred: {e}")
@@ -108,6 +397,120 @@ class AgentOrchestrator:
             logging.error(f"An unexpected error occurred: {e}", exc_info=True)
             return f"An unexpected error occurred: {e}"
 
+    async def run(self, user_request: str, timeout: float | None = None, database: str | None = None) -> str:
+        """Answers one request, waiting for a concurrency slot and enforcing the timeout."""
+        timeout = timeout or self.request_timeout
+        await self._semaphore.acquire()
+        running: List[Future] = []
+        self._running.set(running)
+        try:
+            return await asyncio.wait_for(self._run(user_request, database), timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"Request timed out after {timeout}s.")
+            return json.dumps({"error": f"The request timed out after {timeout} seconds."}, indent=2)
+        finally:
+            # A timed-out run's thread is still busy: free the slot only when it has finished.
+            busy = next((future for future in running if not future.done()), None)
+            if busy is None:
+                self._semaphore.release()
+            else:
+                loop = asyncio.get_running_loop()
+                busy.add_done_callback(lambda _: loop.call_soon_threadsafe(self._semaphore.release))
+
+    async def run_many(self, user_requests: List[str], database: str | None = None) -> List[str]:
+        """Answers several requests concurrently, preserving their order."""
+        return await asyncio.gather(*(self.run(request, database=database) for request in user_requests))
+
+    def close(self) -> None:
+        """Stops the worker threads."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# The CLI caches exact repeats only; the Streamlit app adds embedding similarity.
+registry.register("response_cache", build_response_cache)
+
+
+def print_stream(events: Iterator[Dict[str, Any]]) -> str:
+    """Prints the answer as it streams in, logging tool calls and the time to first token."""
+    started = time.perf_counter()
+    first_token = None
+    chunks = []
+    for event in events:
+        if event["type"] == "tool_started":
+            logging.info(f"Running tool {event['tool']}...")
+        elif event["type"] == "token":
+            if first_token is None:
+                first_token = time.perf_counter() - started
+            chunks.append(event["text"])
+            print(event["text"], end="", flush=True)
+    print()
+    if first_token is not None:
+        logging.info(f"Time to first token: {first_token:.2f}s")
+    return "".join(chunks)
+
+
+def run_batch(input_path: str, output_path: str, concurrency: int, requests_per_minute: float) -> Dict[str, Any]:
+    """Answers every question of ``input_path`` (JSONL or CSV) and appends the results to ``output_path``.
+
+    Questions run concurrently on an :class:`AsyncAgentOrchestrator` whose agents share one
+    Groq rate limiter. The schema catalog of every database in the batch is loaded once and
+    pinned for the whole run. See :class:`services.batch.BatchRunner` for deduplication and resuming.
+    """
+    questions = load_questions(input_path)
+    limiter = RateLimiter(requests_per_minute, BATCH_CONFIG["burst"])
+    orchestrator = AsyncAgentOrchestrator(
+        data_agent_factory=lambda: rate_limit_agent(agent_factory.create_data_analyst_agent(), limiter),
+        presentation_agent_factory=lambda: rate_limit_agent(agent_factory.create_presentation_agent(), limiter),
+        validator=RequestValidator(),
+        response_cache=registry.get("response_cache"),
+        max_concurrency=concurrency,
+        request_timeout=BATCH_CONFIG["request_timeout"],
+        fast_path=registry.get("fast_path"),
+        answer_renderer=registry.get("answer_renderer"),
+    )
+    runner = BatchRunner(lambda question, database: orchestrator.run(question, database=database),
+                         concurrency=concurrency, is_error=is_error_answer)
+    logging.info(f"Batch: {len(questions)} question(s) from {input_path}, {concurrency} at a time, "
+                 f"{requests_per_minute:g} model calls/min.")
+    try:
+        with contextlib.ExitStack() as pins:
+            for database in sorted({q.database for q in questions}, key=lambda name: name or ""):
+                try:
+                    pins.enter_context(get_schema_catalog(database).pinned())
+                except Exception as e:
+                    logging.warning(f"Could not preload the schema catalog of {database or 'the default database'}: {e}")
+            summary = asyncio.run(runner.run(questions, output_path))
+    finally:
+        orchestrator.close()
+    print(format_summary(summary, limiter))
+    if orchestrator.fast_path is not None:
+        stats = orchestrator.fast_path.stats()
+        saved = stats.get("estimated_seconds_saved")
+        print(f"Fast path: {stats['hits']}/{stats['lookups']} answered without the agent "
+              f"({stats['hit_rate']:.0%}, {stats['avg_fast_ms']:.0f} ms each)"
+              + (f", ~{saved:.0f}s saved" if saved is not None else ""))
+    if orchestrator.answer_renderer is not None:
+        stats = orchestrator.answer_renderer.stats()
+        print(f"Answer renderer: {stats['rendered']} presentation call(s) avoided, "
+              f"{stats['delegated']} delegated ({stats['avoided_ratio']:.0%} avoided)")
+    for model_id, tier in cascade_stats.tiers().items():
+        print(f"Model {model_id}: {tier['accepted']}/{tier['attempts']} attempts accepted, "
+              f"{tier['seconds'] / tier['attempts']:.2f}s each")
+    return summary
+
+
+def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Autonomous Database Analyst Agent.")
+    parser.add_argument("request", nargs="?", help="Question to answer (streamed to stdout).")
+    parser.add_argument("--batch", metavar="FILE", help="Answer the questions of a JSONL or CSV file instead.")
+    parser.add_argument("--output", metavar="FILE",
+                        help="JSONL results of --batch (default: <batch file>.results.jsonl); "
+                             "an existing file is resumed.")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONFIG["concurrency"])
+    parser.add_argument("--requests-per-minute", type=float, default=BATCH_CONFIG["requests_per_minute"],
+                        help="Groq model calls per minute across the batch.")
+    return parser.parse_args(argv)
+
 
 def setup_logging():
     """Configures the application's logging."""
@@ -122,13 +525,28 @@ if __name__ == "__main__":
     load_dotenv()
     setup_logging()
 
-    validator = RequestValidator()
-    orchestrator = AgentOrchestrator(
-        data_agent=agent_factory.create_data_analyst_agent(),
-        presentation_agent=agent_factory.create_presentation_agent(),
-        validator=validator
-    )
+    if TRACING_CONFIG["metrics_port"]:
+        registry.get("metrics_exporter")
+
+    args = parse_args()
+    if args.batch:
+        output = args.output or str(Path(args.batch).with_suffix(".results.jsonl"))
+        run_batch(args.batch, output, args.concurrency, args.requests_per_minute)
+    else:
+        validator = RequestValidator()
+        orchestrator = AgentOrchestrator(
+            data_agent=registry.get("data_analyst_agent"),
+            presentation_agent=registry.get("presentation_agent"),
+            validator=validator,
+            response_cache=registry.get("response_cache"),
+            fast_path=registry.get("fast_path"),
+            answer_renderer=registry.get("answer_renderer"),
+        )
+
+        request = args.request or ("What are the top 3 most expensive products in the database? "
+                                   "Please provide the results in JSON format only.")
+        print_stream(orchestrator.stream(request))
 
-    request = "What are the top 3 most expensive products in the database? Please provide the results in JSON format only."
-    result = orchestrator.run(request)
-    print(result)
+    if TRACING_CONFIG["trace_dump_path"]:
+        tracer.dump(TRACING_CONFIG["trace_dump_path"])
+        logging.info(f"Traces written to {TRACING_CONFIG['trace_dump_path']}")
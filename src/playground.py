@@ -1,13 +1,21 @@
 # -*- coding: utf-8 -*-
 # File: playground.py
 # Description: Starts the Agno Playground UI using the AgentFactory.
+#
+# Usage (from src/):
+#   python playground.py                 # development: one process, auto-reload, shared agents
+#   python playground.py --production    # workers, per-session agents, backpressure, /health and /ready
 
+import argparse
 import logging
 import sys
+from typing import Any, Callable, Tuple
+
 from dotenv import load_dotenv
 
 from agno.playground import Playground, serve_playground_app
-from agents.agent_factory import agent_factory
+from config.serving import SERVING_CONFIG
+from services.resources import registry
 
 # --- Setup ---
 load_dotenv()
@@ -18,29 +26,139 @@ logging.basicConfig(
     stream=sys.stdout,
 )
 
-# --- Global App Definition ---
-# Create agent instances from the factory at the module level.
-data_analyst_agent = agent_factory.create_data_analyst_agent()
-presentation_agent = agent_factory.create_presentation_agent()
+# Agents keep the same ids in every worker process, so the UI can list them on one worker and
+# run them on another.
+_APP_ID = "pgagent-playground"
+
+
+def create_dev_app() -> Any:
+    """The development app: every user shares one agent of each kind (and its history)."""
+    # Agents come from the shared resource registry; the DB pool is warmed up before serving.
+    data_analyst_agent = registry.get("data_analyst_agent")
+    presentation_agent = registry.get("presentation_agent")
+    registry.warm_up("db_manager")
+
+    # Define the list of agents to be served.
+    agents_for_playground = [
+        data_analyst_agent,
+        presentation_agent
+    ]
+
+    # Create the Playground instance and its app.
+    playground = Playground(agents=agents_for_playground)
+    return playground.get_app()
+
+
+def __getattr__(name: str) -> Any:
+    # ``uvicorn playground:app`` keeps working; importing this module no longer builds agents.
+    if name == "app":
+        globals()["app"] = create_dev_app()
+        return globals()["app"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-# Define the list of agents to be served.
-agents_for_playground = [
-    data_analyst_agent,
-    presentation_agent
-]
 
-# Create the Playground instance.
-playground = Playground(agents=agents_for_playground)
+def _session_storage() -> Any:
+    url = SERVING_CONFIG["session_storage_url"]
+    if not url:
+        return None
+    from agno.storage.postgres import PostgresStorage
+    return PostgresStorage(table_name="playground_sessions", db_url=url, auto_upgrade_schema=True)
 
-# Define the 'app' variable at the global scope so the server can find it.
-app = playground.get_app()
+
+def _serving_agent(create: Callable[[], Any], storage: Any) -> Any:
+    from agno.app.utils import generate_id
+
+    agent = create()
+    agent.agent_id = generate_id(agent.name)
+    agent.app_id = _APP_ID
+    agent.store_events = True  # The Playground UI renders tool calls from stored events.
+    if storage is not None:
+        agent.storage = storage
+    return agent
+
+
+def _check_database() -> None:
+    from tools.database_tools import db_manager
+    with db_manager.get_connection(read_only=True) as conn, conn.cursor() as cursor:
+        cursor.execute("SELECT 1")
+
+
+def create_production_app() -> Tuple[Any, Callable[[], None], Callable[[], None]]:
+    """The production app, with the ``before_fork`` and ``after_fork`` hooks of :func:`services.serving.serve_prefork`.
+
+    Each Playground session runs on its own agent, taken from a pool of prebuilt agents per
+    agent kind; the agents listed by the UI are templates that never run.
+    """
+    import functools
+
+    import psycopg2
+    from fastapi import FastAPI
+
+    from agents.agent_factory import agent_factory
+    from services.agent_pool import AgentPool, SessionAgents
+    from services.serving import AdmissionController, Readiness, add_serving_routes
+    from tools.database_tools import db_manager, get_schema_catalog, schema_catalog
+
+    storage = _session_storage()
+    templates, pools = [], {}
+    for create in (agent_factory.create_data_analyst_agent, agent_factory.create_presentation_agent):
+        factory = functools.partial(_serving_agent, create, storage)
+        template = factory()
+        templates.append(template)
+        pools[template.agent_id] = AgentPool(factory, size=SERVING_CONFIG["agent_pool_size"])
+    sessions = SessionAgents(pools, max_sessions=SERVING_CONFIG["max_sessions"],
+                             idle_seconds=SERVING_CONFIG["session_idle_seconds"])
+    admission = AdmissionController(max_in_flight=SERVING_CONFIG["max_in_flight"],
+                                    max_queue=SERVING_CONFIG["max_queue"],
+                                    queue_timeout=SERVING_CONFIG["queue_timeout"])
+    readiness = Readiness(_check_database, interval=SERVING_CONFIG["readiness_check_interval"])
+
+    api_app = FastAPI(title="Autonomous Database Analyst")
+    # Added before the Playground's own routes, so its run route is served by the session agents.
+    add_serving_routes(api_app, sessions, admission, readiness)
+    app = Playground(agents=templates, api_app=api_app, app_id=_APP_ID).get_app()
+
+    def before_fork() -> None:
+        """Loads what the workers share: prebuilt agents and the schema catalog."""
+        schema_catalog.stop_listener()
+        for pool in pools.values():
+            pool.fill()
+        try:
+            get_schema_catalog().snapshot()
+        except psycopg2.Error as e:
+            logging.warning(f"Could not preload the schema catalog: {e}")
+        db_manager.close()
+
+    def after_fork() -> None:
+        """Opens the worker's own connections and background threads."""
+        db_manager.reset_after_fork()
+        registry.warm_up("db_manager")
+        schema_catalog.start_listener()
+        readiness.mark_warm()
+
+    return app, before_fork, after_fork
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Agno Playground UI for the database analyst agents.")
+    parser.add_argument("--production", action="store_true",
+                        help="Serve with worker processes and per-session agents (see config/serving.py).")
+    parser.add_argument("--host", default=None)
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=SERVING_CONFIG["workers"])
+    return parser.parse_args(argv)
 
 
 # --- Main execution block to run the web server ---
 if __name__ == "__main__":
-    """
-    This block is executed when the script is run directly.
-    It starts the web server to serve the globally defined 'app' object.
-    """
-    logging.info("Starting Agno Playground UI at http://localhost:7777")
-    serve_playground_app("playground:app", reload=True, port=7777)
+    args = parse_args()
+    if args.production:
+        from services.serving import serve_prefork
+
+        app, before_fork, after_fork = create_production_app()
+        serve_prefork(app, host=args.host or SERVING_CONFIG["host"], port=args.port or SERVING_CONFIG["port"],
+                      workers=args.workers, before_fork=before_fork, after_fork=after_fork)
+    else:
+        logging.info("Starting Agno Playground UI at http://localhost:7777")
+        serve_playground_app("playground:create_dev_app", factory=True, reload=True,
+                             host=args.host or "localhost", port=args.port or 7777)
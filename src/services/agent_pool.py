@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+# File: services/agent_pool.py
+# Description: Prebuilt agent pools and per-session agent leases for serving many users at once.
+
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, List
+
+
+class AgentPool:
+    """Keeps ``size`` freshly built agents ready, so a new session does not wait for one.
+
+    :meth:`take` hands out a prebuilt agent (or builds one when the pool is empty) and refills
+    the pool in a background thread. Agents are never returned: a used agent carries a
+    session's history, so it is dropped with its session.
+    """
+
+    def __init__(self, factory: Callable[[], Any], size: int = 4):
+        self.factory = factory
+        self.size = size
+        self._agents: Deque[Any] = deque()
+        self._lock = threading.Lock()
+        self._refilling = False
+        self._stats = {"taken": 0, "built": 0, "misses": 0, "build_errors": 0}
+
+    def _build(self) -> Any:
+        agent = self.factory()
+        with self._lock:
+            self._stats["built"] += 1
+        return agent
+
+    def fill(self) -> None:
+        """Builds agents until the pool holds ``size`` of them."""
+        while True:
+            with self._lock:
+                if len(self._agents) >= self.size:
+                    return
+            try:
+                agent = self._build()
+            except Exception as e:
+                with self._lock:
+                    self._stats["build_errors"] += 1
+                logging.error(f"Could not build a pooled agent: {e}")
+                return
+            with self._lock:
+                self._agents.append(agent)
+
+    def _refill(self) -> None:
+        try:
+            self.fill()
+        finally:
+            with self._lock:
+                self._refilling = False
+
+    def take(self) -> Any:
+        """A fresh agent, from the pool when one is ready."""
+        with self._lock:
+            self._stats["taken"] += 1
+            agent = self._agents.popleft() if self._agents else None
+            if agent is None:
+                self._stats["misses"] += 1
+            start_refill = not self._refilling
+            self._refilling = True
+        if start_refill:
+            threading.Thread(target=self._refill, name="agent-pool-refill", daemon=True).start()
+        return agent if agent is not None else self._build()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "ready": len(self._agents)}
+
+
+class AgentSession:
+    """The agent serving one session. ``lock`` serializes the session's runs on it."""
+
+    def __init__(self, agent: Any):
+        self.agent = agent
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+
+
+class SessionAgents:
+    """Gives every (agent id, session id) its own agent, taken from the pool of that agent id.
+
+    Sessions idle for ``idle_seconds`` are dropped, and the least recently used ones once
+    there are more than ``max_sessions``; a session that is running is never dropped. A
+    dropped session that comes back starts on a fresh agent (with its history, when the
+    agents use agno storage).
+    """
+
+    def __init__(self, pools: Dict[str, AgentPool], max_sessions: int = 500, idle_seconds: float = 1800.0):
+        self.pools = pools
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self._sessions: "OrderedDict[tuple[str, str], AgentSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"created": 0, "expired": 0, "evicted": 0}
+
+    @property
+    def agent_ids(self) -> List[str]:
+        return list(self.pools)
+
+    def lease(self, agent_id: str, session_id: str) -> AgentSession:
+        """The session's agent, taken from the pool on first use. Raises ``KeyError`` for unknown agents."""
+        pool = self.pools[agent_id]
+        key = (agent_id, session_id)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is not None:
+                self._sessions.move_to_end(key)
+                session.last_used = time.monotonic()
+                return session
+        created = AgentSession(pool.take())
+        with self._lock:
+            # A concurrent first request of the same session may have won the race.
+            session = self._sessions.setdefault(key, created)
+            self._sessions.move_to_end(key)
+            if session is created:
+                self._stats["created"] += 1
+                self._evict()
+        return session
+
+    def _evict(self) -> None:
+        """Drops idle and surplus sessions. Must be called with the lock held."""
+        now = time.monotonic()
+        for key, session in list(self._sessions.items()):
+            over = len(self._sessions) > self.max_sessions
+            idle = now - session.last_used > self.idle_seconds
+            if not over and not idle:
+                break
+            if session.lock.locked():
+                continue
+            del self._sessions[key]
+            self._stats["expired" if idle else "evicted"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = {**self._stats, "active": len(self._sessions)}
+        for agent_id, pool in self.pools.items():
+            stats.update({f"{agent_id}_pool_{key}": value for key, value in pool.stats().items()})
+        return stats
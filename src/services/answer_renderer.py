@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+# File: services/answer_renderer.py
+# Description: Phrases simple query results (scalar, single row, short list, small table) without the
+#              presentation agent.
+
+import datetime
+import json
+import re
+import threading
+import unicodedata
+from decimal import Decimal
+from typing import Any, Dict, List
+
+from services.result_set import ResultSet
+
+# A few frequent PT-BR words; questions using them get the PT-BR templates.
+_PORTUGUESE = frozenset("quantos quantas qual quais liste mostre mostre-me existem foram sao esta estao "
+                        "cliente clientes pedido pedidos itens preco mais total".split())
+_WORD = re.compile(r"[a-z\-]+")
+# Integer columns whose values are labels, not quantities: printed without thousands separators
+# ("order 10045 in 2024", not "order 10,045 in 2,024"). Matched on the column name's last word.
+_IDENTIFIER_COLUMN = re.compile(r"(?:^|_)(?:ids?|key|code|codigo|cod|year|ano|zip|zipcode|cep|number|numero|"
+                                r"num|nr|no|phone|telefone|sku|ean|isbn|cpf|cnpj)$|^id_", re.IGNORECASE)
+_TEMPLATES = {
+    "en": {"empty": "No results were found for this question.",
+           "scalar": "The {label} is **{value}**.",
+           "row": "I found one matching result:",
+           "list": "I found {count} results:",
+           "table": "Here are the {count} results I found:"},
+    "pt": {"empty": "Nenhum resultado foi encontrado para esta pergunta.",
+           "scalar": "O resultado ({label}) é **{value}**.",
+           "row": "Encontrei um resultado:",
+           "list": "Encontrei {count} resultados:",
+           "table": "Aqui estão os {count} resultados encontrados:"},
+}
+
+
+def _language(question: str) -> str:
+    text = unicodedata.normalize("NFKD", question.lower()).encode("ascii", "ignore").decode("ascii")
+    return "pt" if len(_PORTUGUESE.intersection(_WORD.findall(text))) >= 2 else "en"
+
+
+def _label(column: str) -> str:
+    return column.replace("_", " ").strip() or "result"
+
+
+def _string_list(raw_data: Any) -> List[str] | None:
+    """``raw_data`` as a list of strings (e.g. table names, also as JSON text), else ``None``."""
+    if isinstance(raw_data, str) and raw_data.strip().startswith("["):
+        try:
+            raw_data = json.loads(raw_data)
+        except ValueError:
+            return None
+    if isinstance(raw_data, list) and all(isinstance(item, str) for item in raw_data):
+        return raw_data
+    return None
+
+
+def _value(value: Any, column: str = "") -> str:
+    if value is None:
+        return "-"
+    if isinstance(value, bool):
+        return str(value).lower()
+    if isinstance(value, int):
+        return str(value) if _IDENTIFIER_COLUMN.search(column) else f"{value:,}"
+    if isinstance(value, (float, Decimal)):
+        # Results hold NUMERIC columns as floats. Amounts keep their cents; values below 1 keep
+        # three significant digits, so a rate of 0.0012 is not shown as 0.00.
+        value = float(value)
+        if value.is_integer():
+            return f"{value:,.0f}"
+        return f"{value:,.2f}" if abs(value) >= 1 else f"{value:.3g}"
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value)
+
+
+class AnswerRenderer:
+    """Turns simple results into a final answer locally, so the presentation agent is not called.
+
+    Handled shapes: no rows, a single value (``[{"count": 5}]``), a single row of at most
+    ``max_table_columns`` columns, a list of at most ``max_list_items`` values (one column,
+    or a list of strings such as table names) and a table of at most ``max_table_rows`` rows
+    and ``max_table_columns`` columns. Truncated or larger results, and anything that is not
+    a result, are left to the agent (:meth:`render` returns ``None``). Answers use PT-BR
+    templates for questions that look Portuguese and English otherwise.
+    """
+
+    def __init__(self, max_list_items: int = 10, max_table_rows: int = 10, max_table_columns: int = 6):
+        self.max_list_items = max_list_items
+        self.max_table_rows = max_table_rows
+        self.max_table_columns = max_table_columns
+        self._lock = threading.Lock()
+        self._stats: Dict[str, int] = {"rendered": 0, "delegated": 0}
+
+    def shape(self, raw_data: Any) -> str | None:
+        """``empty``, ``scalar``, ``row``, ``list`` or ``table``; ``None`` for results the agent should phrase."""
+        names = _string_list(raw_data)
+        if names is not None:
+            return None if len(names) > self.max_list_items else "list" if names else "empty"
+        table = ResultSet.from_payload(raw_data)
+        if table is None or table.truncated or table.note:
+            return None
+        rows, columns = len(table), len(table.columns)
+        if rows == 0:
+            return "empty"
+        if columns > self.max_table_columns:
+            return None
+        if rows == 1:
+            return "scalar" if columns == 1 else "row"
+        if columns == 1 and rows <= self.max_list_items:
+            return "list"
+        return "table" if rows <= self.max_table_rows else None
+
+    def render(self, raw_data: Any, question: str) -> str | None:
+        """The answer for ``raw_data``, or ``None`` when its shape needs the presentation agent."""
+        shape = self.shape(raw_data)
+        with self._lock:
+            self._stats["rendered" if shape else "delegated"] += 1
+            if shape:
+                self._stats[f"shape_{shape}"] = self._stats.get(f"shape_{shape}", 0) + 1
+        if shape is None:
+            return None
+
+        templates = _TEMPLATES[_language(question)]
+        if shape == "empty":
+            return templates["empty"]
+        names = _string_list(raw_data)
+        if names is not None:
+            return self._bullets(templates["list"].format(count=len(names)), [f"`{name}`" for name in names])
+
+        table = ResultSet.from_payload(raw_data)
+        if shape == "scalar":
+            return templates["scalar"].format(label=_label(table.columns[0]), value=_value(table.rows()[0][0], table.columns[0]))
+        if shape == "row":
+            row = table.rows()[0]
+            return self._bullets(templates["row"],
+                                 [f"**{_label(column)}**: {_value(value, column)}" for column, value in zip(table.columns, row)])
+        if shape == "list":
+            return self._bullets(templates["list"].format(count=len(table)),
+                                 [_value(value, table.columns[0]) for value in table.column_values(0)])
+        return f"{templates['table'].format(count=len(table))}\n\n{table.to_markdown()}"
+
+    @staticmethod
+    def _bullets(intro: str, items: List[str]) -> str:
+        return intro + "\n\n" + "\n".join(f"- {item}" for item in items)
+
+    def stats(self) -> Dict[str, Any]:
+        """Answers rendered locally (presentation calls avoided) and delegated, per shape."""
+        with self._lock:
+            stats = dict(self._stats)
+        total = stats["rendered"] + stats["delegated"]
+        stats["avoided_ratio"] = stats["rendered"] / total if total else 0.0
+        return stats
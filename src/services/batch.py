@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+# File: services/batch.py
+# Description: Offline batch runs: question files, Groq rate limiting, resumable JSONL output and a summary.
+
+import asyncio
+import csv
+import json
+import logging
+import math
+import threading
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple
+
+from services.response_cache import ResponseCache
+
+
+class BatchQuestion(NamedTuple):
+    id: str
+    question: str
+    database: str | None = None
+
+
+def load_questions(path: str) -> List[BatchQuestion]:
+    """Reads questions from a ``.csv`` file or a JSONL file.
+
+    CSV files need a ``question`` column; JSONL lines are objects with ``question`` or plain
+    JSON strings. ``id`` and ``database`` are optional; the id defaults to the line number.
+    """
+    questions = []
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if Path(path).suffix.lower() == ".csv":
+            reader = csv.DictReader(f)
+            rows = ((reader.line_num, row) for row in reader)
+        else:
+            rows = ((number, json.loads(line)) for number, line in enumerate(f, 1) if line.strip())
+        for number, row in rows:
+            if isinstance(row, str):
+                row = {"question": row}
+            question = (row.get("question") or "").strip()
+            if not question:
+                raise ValueError(f"{path}:{number}: missing 'question'.")
+            questions.append(BatchQuestion(str(row.get("id") or number), question, row.get("database") or None))
+    return questions
+
+
+def read_results(path: str) -> Dict[str, Dict[str, Any]]:
+    """Completed results of a previous run of the same output file, by question id.
+
+    Failed questions are left out so that a resumed run retries them; a line cut short by
+    an interrupted run is ignored.
+    """
+    results = {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("status") == "ok":
+                    results[str(record["id"])] = record
+    except FileNotFoundError:
+        pass
+    return results
+
+
+class RateLimiter:
+    """Token bucket shared by threads and coroutines: ``rate_per_minute`` calls, ``burst`` at once.
+
+    Each call reserves the next free slot under the lock and then sleeps outside it until
+    that slot, so waiting callers are served in order.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int = 1):
+        self.rate = rate_per_minute / 60.0
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._stats = {"acquired": 0, "delayed": 0, "wait_seconds": 0.0}
+
+    def _reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            self._stats["acquired"] += 1
+            if wait:
+                self._stats["delayed"] += 1
+                self._stats["wait_seconds"] += wait
+            return wait
+
+    def acquire(self) -> float:
+        """Blocks until a call is allowed; returns the seconds waited."""
+        wait = self._reserve()
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self) -> float:
+        wait = self._reserve()
+        if wait:
+            await asyncio.sleep(wait)
+        return wait
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self._stats)
+
+
+def rate_limit_agent(agent: Any, limiter: RateLimiter) -> Any:
+    """Makes every model call of ``agent`` (sync, async, streamed; every tier) wait for ``limiter`` first."""
+    models = getattr(agent, "tiers", None) or [getattr(agent, "model", None)]
+    for model in models:
+        if model is not None:
+            _rate_limit_model(model, limiter)
+    return agent
+
+
+def _rate_limit_model(model: Any, limiter: RateLimiter) -> None:
+    invoke, invoke_stream = model.invoke, model.invoke_stream
+    ainvoke, ainvoke_stream = model.ainvoke, model.ainvoke_stream
+
+    def limited_invoke(*args, **kwargs):
+        limiter.acquire()
+        return invoke(*args, **kwargs)
+
+    def limited_invoke_stream(*args, **kwargs):
+        limiter.acquire()
+        yield from invoke_stream(*args, **kwargs)
+
+    async def limited_ainvoke(*args, **kwargs):
+        await limiter.acquire_async()
+        return await ainvoke(*args, **kwargs)
+
+    async def limited_ainvoke_stream(*args, **kwargs):
+        await limiter.acquire_async()
+        async for chunk in ainvoke_stream(*args, **kwargs):
+            yield chunk
+
+    model.invoke, model.invoke_stream = limited_invoke, limited_invoke_stream
+    model.ainvoke, model.ainvoke_stream = limited_ainvoke, limited_ainvoke_stream
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile (0 for no values)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+class BatchRunner:
+    """Answers a list of questions concurrently and appends each result to a JSONL file.
+
+    ``answer(question, database)`` is awaited for every distinct question, at most
+    ``concurrency`` at a time; ``is_error(answer)`` tells failed answers apart. Questions
+    that normalize to the same text (see :meth:`ResponseCache.normalize`) on the same
+    database are answered once and the copies are written with ``duplicate_of``.
+
+    Results are written and flushed as they complete, so an interrupted run loses at most
+    the questions in flight. Running again with the same output file skips the questions
+    already answered there and retries the failed ones.
+    """
+
+    def __init__(self, answer: Callable[[str, str | None], Awaitable[str]], concurrency: int = 4,
+                 is_error: Callable[[str], bool] | None = None):
+        self.answer = answer
+        self.concurrency = concurrency
+        self.is_error = is_error or (lambda answer: False)
+
+    async def run(self, questions: List[BatchQuestion], output_path: str) -> Dict[str, Any]:
+        """Runs the batch and returns its summary (see :func:`format_summary`)."""
+        previous = read_results(output_path)
+        groups: Dict[tuple, List[BatchQuestion]] = {}
+        for question in questions:
+            groups.setdefault((ResponseCache.normalize(question.question), question.database), []).append(question)
+
+        summary = {"questions": len(questions), "unique": len(groups), "duplicates": len(questions) - len(groups),
+                   "resumed": 0, "answered": 0, "failed": 0, "latencies": []}
+        semaphore = asyncio.Semaphore(self.concurrency)
+        lock = threading.Lock()
+        started = time.perf_counter()
+
+        with open(output_path, "a", encoding="utf-8") as output:
+            def write(record: Dict[str, Any]) -> None:
+                with lock:
+                    output.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    output.flush()
+
+            def write_copies(group: List[BatchQuestion], result: Dict[str, Any]) -> None:
+                for copy in group[1:]:
+                    if copy.id in previous:
+                        summary["resumed"] += 1
+                        continue
+                    write(dict(result, id=copy.id, question=copy.question, duplicate_of=group[0].id))
+
+            async def solve(group: List[BatchQuestion]) -> None:
+                first = group[0]
+                async with semaphore:
+                    request_started = time.perf_counter()
+                    try:
+                        answer = await self.answer(first.question, first.database)
+                        error = self.is_error(answer)
+                    except Exception as e:
+                        logging.error(f"Batch question {first.id} failed: {e}", exc_info=True)
+                        answer, error = f"An unexpected error occurred: {e}", True
+                    latency = time.perf_counter() - request_started
+                summary["failed" if error else "answered"] += 1
+                summary["latencies"].append(latency)
+                result = {"id": first.id, "question": first.question, "database": first.database,
+                          "status": "error" if error else "ok", "answer": answer,
+                          "latency_ms": round(latency * 1000, 1)}
+                write(result)
+                write_copies(group, result)
+                logging.info(f"Batch question {first.id} {result['status']} in {latency:.2f}s "
+                             f"({summary['answered'] + summary['failed']}/{len(pending)}).")
+
+            pending = []
+            for group in groups.values():
+                if group[0].id in previous:
+                    summary["resumed"] += 1
+                    write_copies(group, previous[group[0].id])
+                else:
+                    pending.append(group)
+            if summary["resumed"]:
+                logging.info(f"Resuming {output_path}: {summary['resumed']} question(s) already answered.")
+            await asyncio.gather(*(solve(group) for group in pending))
+
+        summary["wall_seconds"] = time.perf_counter() - started
+        return summary
+
+
+def format_summary(summary: Dict[str, Any], rate_limiter: RateLimiter | None = None) -> str:
+    """Throughput and per-question latency of a :meth:`BatchRunner.run` summary."""
+    latencies = summary["latencies"]
+    wall = summary["wall_seconds"]
+    run = summary["answered"] + summary["failed"]
+    lines = [
+        f"Questions: {summary['questions']} ({summary['unique']} unique, {summary['duplicates']} duplicate(s), "
+        f"{summary['resumed']} already answered)",
+        f"Answered: {summary['answered']}, failed: {summary['failed']} in {wall:.1f}s "
+        f"({run / wall * 60 if wall else 0.0:.1f} questions/min)",
+        f"Latency per question: p50 {percentile(latencies, 50):.2f}s, p95 {percentile(latencies, 95):.2f}s, "
+        f"max {max(latencies, default=0.0):.2f}s",
+    ]
+    if rate_limiter is not None:
+        stats = rate_limiter.stats()
+        lines.append(f"Model calls: {stats['acquired']} ({stats['delayed']} delayed by the rate limit, "
+                     f"{stats['wait_seconds']:.1f}s waited in total)")
+    return "\n".join(lines)
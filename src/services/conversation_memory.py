@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+# File: services/conversation_memory.py
+# Description: Token-aware compaction of agent history: recent answers, a rolling summary and inspected tables.
+
+import json
+import logging
+import re
+from collections import deque
+from typing import Any, Deque, Dict, List
+
+from agno.models.message import Message
+
+from services.result_set import ResultSet
+from services.retrieval import estimate_tokens
+from services.tracing import annotate
+
+_SCHEMA_BLOCK = re.compile(r"\s*<schema>.*?</schema>\s*", re.DOTALL)
+_SQL_TABLES = re.compile(r"\b(?:from|join)\s+((?:\"?\w+\"?\.)?\"?\w+\"?)", re.IGNORECASE)
+
+
+def _message_tokens(message: Message) -> int:
+    tokens = estimate_tokens(message.get_content_string() or "") + 4
+    for call in message.tool_calls or []:
+        tokens += estimate_tokens(str(call.get("function", call)))
+    return tokens
+
+
+class _Exchange:
+    """One previous run: the request, the tools it called and the final answer."""
+
+    def __init__(self, question: str):
+        self.question = question
+        self.tables: List[str] = []
+        self.sql: str | None = None
+        self.answer = ""
+
+
+class ConversationMemory:
+    """Replaces an agent's raw history with a compact one before every run.
+
+    agno re-sends whole previous runs, raw tool results included. Instead, the last
+    ``recent_turns`` exchanges are kept as question/answer pairs, with answers longer than
+    ``answer_chars`` replaced by the shape and first row of their query result (or cut).
+    Older exchanges are folded into a rolling summary of at most ``summary_tokens`` that
+    keeps each question, its SQL and the tables already inspected, so follow-ups need fewer
+    tool calls. Recent exchanges are folded into the summary until the run's starting prompt
+    fits ``max_prompt_tokens``.
+
+    Each turn's estimated prompt tokens (and the tokens saved) are set on the current span;
+    the last ``max_logged_turns`` are also kept in :attr:`turns`.
+    """
+
+    def __init__(self, recent_turns: int = 2, answer_chars: int = 400, summary_tokens: int = 400,
+                 max_prompt_tokens: int = 3000, max_logged_turns: int = 100):
+        self.recent_turns = recent_turns
+        self.answer_chars = answer_chars
+        self.summary_tokens = summary_tokens
+        self.max_prompt_tokens = max_prompt_tokens
+        # Bounded: the memory lives as long as its agent, i.e. a whole user session.
+        self.turns: Deque[Dict[str, int]] = deque(maxlen=max_logged_turns)
+
+    # --- Parsing -------------------------------------------------------------
+
+    @staticmethod
+    def _exchanges(history: List[Message]) -> List[_Exchange]:
+        exchanges: List[_Exchange] = []
+        for message in history:
+            if message.role == "user":
+                question = _SCHEMA_BLOCK.sub(" ", message.get_content_string() or "").strip()
+                exchanges.append(_Exchange(question))
+            elif not exchanges:
+                continue
+            elif message.role == "assistant" and message.tool_calls:
+                for call in message.tool_calls:
+                    function = call.get("function", {})
+                    name = function.get("name")
+                    try:
+                        args = json.loads(function.get("arguments") or "{}")
+                    except ValueError:
+                        args = {}
+                    current = exchanges[-1]
+                    if name == "fetch_table_schema" and args.get("table_name"):
+                        current.tables.append(args["table_name"])
+                    elif name == "fetch_table_schemas":
+                        current.tables.extend(args.get("table_names") or [])
+                    elif name == "execute_sql_query" and args.get("query"):
+                        current.sql = " ".join(args["query"].split())
+                        current.tables.extend(match.strip('"') for match in _SQL_TABLES.findall(current.sql))
+            elif message.role == "assistant" and message.content:
+                exchanges[-1].answer = message.get_content_string()
+        return exchanges
+
+    def _describe(self, answer: str, limit: int) -> str:
+        """A short stand-in for an answer: large query results by shape, anything else truncated."""
+        if len(answer) <= limit:
+            return answer
+        result = ResultSet.from_payload(answer) if answer.lstrip()[:1] in ("{", "[", "`") else None
+        if result is not None:
+            first = result.rows(1)
+            text = f"[query result: {len(result)} row(s), columns {', '.join(result.columns)}"
+            if first:
+                text += f"; first row {first[0]}"
+            answer = text + "]"
+        return answer if len(answer) <= limit else answer[:limit - 3] + "..."
+
+    # --- Compaction ----------------------------------------------------------
+
+    def _summary(self, older: List[_Exchange], tables: List[str]) -> str:
+        lines = []
+        for exchange in older:
+            line = f"- Q: {exchange.question[:200]} -> {self._describe(exchange.answer, 160)}"
+            if exchange.sql:
+                line += f" (SQL: {exchange.sql[:200]})"
+            lines.append(line)
+        footer = []
+        if tables:
+            footer.append(f"Tables already inspected: {', '.join(tables)}.")
+        budget = self.summary_tokens - sum(estimate_tokens(line) for line in footer)
+        while lines and sum(estimate_tokens(line) for line in lines) > budget:
+            lines.pop(0)
+        if not lines and not footer:
+            return ""
+        body = ["Earlier in this conversation (condensed):"] + lines if lines else []
+        return "\n".join(body + footer)
+
+    def _build(self, exchanges: List[_Exchange], recent_count: int) -> List[Message]:
+        older, recent = exchanges[:len(exchanges) - recent_count], exchanges[len(exchanges) - recent_count:]
+        tables = list(dict.fromkeys(table for exchange in exchanges for table in exchange.tables))
+        messages = []
+        summary = self._summary(older, tables)
+        if summary:
+            messages.append(Message(role="system", content=summary, from_history=True))
+        for exchange in recent:
+            messages.append(Message(role="user", content=exchange.question, from_history=True))
+            if exchange.answer:
+                messages.append(Message(role="assistant", content=self._describe(exchange.answer, self.answer_chars),
+                                        from_history=True))
+        return messages
+
+    def compact(self, run_messages: Any) -> None:
+        """Rewrites the history part of agno ``RunMessages`` in place."""
+        messages = run_messages.messages
+        history = [message for message in messages if message.from_history]
+        current = [message for message in messages if not message.from_history]
+        history_before = sum(_message_tokens(message) for message in history)
+        base = sum(_message_tokens(message) for message in current)
+
+        compacted: List[Message] = []
+        if history:
+            exchanges = self._exchanges(history)
+            recent_count = min(self.recent_turns, len(exchanges))
+            compacted = self._build(exchanges, recent_count)
+            while recent_count and base + sum(map(_message_tokens, compacted)) > self.max_prompt_tokens:
+                recent_count -= 1
+                compacted = self._build(exchanges, recent_count)
+            if base + sum(map(_message_tokens, compacted)) > self.max_prompt_tokens:
+                compacted = []
+            # History goes between the system prompt (and any extra messages) and the new request.
+            insert_at = next((i for i, message in enumerate(current) if message is run_messages.user_message),
+                             len(current))
+            run_messages.messages = current[:insert_at] + compacted + current[insert_at:]
+
+        history_after = sum(_message_tokens(message) for message in compacted)
+        prompt_tokens = base + history_after
+        if prompt_tokens > self.max_prompt_tokens:
+            logging.warning(f"The request alone needs ~{prompt_tokens} prompt tokens "
+                            f"(budget {self.max_prompt_tokens}); history was dropped.")
+        turn = {"prompt_tokens": prompt_tokens, "history_tokens": history_after,
+                "history_tokens_saved": history_before - history_after}
+        self.turns.append(turn)
+        annotate(**turn)
+        logging.info(f"Prompt ~{prompt_tokens} tokens ({history_after} of history, "
+                     f"{history_before - history_after} saved by compaction).")
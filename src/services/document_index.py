@@ -0,0 +1,439 @@
+# -*- coding: utf-8 -*-
+# File: services/document_index.py
+# Description: Persistent, incremental FAISS vector index with a content-hash document registry.
+
+import json
+import logging
+import math
+import os
+import pickle
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from services.retrieval import BM25Index
+from services.tracing import tracer
+
+_INDEX_FILE = "index.faiss"
+_DOCSTORE_FILE = "index.pkl"
+_REGISTRY_FILE = "registry.json"
+
+INDEX_TYPES = ("auto", "flat", "hnsw", "ivf", "ivfpq")
+
+# Defaults for ANN build/search parameters; every key can be overridden through ``index_params``.
+DEFAULT_INDEX_PARAMS = {
+    # "auto" picks flat below hnsw_min_vectors, HNSW below ivf_min_vectors, IVF below
+    # ivfpq_min_vectors and product-quantized IVF above that.
+    "hnsw_min_vectors": 10_000,
+    "ivf_min_vectors": 200_000,
+    "ivfpq_min_vectors": 2_000_000,
+    "hnsw_m": 32,                # Graph degree.
+    "ef_construction": 80,       # HNSW build-time beam width.
+    "ef_search": 64,             # HNSW query-time beam width (recall vs latency).
+    "nlist": None,               # IVF cells; None = 4 * sqrt(n).
+    "retrain_growth": 4,         # Retrain IVF once it has this many times the vectors it was trained for.
+    "nprobe": 16,                # IVF cells visited per query (recall vs latency).
+    "pq_m": 16,                  # PQ sub-quantizers; must divide the embedding dimension.
+    "pq_nbits": 8,               # Bits per sub-quantizer code.
+    "max_train_vectors": 100_000,
+    "rebuild_batch_size": 50_000,
+}
+
+
+def index_type_of(index: faiss.Index) -> str:
+    """Returns the ``INDEX_TYPES`` name of a FAISS index."""
+    name = type(faiss.downcast_index(index)).__name__
+    if name.startswith("IndexHNSW"):
+        return "hnsw"
+    if name == "IndexIVFPQ":
+        return "ivfpq"
+    if name.startswith("IndexIVF"):
+        return "ivf"
+    return "flat"
+
+
+def choose_index_type(vector_count: int, params: Dict[str, Any]) -> str:
+    """Picks an index type for a corpus of ``vector_count`` vectors."""
+    if vector_count >= params["ivfpq_min_vectors"]:
+        return "ivfpq"
+    if vector_count >= params["ivf_min_vectors"]:
+        return "ivf"
+    if vector_count >= params["hnsw_min_vectors"]:
+        return "hnsw"
+    return "flat"
+
+
+def ivf_cell_count(vector_count: int, params: Dict[str, Any]) -> int:
+    """The number of IVF cells (``nlist``) to train for ``vector_count`` vectors."""
+    nlist = params["nlist"] or max(1, int(4 * math.sqrt(vector_count)))
+    # FAISS needs roughly 39 training points per cell.
+    return max(1, min(nlist, vector_count // 39))
+
+
+def build_faiss_index(index_type: str, dimension: int, vector_count: int, params: Dict[str, Any]) -> faiss.Index:
+    """Creates an empty (untrained) L2 index of the given type."""
+    if index_type == "flat":
+        return faiss.IndexFlatL2(dimension)
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, params["hnsw_m"])
+        index.hnsw.efConstruction = params["ef_construction"]
+        return index
+
+    nlist = ivf_cell_count(vector_count, params)
+    quantizer = faiss.IndexFlatL2(dimension)
+    if index_type == "ivf":
+        return faiss.IndexIVFFlat(quantizer, dimension, nlist)
+    if index_type == "ivfpq":
+        return faiss.IndexIVFPQ(quantizer, dimension, nlist, params["pq_m"], params["pq_nbits"])
+    raise ValueError(
+        f"Unknown index type '{index_type}'. Expected one of {INDEX_TYPES}.")
+
+
+def apply_search_params(index: faiss.Index, params: Dict[str, Any]) -> None:
+    """Sets the query-time knobs (nprobe / efSearch) on an index."""
+    index_type = index_type_of(index)
+    if index_type in ("ivf", "ivfpq"):
+        faiss.extract_index_ivf(index).nprobe = params["nprobe"]
+    elif index_type == "hnsw":
+        faiss.downcast_index(index).hnsw.efSearch = params["ef_search"]
+
+
+def populate_index(index: faiss.Index, source: faiss.Index, positions: List[int], params: Dict[str, Any]) -> None:
+    """Trains ``index`` if needed and adds ``source``'s vectors at ``positions``, in batches."""
+    if index_type_of(source) in ("ivf", "ivfpq"):
+        faiss.extract_index_ivf(source).make_direct_map()
+    if not index.is_trained:
+        step = max(1, len(positions) // params["max_train_vectors"])
+        sample = positions[::step][:params["max_train_vectors"]]
+        index.train(np.vstack([source.reconstruct(i) for i in sample]))
+    batch_size = params["rebuild_batch_size"]
+    for start in range(0, len(positions), batch_size):
+        batch = positions[start:start + batch_size]
+        index.add(np.vstack([source.reconstruct(i) for i in batch]))
+
+
+class DocumentIndex:
+    """A FAISS index persisted to disk, plus a registry of the documents it contains.
+
+    Documents are keyed by the SHA-256 of their content, so re-uploading an indexed PDF
+    costs nothing and new PDFs are appended to the existing index instead of rebuilding
+    it. The vectors of flat and HNSW indexes are memory-mapped on load (``mmap=True``) and
+    only copied into RAM the first time the index is modified.
+
+    Deleting a document is cheap: it is tombstoned in the registry and filtered out of
+    search results. :meth:`compact` physically removes tombstoned vectors.
+
+    ``index_type`` selects an exact ``"flat"`` index or an approximate one (``"hnsw"``,
+    ``"ivf"``, ``"ivfpq"``); ``"auto"`` chooses by corpus size and migrates the index as the
+    corpus grows. New documents always start in a flat index and are converted once there
+    are enough vectors to train on.
+
+    A BM25 :attr:`keyword_index` over the same chunks is built in memory on first use and
+    kept in step with additions and compaction; :meth:`keyword_search` queries it.
+    """
+
+    def __init__(self, index_dir: str | os.PathLike, embedding_model: Any, mmap: bool = True,
+                 index_type: str = "flat", index_params: Dict[str, Any] | None = None):
+        if index_type not in INDEX_TYPES:
+            raise ValueError(
+                f"Unknown index type '{index_type}'. Expected one of {INDEX_TYPES}.")
+        self.index_dir = Path(index_dir)
+        self.embedding_model = embedding_model
+        self.mmap = mmap
+        self.index_type = index_type
+        self.index_params = {**DEFAULT_INDEX_PARAMS, **(index_params or {})}
+        self.vector_store: FAISS | None = None
+        self._mmapped = False
+        # content_hash -> {"name", "chunk_ids", "added_at", "deleted"}
+        self.registry: Dict[str, Dict[str, Any]] = {}
+        self._keyword_index: BM25Index | None = None
+        self._load()
+
+    # --- Persistence ---------------------------------------------------------
+
+    def _load(self) -> None:
+        registry_path = self.index_dir / _REGISTRY_FILE
+        index_path = self.index_dir / _INDEX_FILE
+        if not registry_path.exists() or not index_path.exists():
+            return
+
+        self.registry = json.loads(registry_path.read_text(encoding="utf-8"))
+        # IO_FLAG_MMAP only maps on-disk inverted lists; IO_FLAG_MMAP_IFC maps the vector
+        # storage of Flat and HNSW indexes (IVF inverted lists are still read into RAM).
+        flags = faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY if self.mmap else 0
+        index = faiss.read_index(str(index_path), flags)
+        # Our own file, written by _save() through FAISS.save_local's format.
+        with open(self.index_dir / _DOCSTORE_FILE, "rb") as f:
+            docstore, index_to_docstore_id = pickle.load(f)
+        self.vector_store = FAISS(
+            embedding_function=self.embedding_model,
+            index=index,
+            docstore=docstore,
+            index_to_docstore_id=index_to_docstore_id,
+        )
+        self._mmapped = self.mmap
+        apply_search_params(index, self.index_params)
+        logging.info(
+            f"Loaded vector index from {self.index_dir}: {index.ntotal} vectors, "
+            f"{len(self.live_documents())} documents (mmap={self._mmapped}).")
+
+    def _ensure_writable(self) -> None:
+        """Replaces a memory-mapped (read-only) index with an in-RAM copy before modifying it."""
+        if self.vector_store is not None and self._mmapped:
+            self.vector_store.index = faiss.read_index(
+                str(self.index_dir / _INDEX_FILE))
+            apply_search_params(self.vector_store.index, self.index_params)
+            self._mmapped = False
+
+    # --- Index type ----------------------------------------------------------
+
+    def current_index_type(self) -> str | None:
+        """The type of the loaded index, or ``None`` while the index is empty."""
+        return index_type_of(self.vector_store.index) if self.vector_store is not None else None
+
+    def _target_index_type(self) -> str:
+        vector_count = self.vector_store.index.ntotal if self.vector_store is not None else 0
+        if self.index_type == "auto":
+            return choose_index_type(vector_count, self.index_params)
+        return self._trainable_type(self.index_type, vector_count)
+
+    def _trainable_type(self, index_type: str, vector_count: int) -> str:
+        """Falls back to a simpler type when there are too few vectors to train ``index_type``."""
+        if index_type == "ivfpq" and vector_count < 2 ** self.index_params["pq_nbits"]:
+            index_type = "ivf"  # PQ codebooks need at least 2^nbits training points.
+        if index_type == "ivf" and vector_count < 39:
+            index_type = "flat"  # Not enough vectors to train a coarse quantizer yet.
+        return index_type
+
+    def rebuild(self, index_type: str | None = None, keep_positions: List[int] | None = None) -> None:
+        """Rebuilds the index as ``index_type`` (default: the configured/auto type).
+
+        ``keep_positions`` restricts the rebuild to those vector positions; the others are
+        dropped from the index and the docstore.
+        """
+        if self.vector_store is None:
+            return
+        source = self.vector_store.index
+        positions = keep_positions if keep_positions is not None else list(
+            range(source.ntotal))
+        index_type = self._trainable_type(
+            index_type or self._target_index_type(), len(positions))
+        logging.info(
+            f"Rebuilding vector index as '{index_type}' with {len(positions)} vectors...")
+
+        index = build_faiss_index(index_type, source.d, len(positions), self.index_params)
+        populate_index(index, source, positions, self.index_params)
+        apply_search_params(index, self.index_params)
+
+        old_mapping = self.vector_store.index_to_docstore_id
+        kept_ids = [old_mapping[position] for position in positions]
+        dropped = set(old_mapping.values()) - set(kept_ids)
+        if dropped:
+            self.vector_store.docstore.delete(list(dropped))
+        self.vector_store.index = index
+        self.vector_store.index_to_docstore_id = dict(enumerate(kept_ids))
+        self._mmapped = False
+
+    def _outgrown(self) -> bool:
+        """Whether an IVF index has grown ``retrain_growth`` times past the size it was trained for.
+
+        Cells are trained once, so an index started on a small corpus (a single cell at 39
+        vectors) would otherwise scan most of a large one on every query.
+        """
+        index = self.vector_store.index
+        if index_type_of(index) not in ("ivf", "ivfpq"):
+            return False
+        trained_cells = faiss.extract_index_ivf(index).nlist
+        cells = ivf_cell_count(index.ntotal, self.index_params)
+        # Cells grow with the square root of the corpus (or linearly, while capped by it).
+        return cells > trained_cells and cells >= trained_cells * math.sqrt(self.index_params["retrain_growth"])
+
+    def _maybe_migrate(self) -> None:
+        if self.vector_store is None:
+            return
+        target = self._target_index_type()
+        if target != self.current_index_type() or self._outgrown():
+            self.rebuild(target)
+
+    def _save(self) -> None:
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        if self.vector_store is not None:
+            # Write to a temporary folder, then atomically swap the files in.
+            with tempfile.TemporaryDirectory(dir=self.index_dir) as tmp:
+                self.vector_store.save_local(tmp)
+                for name in (_INDEX_FILE, _DOCSTORE_FILE):
+                    os.replace(Path(tmp) / name, self.index_dir / name)
+        tmp_registry = self.index_dir / f"{_REGISTRY_FILE}.tmp"
+        tmp_registry.write_text(json.dumps(
+            self.registry, indent=2), encoding="utf-8")
+        os.replace(tmp_registry, self.index_dir / _REGISTRY_FILE)
+
+    # --- Documents -----------------------------------------------------------
+
+    def live_documents(self) -> Dict[str, Dict[str, Any]]:
+        """Returns the registry entries of documents that have not been deleted."""
+        return {content_hash: entry for content_hash, entry in self.registry.items()
+                if not entry.get("deleted")}
+
+    def contains(self, content_hash: str) -> bool:
+        """Whether a live document with this content hash is already indexed."""
+        entry = self.registry.get(content_hash)
+        return entry is not None and not entry.get("deleted")
+
+    def add_document(self, content_hash: str, name: str, chunks: Iterable[str | Document],
+                     batch_size: int = 64, save: bool = True) -> int:
+        """Embeds and appends a document's chunks; returns the number of new vectors.
+
+        ``chunks`` may be a lazy iterator; it is consumed and embedded ``batch_size`` chunks at
+        a time, so only one batch of texts and vectors is held in flight. If it raises, the
+        vectors already added for the document are removed and the error is re-raised, so a
+        truncated document is never registered.
+        """
+        if self.contains(content_hash):
+            logging.info(f"Document '{name}' is already indexed; skipping.")
+            return 0
+        if content_hash in self.registry:
+            # Re-adding a tombstoned document: it is still in the index, just revive it.
+            self.registry[content_hash]["deleted"] = False
+            if save:
+                self._save()
+            return 0
+
+        ids: List[str] = []
+        batch: List[Document] = []
+        had_index = self.vector_store is not None
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = Document(page_content=chunk, metadata={})
+                metadata = {"doc_hash": content_hash, "source": name,
+                            "chunk": len(ids) + len(batch), **chunk.metadata}
+                batch.append(Document(page_content=chunk.page_content, metadata=metadata))
+                if len(batch) >= batch_size:
+                    ids.extend(self._add_batch(content_hash, len(ids), batch))
+                    batch = []
+            if batch:
+                ids.extend(self._add_batch(content_hash, len(ids), batch))
+        except Exception:
+            logging.error(f"Indexing '{name}' failed; removing its {len(ids)} vectors.")
+            if ids and not had_index:
+                self.vector_store = None
+                if self._keyword_index is not None:
+                    self._keyword_index.remove(ids)
+            elif ids:
+                self._remove_vectors(ids)
+            raise
+
+        if not ids:
+            logging.warning(f"Document '{name}' has no text to index.")
+            return 0
+        self.registry[content_hash] = {
+            "name": name, "chunk_ids": ids, "added_at": time.time(), "deleted": False}
+        self._maybe_migrate()
+        if save:
+            self._save()
+        logging.info(f"Indexed '{name}' ({len(ids)} chunks).")
+        return len(ids)
+
+    def _add_batch(self, content_hash: str, offset: int, batch: List[Document]) -> List[str]:
+        ids = [f"{content_hash}:{offset + i}" for i in range(len(batch))]
+        texts = [document.page_content for document in batch]
+        metadatas = [document.metadata for document in batch]
+        with tracer.span("rag.embed", chunks=len(texts), bytes=sum(len(text) for text in texts)):
+            if self.vector_store is None:
+                self.vector_store = FAISS.from_texts(
+                    texts, embedding=self.embedding_model, metadatas=metadatas, ids=ids)
+            else:
+                self._ensure_writable()
+                self.vector_store.add_texts(texts, metadatas=metadatas, ids=ids)
+        if self._keyword_index is not None:
+            for chunk_id, text in zip(ids, texts):
+                self._keyword_index.add(chunk_id, text)
+        return ids
+
+    def delete_document(self, content_hash: str) -> bool:
+        """Tombstones a document so it no longer appears in search results."""
+        if not self.contains(content_hash):
+            return False
+        self.registry[content_hash]["deleted"] = True
+        self._save()
+        return True
+
+    def _remove_vectors(self, ids: List[str]) -> None:
+        """Physically removes chunks from the vector index and the keyword index."""
+        if self.vector_store is not None:
+            current_type = self.current_index_type()
+            if current_type != "flat":
+                # HNSW cannot remove vectors and IVF keeps stale positions after a removal, so
+                # ANN indexes are rebuilt from the surviving vectors instead.
+                removed = set(ids)
+                keep = [position for position, docstore_id in self.vector_store.index_to_docstore_id.items()
+                        if docstore_id not in removed]
+                self.rebuild(current_type, keep_positions=sorted(keep))
+            else:
+                self._ensure_writable()
+                self.vector_store.delete(ids)
+        if self._keyword_index is not None:
+            self._keyword_index.remove(ids)
+
+    def compact(self) -> int:
+        """Physically removes the vectors of deleted documents; returns how many were removed."""
+        deleted = [content_hash for content_hash, entry in self.registry.items()
+                   if entry.get("deleted")]
+        ids = [chunk_id for content_hash in deleted
+               for chunk_id in self.registry[content_hash]["chunk_ids"]]
+        if ids:
+            self._remove_vectors(ids)
+        for content_hash in deleted:
+            del self.registry[content_hash]
+        self._maybe_migrate()
+        self._save()
+        logging.info(
+            f"Compacted vector index: removed {len(ids)} vectors from {len(deleted)} documents.")
+        return len(ids)
+
+    # --- Search --------------------------------------------------------------
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        """FAISS-compatible search that skips chunks of deleted documents."""
+        if self.vector_store is None:
+            return []
+        if len(self.live_documents()) == len(self.registry):
+            return self.vector_store.similarity_search(query, k=k, **kwargs)
+
+        live = set(self.live_documents())
+        kwargs.setdefault("fetch_k", max(20, 4 * k))
+        return self.vector_store.similarity_search(
+            query, k=k, filter=lambda metadata: metadata.get("doc_hash") in live, **kwargs)
+
+    @property
+    def keyword_index(self) -> BM25Index:
+        """The BM25 index of every chunk, built from the docstore on first access."""
+        if self._keyword_index is None:
+            index = BM25Index()
+            if self.vector_store is not None:
+                with tracer.span("rag.keyword_index") as span:
+                    docstore = self.vector_store.docstore
+                    for chunk_id in self.vector_store.index_to_docstore_id.values():
+                        index.add(chunk_id, docstore.search(chunk_id).page_content)
+                    span.set(chunks=len(index))
+            self._keyword_index = index
+        return self._keyword_index
+
+    def keyword_search(self, query: str, k: int = 20) -> List[Document]:
+        """BM25 search over the chunks of live documents."""
+        if self.vector_store is None:
+            return []
+        live = set(self.live_documents())
+        hits = self.keyword_index.search(query, k=k, accept=lambda chunk_id: chunk_id.split(":", 1)[0] in live)
+        docstore = self.vector_store.docstore
+        return [docstore.search(chunk_id) for chunk_id, _ in hits]
+
+    def __bool__(self) -> bool:
+        return self.vector_store is not None and bool(self.live_documents())
@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+# File: services/fast_path.py
+# Description: Answers templated questions ("how many X", "most expensive Y", "list tables") with one
+#              catalog-bound SQL query instead of a data analyst agent run.
+
+import json
+import logging
+import re
+import threading
+import time
+import unicodedata
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple
+
+from config.fast_path import FAST_PATH_CONFIG
+from services.response_cache import ResponseCache
+from services.schema_catalog import CatalogSnapshot, _singular
+
+_NUMERIC_TYPES = ("smallint", "integer", "bigint", "numeric", "real", "double precision", "money")
+_ENTITY = r"(?P<entity>[a-z][a-z ]{0,40}?)"
+_LIMIT = r"(?:top )?(?:(?P<limit>\d{1,4}) )?"
+
+# Each intent lists full-match patterns over the normalized first sentence of the question.
+# Tails are closed lists on purpose: "how many orders were made by Ana" must not count all orders.
+_INTENTS: List[Tuple[str, List[str]]] = [
+    ("list_tables", [
+        r"(?:list|show(?: me)?|what are|which are)(?: all)?(?: of)? the tables"
+        r"(?: in the database| in the schema| available| we have)?",
+        r"(?:liste|mostre|quais sao)(?: todas)? as tabelas(?: do banco(?: de dados)?| existentes| disponiveis)?",
+        r"quais tabelas (?:existem|temos|ha)(?: no banco(?: de dados)?)?",
+    ]),
+    ("count", [
+        rf"how many {_ENTITY}(?: (?:are|were) (?:there|registered|made|placed|created|stored|recorded|available)"
+        r"| exist| do we have| are in the database)?(?: in total| in the database| overall| altogether)?",
+        rf"(?:what is the )?(?:total )?(?:number|count) of {_ENTITY}(?: in the database| in total)?",
+        rf"quant[oa]s {_ENTITY}(?: (?:existem|ha|temos|(?:estao|sao|foram) "
+        r"(?:registrad|cadastrad|feit|criad)[oa]s))?(?: no total| ao todo| no banco(?: de dados)?)?",
+    ]),
+    ("extreme", [
+        rf"(?:(?:what|which) (?:is|are)|show(?: me)?|list|give me|find) the {_LIMIT}"
+        rf"(?P<direction>most expensive|priciest|cheapest|least expensive) {_ENTITY}"
+        r"(?: available| in the database| in stock)?(?: and (?:what is )?(?:its|their) prices?)?",
+        rf"(?:qual (?:e )?|quais (?:sao )?|mostre |liste )?(?:o|a|os|as) {_LIMIT}{_ENTITY} mais "
+        r"(?P<direction>car[oa]s?|barat[oa]s?)(?: disponive(?:l|is))?(?: e qual (?:e )?(?:o )?(?:seu )?preco)?",
+    ]),
+    ("top_by", [
+        rf"(?:(?:what|which) (?:is|are)|show(?: me)?|list|give me) the top (?P<limit>\d{{1,4}}) {_ENTITY} "
+        r"by (?:(?P<order>highest|lowest) )?(?P<column>[a-z ]{1,40})",
+    ]),
+    ("aggregate", [
+        r"what is the (?P<function>average|mean|total|minimum|maximum|lowest|highest|smallest|largest) "
+        rf"(?P<column>[a-z ]{{1,40}}?) of (?:all )?(?:the )?(?:an? )?{_ENTITY}(?: in the database)?",
+    ]),
+]
+_PATTERNS = [(intent, re.compile(pattern)) for intent, patterns in _INTENTS for pattern in patterns]
+# Trailing sentences that only ask for an output format ("Please provide the results in JSON").
+_FORMAT_REQUEST = re.compile(r"(?:please )?(?:provide|return|give|show|send)(?: me)? the (?:results?|data|answer)"
+                             r" (?:in|as) json(?: format)?(?: only)?")
+_SENTENCE = re.compile(r"[.?!]+")
+_FILLER = frozenset("the all of a an os as o a de do da dos das".split())
+_AGGREGATES = {"average": "avg", "mean": "avg", "total": "sum", "minimum": "min", "lowest": "min",
+               "smallest": "min", "maximum": "max", "highest": "max", "largest": "max"}
+
+
+class FastAnswer(NamedTuple):
+    intent: str                 # list_tables | count | extreme | top_by | aggregate | verified
+    sql: str | None             # None when answered from the catalog alone
+    tables: List[str]
+    data: Any
+
+
+def normalize(question: str) -> str:
+    """Lowercased, accent-free text; quotes dropped, whitespace collapsed."""
+    text = unicodedata.normalize("NFKD", question.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(text.replace("'", "").replace('"', "").split())
+
+
+def _table_key(name: str) -> str:
+    return "_".join(_singular(part) for part in name.lower().split("_"))
+
+
+def quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+class FastPath:
+    """Pre-agent matcher that answers simple question shapes with one SQL query.
+
+    The first sentence of the question (later ones may only ask for JSON output) must
+    fully match one of the intent patterns above. Entity and column names are then bound
+    to real tables and numeric columns through the schema catalog (``catalog`` returns a
+    :class:`SchemaCatalog`), so the SQL only ever contains quoted identifiers and integers.
+    An entity that matches no table, or tables in several schemas, falls back to the agent,
+    as does a query that returns an error.
+
+    ``verified_queries`` (normalized question -> SQL, e.g. from reviewed agent runs) are
+    checked first and run as they are. :meth:`record_agent` lets callers report agent runs,
+    so :meth:`stats` can estimate the time and model turns saved by each hit.
+    """
+
+    def __init__(self, catalog: Callable[[], Any], executor: Callable[[str], Any],
+                 entity_aliases: Dict[str, str] | None = None, price_columns: List[str] | None = None,
+                 max_limit: int = 100, verified_queries: Dict[str, str] | None = None):
+        self.catalog = catalog
+        self.executor = executor
+        self.entity_aliases = entity_aliases or {}
+        self.price_columns = price_columns or ["price"]
+        self.max_limit = max_limit
+        self.verified_queries = {ResponseCache.normalize(question): sql
+                                 for question, sql in (verified_queries or {}).items()}
+        self._lock = threading.Lock()
+        self._stats = {"lookups": 0, "hits": 0, "misses": 0, "ambiguous": 0, "errors": 0,
+                       "fast_seconds": 0.0, "agent_runs": 0, "agent_seconds": 0.0, "agent_model_turns": 0}
+        self._intents: Dict[str, int] = {}
+
+    # --- Binding -------------------------------------------------------------
+
+    def _bind_table(self, snapshot: CatalogSnapshot, phrase: str) -> Tuple[str, str] | None:
+        """The one table named by ``phrase``; ``None`` if none matches, ``ValueError`` if several do."""
+        words = [word for word in phrase.split() if word not in _FILLER]
+        if not words:
+            return None
+        singular = [_singular(word) for word in words]
+        names = {"_".join(singular)}
+        for word in (" ".join(words), " ".join(singular)):
+            if word in self.entity_aliases:
+                names.add(_table_key(self.entity_aliases[word]))
+        matches = [key for key in snapshot.columns if _table_key(key[1]) in names]
+        if len(matches) > 1:
+            raise ValueError(f"'{phrase}' matches {len(matches)} tables.")
+        return matches[0] if matches else None
+
+    @staticmethod
+    def _bind_column(snapshot: CatalogSnapshot, table: Tuple[str, str], phrase: str) -> str | None:
+        """The numeric column of ``table`` named by ``phrase`` ("stock quantity" -> stock_quantity)."""
+        key = "_".join(_singular(word) for word in phrase.split() if word not in _FILLER)
+        for column, data_type in snapshot.columns.get(table, []):
+            if data_type in _NUMERIC_TYPES and _table_key(column) == key:
+                return column
+        return None
+
+    def _price_column(self, snapshot: CatalogSnapshot, table: Tuple[str, str]) -> str | None:
+        numeric = {column for column, data_type in snapshot.columns.get(table, []) if data_type in _NUMERIC_TYPES}
+        return next((column for column in self.price_columns if column in numeric), None)
+
+    def _limit(self, value: str | None) -> int | None:
+        limit = int(value) if value else 1
+        return limit if 0 < limit <= self.max_limit else None
+
+    # --- Matching ------------------------------------------------------------
+
+    def match(self, question: str) -> FastAnswer | None:
+        """The SQL (or catalog data) answering ``question``, without running it; ``None`` to use the agent.
+
+        Raises ``ValueError`` when the question matches a template but its entity is ambiguous.
+        """
+        catalog = self.catalog()
+        verified = self.verified_queries.get(ResponseCache.normalize(question))
+        if verified:
+            return FastAnswer("verified", verified, catalog.referenced_tables(verified), None)
+
+        sentences = [s.strip() for s in _SENTENCE.split(normalize(question)) if s.strip()]
+        if not sentences or not all(_FORMAT_REQUEST.fullmatch(s) for s in sentences[1:]):
+            return None
+        for intent, pattern in _PATTERNS:
+            found = pattern.fullmatch(sentences[0])
+            if found:
+                return self._build(intent, found.groupdict(), catalog.snapshot())
+        return None
+
+    def _build(self, intent: str, groups: Dict[str, str], snapshot: CatalogSnapshot) -> FastAnswer | None:
+        if intent == "list_tables":
+            tables = [(schema, table) for schema in snapshot.schemas for table in snapshot.tables[schema]]
+            multiple = len(snapshot.schemas) > 1
+            return FastAnswer(intent, None, [], sorted(f"{s}.{t}" if multiple else t for s, t in tables))
+
+        table = self._bind_table(snapshot, groups["entity"])
+        if table is None:
+            return None
+        source = f"{quote_identifier(table[0])}.{quote_identifier(table[1])}"
+
+        if intent == "count":
+            sql = f"SELECT count(*) AS {quote_identifier(table[1] + '_count')} FROM {source}"
+        elif intent == "extreme":
+            column, limit = self._price_column(snapshot, table), self._limit(groups["limit"])
+            if column is None or limit is None:
+                return None
+            order = "ASC" if groups["direction"].startswith(("cheap", "least", "barat")) else "DESC"
+            sql = f"SELECT * FROM {source} ORDER BY {quote_identifier(column)} {order} NULLS LAST LIMIT {limit}"
+        elif intent == "top_by":
+            column, limit = self._bind_column(snapshot, table, groups["column"]), self._limit(groups["limit"])
+            if column is None or limit is None:
+                return None
+            order = "ASC" if groups["order"] == "lowest" else "DESC"
+            sql = f"SELECT * FROM {source} ORDER BY {quote_identifier(column)} {order} NULLS LAST LIMIT {limit}"
+        else:
+            column = self._bind_column(snapshot, table, groups["column"])
+            if column is None:
+                return None
+            function = _AGGREGATES[groups["function"]]
+            sql = (f"SELECT {function}({quote_identifier(column)}) AS "
+                   f"{quote_identifier(groups['function'] + '_' + column)} FROM {source}")
+        return FastAnswer(intent, sql, [f"{table[0]}.{table[1]}"], None)
+
+    # --- Answering -----------------------------------------------------------
+
+    def answer(self, question: str) -> FastAnswer | None:
+        """Matches and runs ``question``; returns the answer with its data, or ``None`` to use the agent."""
+        started = time.perf_counter()
+        outcome = "misses"
+        try:
+            try:
+                found = self.match(question)
+            except ValueError as e:
+                logging.info(f"Fast path skipped, ambiguous question: {e}")
+                outcome = "ambiguous"
+                return None
+            if found is None:
+                return None
+            if found.sql is not None:
+                try:
+                    data = self.executor(found.sql)
+                except Exception as e:  # e.g. UnsafeQueryError, an exhausted connection pool.
+                    logging.warning(f"Fast path query raised, using the agent: {e}")
+                    outcome = "errors"
+                    return None
+                if isinstance(data, list) and len(data) == 1 and isinstance(data[0], dict) and "error" in data[0]:
+                    logging.warning(f"Fast path query failed, using the agent: {data[0]['error']}")
+                    outcome = "errors"
+                    return None
+                found = found._replace(data=data)
+            outcome = "hits"
+            logging.info(f"Fast path answered the request ({found.intent}).")
+            return found
+        finally:
+            with self._lock:
+                self._stats["lookups"] += 1
+                self._stats[outcome] += 1
+                if outcome == "hits":
+                    self._stats["fast_seconds"] += time.perf_counter() - started
+                    self._intents[found.intent] = self._intents.get(found.intent, 0) + 1
+
+    def record_agent(self, seconds: float, model_turns: int = 0) -> None:
+        """Reports a data analyst agent run, the baseline the saved time is estimated from."""
+        with self._lock:
+            self._stats["agent_runs"] += 1
+            self._stats["agent_seconds"] += seconds
+            self._stats["agent_model_turns"] += model_turns
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({f"intent_{intent}": count for intent, count in self._intents.items()})
+        hits, runs = stats["hits"], stats["agent_runs"]
+        stats["hit_rate"] = hits / stats["lookups"] if stats["lookups"] else 0.0
+        stats["avg_fast_ms"] = stats["fast_seconds"] / hits * 1000 if hits else 0.0
+        if runs:
+            stats["estimated_seconds_saved"] = hits * stats["agent_seconds"] / runs - stats["fast_seconds"]
+            stats["estimated_model_turns_saved"] = hits * stats["agent_model_turns"] / runs
+        return stats
+
+
+def load_verified_queries(path: str | None) -> Dict[str, str]:
+    """Reads a ``{"question": "SQL"}`` JSON file; a missing or invalid file yields no queries."""
+    if not path:
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            queries = json.load(f)
+    except (OSError, ValueError) as e:
+        logging.warning(f"Could not load verified fast path queries from {path}: {e}")
+        return {}
+    return {question: sql for question, sql in queries.items() if isinstance(sql, str)}
+
+
+def build_fast_path(catalog: Callable[[], Any], executor: Callable[[str], Any]) -> FastPath:
+    """Creates a fast path configured from FAST_PATH_CONFIG."""
+    config = FAST_PATH_CONFIG
+    return FastPath(
+        catalog=catalog,
+        executor=executor,
+        entity_aliases=config["entity_aliases"],
+        price_columns=config["price_columns"],
+        max_limit=config["max_limit"],
+        verified_queries=load_verified_queries(config["verified_queries_file"]),
+    )
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+# File: services/ingestion.py
+# Description: Streaming PDF ingestion: parallel page extraction and chunking with page-level provenance.
+
+import io
+import logging
+import multiprocessing
+import os
+import tempfile
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, wait
+from typing import Deque, Iterator, List, Tuple
+
+from langchain_core.documents import Document
+from pypdf import PdfReader
+
+from services.tracing import tracer
+
+
+def _extract_page_range(source: bytes | str, start: int, stop: int) -> List[Tuple[int, str]]:
+    """Worker: extracts pages ``[start, stop)`` of a PDF given as bytes or a path. Page numbers are 1-based."""
+    reader = PdfReader(io.BytesIO(source) if isinstance(source, bytes) else source)
+    pages = []
+    for number in range(start, stop):
+        try:
+            pages.append((number + 1, reader.pages[number].extract_text() or ""))
+        except Exception as e:
+            logging.error(f"Error extracting page {number + 1}: {e}")
+            pages.append((number + 1, ""))
+    return pages
+
+
+class IngestionPipeline:
+    """Turns PDFs into a lazy stream of chunk ``Document``s.
+
+    Large PDFs are split into page ranges that a process pool extracts in parallel
+    (``pypdf`` is pure Python and CPU bound, so threads would not help). The workers read
+    the PDF from a temporary file, and at most two ranges per worker are in flight, so
+    neither the PDF nor its extracted text is copied per task. Small PDFs are extracted
+    inline to avoid the pool's start-up cost. Pages are chunked one at a time and
+    yielded as soon as they are ready, and every chunk carries its file, page and position.
+    """
+
+    def __init__(self, text_splitter, workers: int | None = None, pages_per_task: int = 16,
+                 parallel_min_pages: int = 32):
+        self.text_splitter = text_splitter
+        self.workers = workers or os.cpu_count() or 1
+        self.pages_per_task = pages_per_task
+        self.parallel_min_pages = parallel_min_pages
+        self._executor: Executor | None = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            # "spawn" is safe inside threaded hosts such as Streamlit, unlike "fork".
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def iter_pages(self, data: bytes) -> Iterator[Tuple[int, str]]:
+        """Yields ``(page_number, text)`` in page order."""
+        page_count = len(PdfReader(io.BytesIO(data)).pages)
+        if page_count < self.parallel_min_pages or self.workers == 1:
+            with tracer.span("rag.extract", pages=page_count):
+                pages = _extract_page_range(data, 0, page_count)
+            yield from pages
+            return
+
+        ranges = deque((start, min(start + self.pages_per_task, page_count))
+                       for start in range(0, page_count, self.pages_per_task))
+        executor = self._get_executor()
+        pending: Deque[Tuple[int, int, Future]] = deque()
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+            f.write(data)
+        try:
+            while ranges or pending:
+                while ranges and len(pending) < 2 * self.workers:
+                    start, stop = ranges.popleft()
+                    pending.append((start, stop, executor.submit(_extract_page_range, f.name, start, stop)))
+                start, stop, future = pending.popleft()
+                # Measures the time spent waiting for each range, i.e. extraction not hidden by the pool.
+                with tracer.span("rag.extract", pages=stop - start):
+                    pages = future.result()
+                yield from pages
+        finally:
+            for _, _, future in pending:
+                future.cancel()
+            # Ranges already running still read the file.
+            wait([future for _, _, future in pending])
+            os.unlink(f.name)
+
+    def iter_chunks(self, data: bytes, name: str, content_hash: str) -> Iterator[Document]:
+        """Yields chunk documents with ``source``, ``page``, ``doc_hash`` and ``chunk`` metadata.
+
+        A PDF that cannot be read raises after the chunks already yielded, so that the
+        consumer does not index a truncated document.
+        """
+        chunk_number = 0
+        try:
+            for page_number, text in self.iter_pages(data):
+                with tracer.span("rag.chunk", pages=1, bytes=len(text)) as span:
+                    chunks = self.text_splitter.split_text(text)
+                    span.set(chunks=len(chunks))
+                for chunk in chunks:
+                    yield Document(page_content=chunk, metadata={
+                        "source": name,
+                        "page": page_number,
+                        "doc_hash": content_hash,
+                        "chunk": chunk_number,
+                    })
+                    chunk_number += 1
+        except Exception as e:
+            logging.error(f"Error reading PDF {name}: {e}")
+            raise
+
+    def close(self) -> None:
+        """Shuts down the worker processes."""
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
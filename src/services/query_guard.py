@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+# File: services/query_guard.py
+# Description: EXPLAIN-based cost guardrails for agent-generated SQL, with a plan-cost vs runtime log.
+
+import json
+import logging
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List
+
+import psycopg2
+
+VIOLATION_ACTIONS = ("reject", "limit")
+# String literals, quoted identifiers and comments, so a ";" or "--" inside them is not taken
+# for the end of the statement; any other character is its own token.
+_TOKEN = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|--[^\n]*|/\*.*?\*/|\S", re.DOTALL)
+
+
+class QueryRejected(ValueError):
+    """Raised when the planner estimates a query to be too expensive to run."""
+
+
+class PlanCheck:
+    """The outcome of checking one query: the SQL to run and the planner's estimates."""
+
+    def __init__(self, query: str, total_cost: float, plan_rows: int, rewritten: bool = False,
+                 note: str | None = None):
+        self.query = query
+        self.total_cost = total_cost
+        self.plan_rows = plan_rows
+        self.rewritten = rewritten
+        self.note = note
+
+
+def strip_statement_end(query: str) -> str:
+    """``query`` without its trailing semicolons, comments and whitespace."""
+    end = 0
+    for token in _TOKEN.finditer(query):
+        if token.group() != ";" and not token.group().startswith(("--", "/*")):
+            end = token.end()
+    return query[:end]
+
+
+def _walk(node: Dict[str, Any]) -> List[Dict[str, Any]]:
+    nodes = [node]
+    for child in node.get("Plans", []):
+        nodes.extend(_walk(child))
+    return nodes
+
+
+def describe_plan_hotspots(plan: Dict[str, Any], row_threshold: int) -> List[str]:
+    """Names the plan nodes that usually explain a huge estimate: big scans and cross joins."""
+    hints = []
+    for node in _walk(plan):
+        node_type = node.get("Node Type", "")
+        if node_type == "Seq Scan" and node.get("Plan Rows", 0) >= row_threshold:
+            hints.append(f"sequential scan on {node.get('Relation Name')} (~{int(node['Plan Rows'])} rows)")
+        elif node_type == "Nested Loop" and not node.get("Join Filter") and \
+                not any(child.get("Index Cond") for child in node.get("Plans", [])):
+            hints.append("nested loop without a join condition (a cross join?)")
+    return hints
+
+
+class QueryGuard:
+    """Runs ``EXPLAIN (FORMAT JSON)`` before a query and enforces cost and row limits.
+
+    Queries estimated above ``max_plan_rows`` are wrapped in ``LIMIT limit_rows`` when
+    ``on_violation`` is ``"limit"``, otherwise rejected. Queries above ``max_total_cost`` are
+    rejected unless a LIMIT brings them under it. Rejections carry the planner's numbers and
+    the plan hotspots so the agent can write a cheaper query. Every executed query is logged
+    with its estimated cost and actual runtime (the last ``history_size`` in memory, all of
+    them in ``log_path`` as JSON lines when set) to tune the limits.
+    """
+
+    def __init__(self, max_total_cost: float = 1_000_000.0, max_plan_rows: int = 100_000,
+                 on_violation: str = "limit", limit_rows: int = 1000, history_size: int = 500,
+                 log_path: str | None = None, enabled: bool = True):
+        if on_violation not in VIOLATION_ACTIONS:
+            raise ValueError(
+                f"Unknown on_violation '{on_violation}'. Expected one of {VIOLATION_ACTIONS}.")
+        self.max_total_cost = max_total_cost
+        self.max_plan_rows = max_plan_rows
+        self.on_violation = on_violation
+        self.limit_rows = limit_rows
+        self.log_path = log_path
+        self.enabled = enabled
+        self._history: Deque[Dict[str, Any]] = deque(maxlen=history_size)
+        self._lock = threading.Lock()
+        self._stats = {"checked": 0, "rejected": 0, "rewritten": 0}
+
+    @staticmethod
+    def explain(conn: psycopg2.extensions.connection, query: str) -> Dict[str, Any]:
+        """Returns the root plan node of ``query``."""
+        with conn.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {query}")
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]["Plan"]
+
+    def _reject(self, query: str, plan: Dict[str, Any], reason: str) -> None:
+        with self._lock:
+            self._stats["rejected"] += 1
+        self._record(query, plan["Total Cost"], int(plan["Plan Rows"]), runtime=None, rows=None,
+                     rewritten=False, rejected=True)
+        hotspots = describe_plan_hotspots(plan, max(1, self.max_plan_rows // 10))
+        message = (f"Query rejected by the cost guardrail: {reason} "
+                   f"(estimated cost {plan['Total Cost']:.0f}, estimated rows {int(plan['Plan Rows'])}).")
+        if hotspots:
+            message += " Plan hotspots: " + "; ".join(hotspots) + "."
+        message += (" Rewrite it to be cheaper: filter with WHERE, join on keys, aggregate "
+                    "instead of listing rows, or add a LIMIT.")
+        raise QueryRejected(message)
+
+    def check(self, conn: psycopg2.extensions.connection, query: str) -> PlanCheck:
+        """Explains ``query`` and returns the (possibly rewritten) query to run, or raises."""
+        plan = self.explain(conn, query)
+        with self._lock:
+            self._stats["checked"] += 1
+        if not self.enabled:
+            return PlanCheck(query, plan["Total Cost"], int(plan["Plan Rows"]))
+
+        too_costly = plan["Total Cost"] > self.max_total_cost
+        too_many_rows = plan["Plan Rows"] > self.max_plan_rows
+        if not too_costly and not too_many_rows:
+            return PlanCheck(query, plan["Total Cost"], int(plan["Plan Rows"]))
+
+        reason = (f"cost is above the limit of {self.max_total_cost:.0f}" if too_costly
+                  else f"it would return more than {self.max_plan_rows} rows")
+        if self.on_violation == "reject":
+            self._reject(query, plan, reason)
+
+        # On their own lines, so a comment left in the query cannot swallow the closing parenthesis.
+        limited = f"SELECT * FROM (\n{strip_statement_end(query)}\n) AS guardrail_limited LIMIT {int(self.limit_rows)}"
+        limited_plan = self.explain(conn, limited)
+        if limited_plan["Total Cost"] > self.max_total_cost:
+            self._reject(query, plan, reason)
+        with self._lock:
+            self._stats["rewritten"] += 1
+        note = (f"The cost guardrail added LIMIT {self.limit_rows} because {reason} "
+                f"(~{int(plan['Plan Rows'])} rows estimated).")
+        logging.warning(note)
+        return PlanCheck(limited, limited_plan["Total Cost"], int(plan["Plan Rows"]), rewritten=True, note=note)
+
+    def record(self, check: PlanCheck, runtime: float, rows: int) -> None:
+        """Logs an executed query's estimated cost against its actual runtime."""
+        self._record(check.query, check.total_cost, check.plan_rows, runtime=runtime, rows=rows,
+                     rewritten=check.rewritten, rejected=False)
+
+    def _record(self, query: str, total_cost: float, plan_rows: int, runtime: float | None,
+                rows: int | None, rewritten: bool, rejected: bool) -> None:
+        entry = {"timestamp": time.time(), "query": query, "total_cost": total_cost,
+                 "plan_rows": plan_rows, "runtime_ms": None if runtime is None else runtime * 1000,
+                 "rows": rows, "rewritten": rewritten, "rejected": rejected}
+        with self._lock:
+            self._history.append(entry)
+            if self.log_path:
+                try:
+                    with open(self.log_path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(entry) + "\n")
+                except OSError as e:
+                    logging.warning(f"Could not append to the query plan log: {e}")
+
+    def history(self) -> List[Dict[str, Any]]:
+        """Recent checked queries, oldest first."""
+        with self._lock:
+            return list(self._history)
+
+    def stats(self) -> Dict[str, Any]:
+        """Check/reject/rewrite counters and the average runtime per unit of plan cost."""
+        with self._lock:
+            snapshot = dict(self._stats)
+            executed = [e for e in self._history if e["runtime_ms"] is not None and e["total_cost"] > 0]
+        snapshot["ms_per_cost_unit"] = (sum(e["runtime_ms"] / e["total_cost"] for e in executed) / len(executed)
+                                        if executed else 0.0)
+        return snapshot
@@ -2,49 +2,153 @@
 # File: services/rag_service.py
 # Description: Service for handling Retrieval-Augmented Generation from PDFs.
 
+import hashlib
 import logging
-from typing import List
+from typing import TYPE_CHECKING, Any, List
 
-from pypdf import PdfReader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import SentenceTransformerEmbeddings
+from config.rag import RAG_CONFIG
+from services.tracing import tracer
+
+# PDF, Langchain and FAISS imports are deferred to first use so that importing this module
+# (e.g. from app.py) does not pay for them until documents are actually processed.
+if TYPE_CHECKING:
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    from langchain_community.vectorstores import FAISS
+    from services.document_index import DocumentIndex
+    from services.ingestion import IngestionPipeline
+    from services.retrieval import HybridRetriever
 
 
 class RAGService:
     """Encapsulates the logic for PDF processing and vector search."""
 
-    def __init__(self):
-        # Initialize the embedding model once.
-        # This model runs locally and converts text to vectors.
-        self.embedding_model = SentenceTransformerEmbeddings(
-            model_name="all-MiniLM-L6-v2"
+    def __init__(self, embedding_model: Any = None, reranker: Any = None):
+        # The embedding model runs locally and converts text to vectors. Pass a shared
+        # instance (see services/resources.py) to avoid loading it once per service.
+        self._embedding_model = embedding_model
+        self._reranker = reranker
+        self._retriever: "HybridRetriever | None" = None
+        self._document_index: "DocumentIndex | None" = None
+        self._ingestion: "IngestionPipeline | None" = None
+        logging.info("RAGService initialized.")
+
+    @property
+    def embedding_model(self) -> Any:
+        """The SentenceTransformer model, loaded on first use."""
+        if self._embedding_model is None:
+            from langchain_community.embeddings import SentenceTransformerEmbeddings
+            self._embedding_model = SentenceTransformerEmbeddings(
+                model_name=RAG_CONFIG["embedding_model"]
+            )
+            logging.info("RAGService loaded the SentenceTransformer model.")
+        return self._embedding_model
+
+    @property
+    def retriever(self) -> "HybridRetriever":
+        """The retrieval pipeline, with the cross-encoder reranker if one is configured."""
+        if self._retriever is None:
+            from services.retrieval import CrossEncoderReranker, HybridRetriever
+            reranker = self._reranker
+            if reranker is None and RAG_CONFIG["reranker_model"]:
+                try:
+                    reranker = CrossEncoderReranker(RAG_CONFIG["reranker_model"],
+                                                    batch_size=RAG_CONFIG["rerank_batch_size"])
+                except Exception as e:
+                    logging.error(f"Could not load the reranker '{RAG_CONFIG['reranker_model']}': {e}")
+            self._retriever = HybridRetriever(
+                max_chunks=RAG_CONFIG["search_k"],
+                candidate_k=RAG_CONFIG["candidate_k"],
+                rrf_k=RAG_CONFIG["rrf_k"],
+                mmr_diversity=RAG_CONFIG["mmr_diversity"],
+                mmr_max_similarity=RAG_CONFIG["mmr_max_similarity"],
+                max_tokens=RAG_CONFIG["context_max_tokens"],
+                chunk_overlap=RAG_CONFIG["chunk_overlap"],
+                reranker=reranker,
+                rerank_candidates=RAG_CONFIG["rerank_candidates"],
+                hybrid=RAG_CONFIG["hybrid_search"],
+            )
+        return self._retriever
+
+    @property
+    def ingestion(self) -> "IngestionPipeline":
+        """The PDF ingestion pipeline, created on first use."""
+        if self._ingestion is None:
+            from services.ingestion import IngestionPipeline
+            self._ingestion = IngestionPipeline(
+                self._text_splitter(),
+                workers=RAG_CONFIG["extract_workers"],
+                pages_per_task=RAG_CONFIG["pages_per_task"],
+                parallel_min_pages=RAG_CONFIG["parallel_min_pages"],
+            )
+        return self._ingestion
+
+    @property
+    def document_index(self) -> "DocumentIndex":
+        """The persistent vector index, loaded from disk on first access."""
+        if self._document_index is None:
+            from services.document_index import DocumentIndex
+            self._document_index = DocumentIndex(
+                RAG_CONFIG["index_dir"], self.embedding_model, mmap=RAG_CONFIG["mmap"],
+                index_type=RAG_CONFIG["index_type"], index_params=RAG_CONFIG["index_params"])
+        return self._document_index
+
+    @staticmethod
+    def _text_splitter() -> "RecursiveCharacterTextSplitter":
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+        return RecursiveCharacterTextSplitter(
+            chunk_size=RAG_CONFIG["chunk_size"],
+            chunk_overlap=RAG_CONFIG["chunk_overlap"]
         )
-        logging.info("RAGService initialized with SentenceTransformer model.")
+
+    @staticmethod
+    def _read_bytes(pdf: Any) -> bytes:
+        """Reads an uploaded file (or any binary file-like object) without consuming it."""
+        data = pdf.getvalue() if hasattr(pdf, "getvalue") else pdf.read()
+        if hasattr(pdf, "seek"):
+            pdf.seek(0)
+        return data
+
+    def index_documents(self, pdf_docs: List[Any]) -> "DocumentIndex":
+        """Adds new PDFs to the persistent index, skipping ones already indexed by content hash.
+
+        A PDF that fails to index raises; the PDFs before it stay indexed.
+        """
+        index = self.document_index
+        for pdf in pdf_docs:
+            data = self._read_bytes(pdf)
+            content_hash = hashlib.sha256(data).hexdigest()
+            name = getattr(pdf, "name", content_hash[:12])
+            if index.contains(content_hash):
+                logging.info(f"Skipping already indexed document '{name}'.")
+                continue
+            # Pages are extracted in parallel and chunks are embedded in batches as they stream in.
+            with tracer.span("rag.index_document", document=name, bytes=len(data)) as span:
+                chunks = index.add_document(content_hash, name,
+                                            self.ingestion.iter_chunks(data, name, content_hash),
+                                            batch_size=RAG_CONFIG["embed_batch_size"])
+                span.set(chunks=chunks)
+        return index
 
     def extract_text_from_pdfs(self, pdf_docs: List[any]) -> str:
         """Extracts raw text from a list of uploaded PDF files."""
-        text = ""
+        from pypdf import PdfReader
+        parts = []
         for pdf in pdf_docs:
             try:
                 pdf_reader = PdfReader(pdf)
-                for page in pdf_reader.pages:
-                    text += page.extract_text() or ""
+                parts.extend(page.extract_text() or "" for page in pdf_reader.pages)
             except Exception as e:
                 logging.error(f"Error reading PDF {pdf.name}: {e}")
-        return text
+        return "".join(parts)
 
     def get_text_chunks(self, text: str) -> List[str]:
         """Splits a long text into smaller, manageable chunks."""
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200
-        )
-        chunks = text_splitter.split_text(text)
+        chunks = self._text_splitter().split_text(text)
         return chunks
 
-    def create_vector_store(self, text_chunks: List[str]) -> FAISS:
+    def create_vector_store(self, text_chunks: List[str]) -> "FAISS":
         """Creates a FAISS vector store from text chunks."""
+        from langchain_community.vectorstores import FAISS
         if not text_chunks:
             logging.warning("No text chunks provided to create vector store.")
             return None
@@ -56,11 +160,12 @@ class RAGService:
         logging.info("Vector store created successfully.")
         return vector_store
 
-    def get_context_from_query(self, vector_store: FAISS, user_question: str) -> str:
+    def get_context_from_query(self, vector_store: "FAISS", user_question: str) -> str:
         """Retrieves relevant context from the vector store based on a user query."""
         if not vector_store:
             return "No documents have been processed yet."
 
-        docs = vector_store.similarity_search(user_question)
-        context = "\n".join([doc.page_content for doc in docs])
+        with tracer.span("rag.search", k=RAG_CONFIG["search_k"]) as span:
+            context, docs = self.retriever.retrieve(vector_store, user_question)
+            span.set(chunks=len(docs), bytes=len(context))
         return context
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+# File: services/resources.py
+# Description: Process-wide registry of lazily created, shared heavy resources.
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict
+
+from config.rag import RAG_CONFIG
+
+
+class ResourceRegistry:
+    """Creates each registered resource on first use and shares it for the process lifetime.
+
+    Factories import their heavy dependencies themselves, so nothing (torch, FAISS,
+    langchain, ...) is imported until a resource is actually needed. Creation is
+    thread-safe: concurrent first calls build the resource once.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._load_times: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], Any]) -> None:
+        """Registers (or replaces) the factory for ``name``. An existing instance is kept."""
+        with self._lock:
+            self._factories[name] = factory
+            self._locks.setdefault(name, threading.Lock())
+
+    def get(self, name: str) -> Any:
+        """Returns the shared instance of ``name``, creating it on first use."""
+        if name in self._instances:
+            return self._instances[name]
+        with self._lock:
+            if name not in self._factories:
+                raise KeyError(f"No resource registered under '{name}'.")
+            lock = self._locks[name]
+        with lock:
+            if name not in self._instances:
+                started = time.perf_counter()
+                self._instances[name] = self._factories[name]()
+                self._load_times[name] = time.perf_counter() - started
+                logging.info(
+                    f"Resource '{name}' initialized in {self._load_times[name]:.2f}s.")
+        return self._instances[name]
+
+    def warm_up(self, *names: str) -> None:
+        """Initializes the given resources ahead of the first request, logging failures."""
+        for name in names:
+            try:
+                self.get(name)
+            except Exception as e:
+                logging.error(f"Warm-up of resource '{name}' failed: {e}")
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._instances
+
+    def load_times(self) -> Dict[str, float]:
+        """Seconds spent creating each loaded resource."""
+        return dict(self._load_times)
+
+
+def _create_embedding_model():
+    from langchain_community.embeddings import SentenceTransformerEmbeddings
+    return SentenceTransformerEmbeddings(model_name=RAG_CONFIG["embedding_model"])
+
+
+def _create_rag_service():
+    from services.rag_service import RAGService
+    return RAGService(embedding_model=registry.get("embedding_model"))
+
+
+def _create_data_analyst_agent():
+    from agents.agent_factory import agent_factory
+    return agent_factory.create_data_analyst_agent()
+
+
+def _create_presentation_agent():
+    from agents.agent_factory import agent_factory
+    return agent_factory.create_presentation_agent()
+
+
+def _create_db_manager():
+    from tools.database_tools import db_manager
+    db_manager.warm_up()
+    return db_manager
+
+
+def _create_fast_path():
+    from config.fast_path import FAST_PATH_CONFIG
+    if not FAST_PATH_CONFIG["enabled"]:
+        return None
+    from services.fast_path import build_fast_path
+    from services.tracing import metrics
+    from tools.database_tools import get_schema_catalog, run_read_only_query
+    fast_path = build_fast_path(catalog=get_schema_catalog, executor=run_read_only_query)
+    metrics.register_collector("fast_path", fast_path.stats)
+    return fast_path
+
+
+def _create_answer_renderer():
+    from config.rendering import ANSWER_RENDERER_CONFIG
+    if not ANSWER_RENDERER_CONFIG["enabled"]:
+        return None
+    from services.answer_renderer import AnswerRenderer
+    from services.tracing import metrics
+    renderer = AnswerRenderer(max_list_items=ANSWER_RENDERER_CONFIG["max_list_items"],
+                              max_table_rows=ANSWER_RENDERER_CONFIG["max_table_rows"],
+                              max_table_columns=ANSWER_RENDERER_CONFIG["max_table_columns"])
+    metrics.register_collector("answer_renderer", renderer.stats)
+    return renderer
+
+
+def _create_metrics_exporter():
+    from config.observability import TRACING_CONFIG
+    from services.tracing import start_exporter
+    return start_exporter(TRACING_CONFIG["metrics_port"])
+
+
+# The single, process-wide registry. Entry points register their own resources (e.g. the
+# response cache) on top of these defaults. Agents keep conversation history, so only
+# entry points that serve a single conversation should share them through the registry.
+registry = ResourceRegistry()
+registry.register("embedding_model", _create_embedding_model)
+registry.register("rag_service", _create_rag_service)
+registry.register("db_manager", _create_db_manager)
+registry.register("data_analyst_agent", _create_data_analyst_agent)
+registry.register("presentation_agent", _create_presentation_agent)
+registry.register("fast_path", _create_fast_path)
+registry.register("answer_renderer", _create_answer_renderer)
+registry.register("metrics_exporter", _create_metrics_exporter)
@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+# File: services/response_cache.py
+# Description: Exact/semantic answer cache that sits in front of the data analyst agent.
+
+import logging
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List
+
+from services.result_set import is_error_result
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+# What must be identical for a near-duplicate question to reuse another's SQL and result:
+# numbers (written either way), quoted literals, capitalized names, months and the direction
+# of superlatives ("top 3" vs "top 5", "Ana Silva" vs "Bruno Costa", "most" vs "least").
+_QUOTED = re.compile(r"[\'\"]([^\'\"]+)[\'\"]")
+_NAME = re.compile(r"(?<![.?!]\s)(?<!^)\b[A-ZÀ-Ý][\wÀ-ÿ]+")
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)?")
+_SIGNIFICANT_WORDS = {
+    **{word: str(n) for n, words in enumerate(
+        ["zero", "one um uma", "two dois duas", "three tres três", "four quatro", "five cinco",
+         "six seis", "seven sete", "eight oito", "nine nove", "ten dez"]) for word in words.split()},
+    **{word: f"month:{n}" for n, words in enumerate(
+        ["january janeiro", "february fevereiro", "march marco março", "april abril", "may maio",
+         "june junho", "july julho", "august agosto", "september setembro", "october outubro",
+         "november novembro", "december dezembro"], start=1) for word in words.split()},
+    **{word: "max" for word in "most highest largest biggest maximum max top expensive caro caros maior maiores mais".split()},
+    **{word: "min" for word in "least lowest smallest minimum min bottom cheapest cheap barato baratos menor menores menos".split()},
+}
+
+
+class CachedResponse:
+    """A cached request: the generated SQL plus (optionally) its latest result and answer."""
+
+    def __init__(self, request: str, sql: str | None, tables: List[str], embedding: List[float] | None,
+                 scope: str | None = None):
+        self.request = request
+        self.scope = scope
+        self.key = ResponseCache.key(request, scope)
+        self.sql = sql
+        self.tables = tables
+        self.embedding = embedding
+        self.signature = request_signature(request)
+        self.created_at = time.monotonic()
+        self.result: Any = None
+        self.result_at: float | None = None
+        self.answer: str | None = None
+        self.table_versions: Dict[str, int] = {}
+
+
+class ResponseCache:
+    """LRU + TTL cache of data-agent responses.
+
+    Two layers are kept per entry:
+
+    - the **SQL** generated by the agent (long ``sql_ttl``), which lets a hit with a stale
+      result re-execute the cheap query instead of re-prompting the LLM;
+    - the **result** (and final answer) produced by that SQL (short ``result_ttl``).
+
+    Lookups are exact on the normalized request. When an ``embedding_model`` (any object
+    with ``embed_query``, e.g. ``RAGService.embedding_model``) is given, near-duplicate
+    questions above ``similarity_threshold`` reuse the SQL and result too, but never the
+    exact answer text, and only when both have the same :func:`request_signature` (numbers,
+    names, months, superlative direction): "top 3" never reuses the rows of "top 5". Results
+    are dropped when the tables they read from change, either explicitly through
+    :meth:`invalidate_tables` or via ``change_detector``.
+
+    A request asked after earlier turns of a conversation ("and the top 5 of those?") may
+    depend on them, so callers pass that conversation as ``scope``: scoped entries are only
+    ever found again by lookups with the same scope.
+    """
+
+    def __init__(self, max_entries: int = 256, result_ttl: float = 300.0, sql_ttl: float = 86400.0,
+                 similarity_threshold: float = 0.92, embedding_model: Any = None,
+                 sql_executor: Callable[[str], Any] | None = None,
+                 change_detector: Callable[[List[str]], Dict[str, int]] | None = None):
+        self.max_entries = max_entries
+        self.result_ttl = result_ttl
+        self.sql_ttl = sql_ttl
+        self.similarity_threshold = similarity_threshold
+        self.embedding_model = embedding_model
+        self.sql_executor = sql_executor
+        self.change_detector = change_detector
+
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._stats = {"exact_hits": 0, "semantic_hits": 0, "sql_reexecutions": 0,
+                       "misses": 0, "evictions": 0, "invalidations": 0}
+
+    @staticmethod
+    def normalize(request: str) -> str:
+        """Lowercases, strips punctuation and collapses whitespace."""
+        return _WHITESPACE.sub(" ", _PUNCTUATION.sub(" ", request.lower())).strip()
+
+    @classmethod
+    def key(cls, request: str, scope: str | None = None) -> str:
+        """The entry key: the normalized request, prefixed by its conversation scope if any."""
+        normalized = cls.normalize(request)
+        return f"{scope}\x00{normalized}" if scope else normalized
+
+    def _embed(self, text: str) -> List[float] | None:
+        if self.embedding_model is None:
+            return None
+        try:
+            return list(self.embedding_model.embed_query(text))
+        except Exception as e:
+            logging.warning(f"Response cache embedding failed: {e}")
+            return None
+
+    @staticmethod
+    def _cosine(a: List[float], b: List[float]) -> float:
+        dot = sum(x * y for x, y in zip(a, b))
+        norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+        return dot / norm if norm else 0.0
+
+    def _find(self, key: str, embedding: List[float] | None, signature: tuple,
+              scope: str | None) -> tuple[CachedResponse | None, bool]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            return entry, True
+        if embedding is None:
+            return None, False
+
+        best, best_score = None, self.similarity_threshold
+        for candidate in self._entries.values():
+            if candidate.embedding is None or candidate.signature != signature or candidate.scope != scope:
+                continue
+            score = self._cosine(embedding, candidate.embedding)
+            if score >= best_score:
+                best, best_score = candidate, score
+        return best, False
+
+    def _data_changed(self, entry: CachedResponse) -> bool:
+        if self.change_detector is None or not entry.tables:
+            return False
+        try:
+            return self.change_detector(entry.tables) != entry.table_versions
+        except Exception as e:
+            logging.warning(f"Response cache change detection failed: {e}")
+            return True
+
+    def get(self, request: str, scope: str | None = None) -> Dict[str, Any] | None:
+        """Returns ``{"data", "answer", "sql", "source"}`` for a cached request, or ``None``.
+
+        ``source`` is ``"exact"``, ``"semantic"`` or ``"sql"`` (the cached SQL was re-executed).
+        ``answer`` is only returned for exact hits on a fresh result.
+        """
+        key = self.key(request, scope)
+        # Embedding and change detection run outside the lock: they are a model inference and
+        # a database round-trip, and would serialize every lookup of the process behind them.
+        with self._lock:
+            known = key in self._entries
+        embedding = None if known else self._embed(self.normalize(request))
+        with self._lock:
+            entry, exact = self._find(key, embedding, request_signature(request), scope)
+            now = time.monotonic()
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            if now - entry.created_at > self.sql_ttl:
+                self._entries.pop(entry.key, None)
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(entry.key)
+
+            fresh = entry.result_at is not None and now - entry.result_at <= self.result_ttl
+            result_at = entry.result_at
+
+        if fresh and self._data_changed(entry):
+            logging.info(
+                f"Response cache: data changed in {entry.tables}, dropping cached result.")
+            with self._lock:
+                if entry.result_at == result_at:
+                    entry.result, entry.result_at, entry.answer = None, None, None
+            fresh = False
+
+        with self._lock:
+            if fresh:
+                self._stats["exact_hits" if exact else "semantic_hits"] += 1
+                return {"data": entry.result, "answer": entry.answer if exact else None,
+                        "sql": entry.sql, "source": "exact" if exact else "semantic"}
+
+            if not entry.sql or self.sql_executor is None:
+                self._stats["misses"] += 1
+                return None
+            sql = entry.sql
+
+        # Re-execute outside the lock so a slow query does not block other lookups.
+        result = self.sql_executor(sql)
+        if is_error_result(result):
+            with self._lock:
+                self._stats["misses"] += 1
+            return None
+        versions = self._table_versions(entry.tables)
+        with self._lock:
+            self._store_result(entry, result, None, versions)
+            self._stats["sql_reexecutions"] += 1
+        return {"data": result, "answer": None, "sql": sql, "source": "sql"}
+
+    def _table_versions(self, tables: List[str]) -> Dict[str, int]:
+        """Current change counters of ``tables``; call without the lock (it queries the database)."""
+        if self.change_detector is None or not tables:
+            return {}
+        try:
+            return self.change_detector(tables)
+        except Exception as e:
+            logging.warning(
+                f"Response cache change detection failed: {e}")
+            return {}
+
+    @staticmethod
+    def _store_result(entry: CachedResponse, result: Any, answer: str | None,
+                      table_versions: Dict[str, int]) -> None:
+        entry.result = result
+        entry.result_at = time.monotonic()
+        entry.answer = answer
+        entry.table_versions = table_versions
+
+    def put(self, request: str, result: Any, sql: str | None = None, tables: List[str] | None = None,
+            answer: str | None = None, scope: str | None = None) -> None:
+        """Caches the SQL, result and (optionally) the final answer for a request."""
+        # Refusals and tool errors are not cached.
+        if result is None or is_error_result(result) or \
+                (isinstance(result, str) and result.strip() == "INVALID_REQUEST"):
+            return
+        embedding = self._embed(self.normalize(request))
+        entry = CachedResponse(request, sql, tables or [], embedding, scope)
+        key = entry.key
+        versions = self._table_versions(entry.tables)
+        with self._lock:
+            self._store_result(entry, result, answer, versions)
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def set_answer(self, request: str, answer: str, scope: str | None = None) -> None:
+        """Attaches the final (presented) answer to an existing exact entry."""
+        with self._lock:
+            entry = self._entries.get(self.key(request, scope))
+            if entry is not None and entry.result_at is not None:
+                entry.answer = answer
+
+    def invalidate_tables(self, tables: List[str]) -> int:
+        """Drops cached results (keeping the SQL) for every entry that reads from ``tables``.
+
+        Entries name their tables ``schema.table``; a bare name here matches it in any schema.
+        """
+        tables = set(tables)
+        dropped = 0
+        with self._lock:
+            for entry in self._entries.values():
+                names = set(entry.tables) | {table.split(".", 1)[-1] for table in entry.tables}
+                if tables & names and entry.result_at is not None:
+                    entry.result, entry.result_at, entry.answer = None, None, None
+                    dropped += 1
+            self._stats["invalidations"] += dropped
+        return dropped
+
+    def clear(self) -> None:
+        """Removes every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters."""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["entries"] = len(self._entries)
+        hits = snapshot["exact_hits"] + \
+            snapshot["semantic_hits"] + snapshot["sql_reexecutions"]
+        lookups = hits + snapshot["misses"]
+        snapshot["hit_ratio"] = hits / lookups if lookups else 0.0
+        return snapshot
+
+
+def request_signature(request: str) -> tuple:
+    """The numbers, quoted literals, names, months and superlative direction of a request."""
+    quoted = [literal.lower() for literal in _QUOTED.findall(request)]
+    names = [name.lower() for name in _NAME.findall(_QUOTED.sub(" ", request.strip()))
+             if name.lower() not in _SIGNIFICANT_WORDS]
+    words = ResponseCache.normalize(request).split()
+    numbers = [number.replace(",", ".") for number in _NUMBER.findall(request)]
+    significant = [_SIGNIFICANT_WORDS[word] for word in words if word in _SIGNIFICANT_WORDS]
+    return tuple(sorted(set(quoted + names + numbers + significant)))
+
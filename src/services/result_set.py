@@ -0,0 +1,454 @@
+# -*- coding: utf-8 -*-
+# File: services/result_set.py
+# Description: Column-oriented query results with compact JSON/markdown output and bounded summaries.
+
+import ast
+import datetime
+import json
+import math
+import re
+from array import array
+from collections import Counter
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List, Sequence
+
+# Typed storage per column: int64 and float64 arrays expose their buffer, so pandas/Arrow
+# can wrap them without copying. NaN marks NULL in float columns; integer columns with NULLs
+# keep a 0 in their place and a null mask (one byte per row, 1 = NULL) next to the array.
+_TYPECODES = {"integer": "q", "number": "d"}
+_JSON_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, datetime.timedelta):
+        return value.total_seconds()
+    if isinstance(value, (bytes, memoryview)):
+        return bytes(value).hex()
+    return str(value)
+
+
+def _kind_of(value: Any) -> str:
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, int):
+        return "integer"
+    if isinstance(value, (float, Decimal)):
+        return "number"
+    if isinstance(value, datetime.datetime):
+        return "datetime"
+    if isinstance(value, datetime.date):
+        return "date"
+    return "text"
+
+
+class _ColumnBuilder:
+    """Appends values to the narrowest storage that holds them, promoting as needed.
+
+    Integers (and NULLs among them, through a null mask) go to an int64 array until a
+    decimal shows up (then float64); any other value moves the column to a plain list.
+    """
+
+    __slots__ = ("kind", "values", "nulls")
+
+    def __init__(self):
+        self.kind: str | None = None    # None until the first non-NULL value.
+        self.values: List[Any] | array = []
+        self.nulls: bytearray | None = None
+
+    def _plain(self) -> List[Any]:
+        """The values appended so far, as Python values with NULLs as ``None``."""
+        if self.kind == "integer":
+            values = self.values.tolist()
+            return values if self.nulls is None else \
+                [None if null else v for v, null in zip(values, self.nulls)]
+        if self.kind == "number":
+            return [None if v != v else v for v in self.values]
+        return list(self.values)
+
+    def _promote(self, kind: str) -> None:
+        values = self._plain()
+        self.nulls = None
+        if kind == "integer":
+            self.values = array("q", [0 if v is None else v for v in values])
+            if None in values:
+                self.nulls = bytearray(v is None for v in values)
+        elif kind == "number":
+            self.values = array("d", [math.nan if v is None else float(v) for v in values])
+        else:
+            self.values = values
+        self.kind = kind
+
+    def append(self, value: Any) -> None:
+        kind = self.kind
+        if kind == "integer":
+            if type(value) is int or value is None:
+                try:
+                    self.values.append(0 if value is None else value)
+                except OverflowError:  # Beyond int64 (e.g. a huge numeric).
+                    self._promote("text")
+                    self.values.append(value)
+                    return
+                if value is None and self.nulls is None:
+                    self.nulls = bytearray(len(self.values) - 1)
+                if self.nulls is not None:
+                    self.nulls.append(value is None)
+                return
+            self._promote("number" if isinstance(value, (float, Decimal)) else "text")
+            self.append(value)
+        elif kind == "number":
+            if value is None:
+                self.values.append(math.nan)
+            elif isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+                self.values.append(float(value))
+            else:
+                self._promote("text")
+                self.values.append(value)
+        elif kind is None and value is not None:
+            self._promote(_kind_of(value))
+            self.append(value)
+        else:
+            self.values.append(value)
+
+    def extend(self, values: Sequence[Any]) -> None:
+        """Appends a batch, in bulk when the whole batch fits the column's current storage."""
+        start = 0
+        while self.kind is None and start < len(values):
+            self.append(values[start])
+            start += 1
+        values = values[start:]
+        if self.kind == "integer" and all(type(v) is int or v is None for v in values):
+            size = len(self.values)
+            has_nulls = None in values
+            try:
+                self.values.extend([0 if v is None else v for v in values] if has_nulls else values)
+            except OverflowError:
+                del self.values[size:]
+            else:
+                if has_nulls and self.nulls is None:
+                    self.nulls = bytearray(size)
+                if self.nulls is not None:
+                    self.nulls.extend([v is None for v in values] if has_nulls else bytes(len(values)))
+                return
+        elif self.kind == "number" and all(v is None or type(v) in (float, Decimal, int) for v in values):
+            self.values.extend([math.nan if v is None else float(v) for v in values])
+            return
+        elif self.kind not in _TYPECODES:
+            self.values.extend(values)
+            return
+        for value in values:
+            self.append(value)
+
+    def finish(self) -> tuple[str, List[Any] | array, bytearray | None]:
+        return self.kind or "text", self.values, self.nulls
+
+
+class ResultSetBuilder:
+    """Builds a :class:`ResultSet` row by row without materializing per-row dicts."""
+
+    def __init__(self, columns: Sequence[str]):
+        self.columns = list(columns)
+        self._builders = [_ColumnBuilder() for _ in self.columns]
+        self.row_count = 0
+
+    def append(self, row: Sequence[Any]) -> None:
+        for builder, value in zip(self._builders, row):
+            builder.append(value)
+        self.row_count += 1
+
+    def extend(self, rows: Sequence[Sequence[Any]]) -> None:
+        """Appends a batch of rows, one column at a time."""
+        if not rows:
+            return
+        for builder, values in zip(self._builders, zip(*rows)):
+            builder.extend(values)
+        self.row_count += len(rows)
+
+    def build(self, truncated: bool = False, total_estimate: int | None = None,
+              note: str | None = None) -> "ResultSet":
+        kinds, data, nulls = zip(*(builder.finish() for builder in self._builders)) if self._builders \
+            else ((), (), ())
+        return ResultSet(self.columns, list(data), list(kinds), truncated=truncated,
+                         total_estimate=total_estimate, note=note, nulls=list(nulls))
+
+
+def is_error_result(result: Any) -> bool:
+    """Whether a tool result reports a failure instead of data.
+
+    ``execute_sql_query`` returns ``[{"error": ...}]`` and the catalog tools ``"Error: ..."`` or
+    ``"Database error: ..."``, alone or in a one-item list. agno keeps ``str()`` of lists, a
+    Python literal rather than JSON, so both text forms are parsed.
+    """
+    payload = result
+    if isinstance(payload, str) and payload.strip().startswith("[") and "rror" in payload:
+        try:
+            payload = json.loads(payload)
+        except ValueError:
+            try:
+                payload = ast.literal_eval(payload.strip())
+            except (ValueError, SyntaxError, MemoryError, RecursionError):
+                return False
+    if isinstance(payload, list) and len(payload) == 1:
+        payload = payload[0]
+        if isinstance(payload, dict):
+            return "error" in payload
+    return isinstance(payload, str) and payload.strip().startswith(("Error", "Database error"))
+
+
+def _unique_names(columns: Iterable[str]) -> List[str]:
+    """Suffixes repeated column names (``id``, ``id_2``) so every column stays addressable."""
+    seen: Dict[str, int] = {}
+    names = []
+    for name in columns:
+        name = str(name)
+        seen[name] = seen.get(name, 0) + 1
+        names.append(name if seen[name] == 1 else f"{name}_{seen[name]}")
+    return names
+
+
+class ResultSet:
+    """A query result stored column by column under one shared header.
+
+    Integer and float columns are typed arrays (``nulls`` holds the null mask of integer
+    columns that have NULLs, ``None`` otherwise); other columns are lists. ``str()`` gives the
+    compact JSON form ``{"columns": [...], "rows": [[...], ...]}`` (plus ``truncated``,
+    ``total_estimate`` and ``note`` when set), which is what the data agent sees and returns.
+    :meth:`summary` gives a size-bounded view (row count, per-column aggregates and the first
+    rows) for prompts; :meth:`to_pandas` and :meth:`to_arrow` wrap the typed arrays without
+    copying them.
+    """
+
+    def __init__(self, columns: Sequence[str], data: Sequence[List[Any] | array], kinds: Sequence[str],
+                 truncated: bool = False, total_estimate: int | None = None, note: str | None = None,
+                 nulls: Sequence[bytearray | None] | None = None):
+        if not len(columns) == len(data) == len(kinds):
+            raise ValueError("columns, data and kinds must have the same length.")
+        self.columns = _unique_names(columns)
+        self.data = list(data)
+        self.kinds = list(kinds)
+        self.nulls = list(nulls) if nulls is not None else [None] * len(self.data)
+        self.truncated = truncated
+        self.total_estimate = total_estimate
+        self.note = note
+
+    # -- construction ---------------------------------------------------------------------
+
+    @classmethod
+    def from_rows(cls, columns: Sequence[str], rows: Iterable[Sequence[Any]], **kwargs: Any) -> "ResultSet":
+        builder = ResultSetBuilder(columns)
+        builder.extend(rows if isinstance(rows, (list, tuple)) else list(rows))
+        return builder.build(**kwargs)
+
+    @classmethod
+    def from_records(cls, records: Sequence[Dict[str, Any]], **kwargs: Any) -> "ResultSet":
+        """Builds a result from a list of row dicts (the pre-columnar format)."""
+        columns = list(records[0]) if records else []
+        return cls.from_rows(columns, ([record.get(c) for c in columns] for record in records), **kwargs)
+
+    @classmethod
+    def from_payload(cls, payload: Any) -> "ResultSet | None":
+        """Reads any result shape consumers may receive, or returns ``None`` if it is not tabular.
+
+        Accepts a ``ResultSet``, its compact JSON (as text or parsed, optionally inside a
+        markdown code fence), a list of row dicts, or the older ``{"rows": [...],
+        "truncated": true}`` dict. Tool errors (``[{"error": ...}]``) are not tabular.
+        """
+        if isinstance(payload, ResultSet):
+            return payload
+        if isinstance(payload, str):
+            text = _JSON_FENCE.sub("", payload.strip())
+            if not text.startswith(("{", "[")):
+                return None
+            try:
+                payload = json.loads(text)
+            except ValueError:
+                return None
+        if isinstance(payload, list):
+            if not payload or not all(isinstance(row, dict) for row in payload):
+                return None
+            if len(payload) == 1 and set(payload[0]) == {"error"}:
+                return None
+            return cls.from_records(payload)
+        if not isinstance(payload, dict):
+            return None
+        extra = {"truncated": bool(payload.get("truncated")), "total_estimate": payload.get("total_estimate"),
+                 "note": payload.get("note")}
+        if isinstance(payload.get("columns"), list) and isinstance(payload.get("rows"), list):
+            return cls.from_rows(payload["columns"], payload["rows"], **extra)
+        rows = payload.get("rows")
+        if isinstance(rows, list) and all(isinstance(row, dict) for row in rows):
+            return cls.from_records(rows, **extra)
+        return None
+
+    # -- access ---------------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.data[0]) if self.data else 0
+
+    @property
+    def row_count(self) -> int:
+        return len(self)
+
+    def column_values(self, index: int) -> List[Any]:
+        """Plain Python values of one column, with NULLs as ``None``."""
+        values, nulls = self.data[index], self.nulls[index]
+        if self.kinds[index] == "number":
+            return [None if v != v else v for v in values]
+        if nulls is not None:
+            return [None if null else v for v, null in zip(values.tolist(), nulls)]
+        return values.tolist() if isinstance(values, array) else list(values)
+
+    def rows(self, limit: int | None = None) -> List[List[Any]]:
+        columns = [self.column_values(i) for i in range(len(self.columns))]
+        if limit is not None:
+            columns = [values[:limit] for values in columns]
+        return [list(row) for row in zip(*columns)]
+
+    def records(self) -> List[Dict[str, Any]]:
+        """Row dicts, for callers that still want the pre-columnar shape."""
+        return [dict(zip(self.columns, row)) for row in self.rows()]
+
+    # -- serialization --------------------------------------------------------------------
+
+    def _json_rows(self, limit: int | None = None) -> List[List[Any]]:
+        """Rows with dates already as ISO strings, so the C JSON encoder rarely calls back."""
+        columns = []
+        for index, kind in enumerate(self.kinds):
+            values = self.column_values(index)[:limit]
+            if kind in ("date", "datetime"):
+                values = [v.isoformat() if isinstance(v, (datetime.date, datetime.time)) else v for v in values]
+            columns.append(values)
+        return [list(row) for row in zip(*columns)]
+
+    def _envelope(self, rows: List[List[Any]]) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {"columns": self.columns, "rows": rows}
+        if self.truncated:
+            payload["truncated"] = True
+            payload["row_count"] = len(self)
+            payload["total_estimate"] = self.total_estimate
+        if self.note:
+            payload["note"] = self.note
+        return payload
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self._envelope(self._json_rows())
+
+    def to_json(self, indent: int | None = None) -> str:
+        separators = (",", ":") if indent is None else (",", ": ")
+        return json.dumps(self.to_dict(), indent=indent, separators=separators, ensure_ascii=False,
+                          default=_json_default)
+
+    def __str__(self) -> str:
+        return self.to_json()
+
+    def __repr__(self) -> str:
+        return f"ResultSet(columns={self.columns!r}, rows={len(self)}, truncated={self.truncated})"
+
+    def to_markdown(self, max_rows: int | None = None) -> str:
+        """A GitHub-flavoured markdown table of the first ``max_rows`` rows (all by default)."""
+        def cell(value: Any) -> str:
+            if value is None:
+                return ""
+            if not isinstance(value, (str, int, float)):
+                value = _json_default(value)
+            return str(value).replace("|", "\\|").replace("\n", " ")
+
+        lines = ["| " + " | ".join(cell(c) for c in self.columns) + " |",
+                 "|" + "|".join(":---" if kind in ("text", "date", "datetime", "boolean") else "---:"
+                                for kind in self.kinds) + "|"]
+        lines.extend("| " + " | ".join(cell(v) for v in row) + " |" for row in self.rows(max_rows))
+        return "\n".join(lines)
+
+    def summary(self, sample_rows: int = 10, top_values: int = 5) -> Dict[str, Any]:
+        """A size-bounded description: row count, per-column aggregates and the first rows.
+
+        Numeric columns report ``min``/``max``/``mean``/``sum``; other columns report the number
+        of distinct values and the ``top_values`` most frequent ones. Only ``sample_rows`` rows
+        are included, so the size depends on the number of columns, not on the number of rows.
+        """
+        columns = []
+        for index, (name, kind) in enumerate(zip(self.columns, self.kinds)):
+            values = self.column_values(index)
+            present = [v for v in values if v is not None]
+            info: Dict[str, Any] = {"name": name, "type": kind, "nulls": len(values) - len(present)}
+            if kind in _TYPECODES and present:
+                total = math.fsum(present)
+                info.update(min=min(present), max=max(present), mean=round(total / len(present), 4),
+                            sum=int(total) if kind == "integer" else round(total, 4))
+            elif present:
+                try:
+                    counts = Counter(present)
+                except TypeError:  # Unhashable values, e.g. json/array columns.
+                    counts = Counter(str(v) for v in present)
+                info["distinct"] = len(counts)
+                if len(counts) < len(present):
+                    info["top"] = [[value, count] for value, count in counts.most_common(top_values)]
+                if kind in ("date", "datetime"):
+                    info.update(min=min(present), max=max(present))
+            columns.append(info)
+
+        summary: Dict[str, Any] = {"row_count": len(self), "columns": columns,
+                                   "sample": self._json_rows(sample_rows)}
+        if self.truncated:
+            summary["truncated"] = True
+            summary["total_estimate"] = self.total_estimate
+        if self.note:
+            summary["note"] = self.note
+        if len(self) > sample_rows:
+            summary["sample_note"] = f"First {sample_rows} of {len(self)} rows."
+        return summary
+
+    def for_prompt(self, inline_max_chars: int, sample_rows: int = 10, top_values: int = 5) -> str:
+        """The whole result as compact JSON when it fits in ``inline_max_chars``, else its summary."""
+        full = self.to_json()
+        if len(full) <= inline_max_chars:
+            return full
+        return json.dumps({"summary": self.summary(sample_rows, top_values)}, separators=(",", ":"),
+                          ensure_ascii=False, default=_json_default)
+
+    # -- zero-copy conversion -------------------------------------------------------------
+
+    def to_pandas(self) -> Any:
+        """A pandas DataFrame sharing memory with the integer and float columns.
+
+        Integer columns with NULLs become nullable ``Int64`` columns.
+        """
+        import numpy as np
+        import pandas as pd
+
+        arrays = {}
+        for name, kind, values, nulls in zip(self.columns, self.kinds, self.data, self.nulls):
+            if nulls is not None:
+                arrays[name] = pd.arrays.IntegerArray(np.frombuffer(values, dtype=np.int64),
+                                                      np.frombuffer(nulls, dtype=np.bool_))
+            elif isinstance(values, array):
+                arrays[name] = np.frombuffer(values, dtype=np.int64 if kind == "integer" else np.float64)
+            else:
+                arrays[name] = np.array(values, dtype=object)
+        return pd.DataFrame(arrays, columns=self.columns, copy=False)
+
+    def to_arrow(self) -> Any:
+        """A pyarrow Table sharing memory with the integer and float columns."""
+        try:
+            import pyarrow as pa
+        except ImportError as e:
+            raise ImportError("ResultSet.to_arrow() requires pyarrow (pip install pyarrow).") from e
+
+        arrays = []
+        for kind, values, nulls in zip(self.kinds, self.data, self.nulls):
+            if nulls is not None:
+                import numpy as np
+                arrays.append(pa.array(np.frombuffer(values, dtype=np.int64),
+                                       mask=np.frombuffer(nulls, dtype=np.bool_)))
+            elif isinstance(values, array):
+                arrow_type = pa.int64() if kind == "integer" else pa.float64()
+                arrays.append(pa.Array.from_buffers(arrow_type, len(values), [None, pa.py_buffer(values)]))
+            else:
+                arrays.append(pa.array([_json_default(v) if isinstance(v, Decimal) else v for v in values]))
+        return pa.Table.from_arrays(arrays, names=self.columns)
+
+    def __iter__(self) -> Iterator[List[Any]]:
+        return iter(self.rows())
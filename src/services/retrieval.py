@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+# File: services/retrieval.py
+# Description: Hybrid retrieval for the RAG agent: BM25 + dense search, RRF fusion, MMR and a token-budgeted context.
+
+import logging
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+from services.tracing import tracer
+
+_WORD = re.compile(r"[a-z0-9]+(?:[.,][0-9]+)*")
+# Frequent EN/PT-BR words that carry no meaning for ranking.
+_STOP_WORDS = frozenset("""
+a an and are as at be by did do does for from had has have how in is it its of on or that the
+their there this to was were what when where which who why with
+o os as um uma de da do das dos e em no na nos nas por para com que qual quais foi foram ser
+se ao aos sua seu suas seus como mais
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased, accent-free words and numbers (``4.850.000`` stays one token), minus stop words."""
+    text = unicodedata.normalize("NFKD", text.lower()).encode("ascii", "ignore").decode("ascii")
+    return [word for word in _WORD.findall(text) if word not in _STOP_WORDS]
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate model tokens of ``text`` (about four characters per token)."""
+    return (len(text) + 3) // 4
+
+
+class BM25Index:
+    """In-memory inverted index scoring documents with Okapi BM25.
+
+    Postings map each term to ``{doc_id: term frequency}``, so a query only touches the
+    documents that contain one of its terms. Thread-safe; removals are immediate.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._lengths: Dict[str, int] = {}
+        self._doc_terms: Dict[str, List[str]] = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def add(self, doc_id: str, text: str) -> None:
+        terms = Counter(tokenize(text))
+        with self._lock:
+            if doc_id in self._lengths:
+                self._remove(doc_id)
+            for term, count in terms.items():
+                self._postings[term][doc_id] = count
+            self._lengths[doc_id] = sum(terms.values())
+            self._doc_terms[doc_id] = list(terms)
+            self._total_length += self._lengths[doc_id]
+
+    def remove(self, doc_ids: Iterable[str]) -> None:
+        with self._lock:
+            for doc_id in doc_ids:
+                if doc_id in self._lengths:
+                    self._remove(doc_id)
+
+    def _remove(self, doc_id: str) -> None:
+        for term in self._doc_terms.pop(doc_id):
+            del self._postings[term][doc_id]
+            if not self._postings[term]:
+                del self._postings[term]
+        self._total_length -= self._lengths.pop(doc_id)
+
+    def search(self, query: str, k: int = 20,
+               accept: Callable[[str], bool] | None = None) -> List[Tuple[str, float]]:
+        """Returns up to ``k`` ``(doc_id, score)`` pairs, best first; ``accept`` filters doc ids."""
+        with self._lock:
+            count = len(self._lengths)
+            if not count:
+                return []
+            average_length = self._total_length / count
+            scores: Dict[str, float] = defaultdict(float)
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, frequency in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / average_length)
+                    scores[doc_id] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+        ranked = sorted(scores.items(), key=lambda item: -item[1])
+        if accept is not None:
+            ranked = [item for item in ranked if accept(item[0])]
+        return ranked[:k]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Fuses ranked id lists: each id scores ``sum(1 / (k + rank))`` over the lists it appears in."""
+    scores: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            scores[doc_id] += 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: -item[1])
+
+
+def _cosine(a: Counter, norm_a: float, b: Counter, norm_b: float) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    dot = sum(count * b.get(term, 0) for term, count in a.items())
+    return dot / (norm_a * norm_b) if norm_a and norm_b else 0.0
+
+
+def mmr_select(candidates: List[Tuple[Document, float]], limit: int, diversity: float = 0.3,
+               max_similarity: float = 0.8) -> List[Document]:
+    """Maximal marginal relevance over term vectors.
+
+    Picks, one at a time, the candidate maximizing ``(1 - diversity) * relevance - diversity *
+    similarity to the picked ones`` (relevance scaled to [0, 1]). Candidates more similar than
+    ``max_similarity`` to a picked chunk are dropped as near-duplicates, e.g. overlapping chunks.
+    """
+    if not candidates:
+        return []
+    top = max(score for _, score in candidates) or 1.0
+    # [document, relevance, terms, norm, highest similarity to a picked chunk]
+    pool = []
+    for document, score in candidates:
+        terms = Counter(tokenize(document.page_content))
+        pool.append([document, score / top, terms, math.sqrt(sum(c * c for c in terms.values())), 0.0])
+    picked: List[Document] = []
+    while pool and len(picked) < limit:
+        best = max(range(len(pool)), key=lambda i: (1 - diversity) * pool[i][1] - diversity * pool[i][4])
+        document, _, terms, norm, similarity = pool.pop(best)
+        if similarity > max_similarity:
+            continue
+        picked.append(document)
+        for entry in pool:
+            entry[4] = max(entry[4], _cosine(entry[2], entry[3], terms, norm))
+    return picked
+
+
+def _strip_overlap(previous: str, text: str, max_overlap: int) -> str:
+    """Drops the start of ``text`` that repeats the end of ``previous`` (chunk overlap)."""
+    for size in range(min(max_overlap, len(previous), len(text)), 20, -1):
+        if previous.endswith(text[:size]):
+            return text[size:].lstrip()
+    return text
+
+
+def assemble_context(documents: List[Document], max_tokens: int,
+                     max_overlap: int = 200) -> Tuple[str, List[Document]]:
+    """Joins chunks, most relevant first, until ``max_tokens`` is reached; returns ``(context, used chunks)``.
+
+    Chunks are labeled with their source and page. Consecutive chunks of the same document
+    are merged in reading order and the text they share through the splitter's overlap is
+    sent once. A chunk that does not fit is skipped; only the first one may be truncated.
+    """
+    kept, used = [], 0
+    for document in documents:
+        cost = estimate_tokens(document.page_content) + 8
+        if used + cost > max_tokens:
+            if kept:
+                continue
+            document = Document(page_content=document.page_content[:max(0, max_tokens - 8) * 4],
+                                metadata=document.metadata)
+            cost = max_tokens
+        kept.append(document)
+        used += cost
+
+    def position(document: Document) -> Tuple[str, int]:
+        return document.metadata.get("doc_hash", ""), document.metadata.get("chunk", -1)
+
+    order = {id(document): rank for rank, document in enumerate(kept)}
+    groups: List[List[Document]] = []
+    for document in sorted(kept, key=position):
+        doc_hash, chunk = position(document)
+        if groups and chunk >= 0 and position(groups[-1][-1]) == (doc_hash, chunk - 1):
+            groups[-1].append(document)
+        else:
+            groups.append([document])
+    groups.sort(key=lambda group: min(order[id(document)] for document in group))
+
+    passages = []
+    for group in groups:
+        text = group[0].page_content
+        for previous, document in zip(group, group[1:]):
+            text += " " + _strip_overlap(previous.page_content, document.page_content, max_overlap)
+        metadata = group[0].metadata
+        label = metadata.get("source")
+        if label and metadata.get("page"):
+            label += f", p. {metadata['page']}"
+        passages.append(f"[{label}]\n{text}" if label else text)
+    return "\n\n".join(passages), kept
+
+
+class CrossEncoderReranker:
+    """Scores (query, chunk) pairs with a local sentence-transformers cross-encoder, in batches."""
+
+    def __init__(self, model_name: str, batch_size: int = 16):
+        from sentence_transformers import CrossEncoder
+        self.model = CrossEncoder(model_name)
+        self.batch_size = batch_size
+
+    def rerank(self, query: str, documents: List[Document]) -> List[Tuple[Document, float]]:
+        if not documents:
+            return []
+        scores = self.model.predict([(query, document.page_content) for document in documents],
+                                    batch_size=self.batch_size)
+        return sorted(zip(documents, (float(score) for score in scores)), key=lambda item: -item[1])
+
+
+class HybridRetriever:
+    """Retrieves a compact context for a question from a :class:`DocumentIndex`.
+
+    1. Dense (FAISS) and BM25 searches each return ``candidate_k`` chunks.
+    2. Reciprocal-rank fusion merges the two rankings; chunks found by both rise.
+    3. An optional ``reranker`` re-scores the best ``rerank_candidates`` in batches.
+    4. MMR picks up to ``max_chunks``, skipping near-duplicates.
+    5. The picked chunks are assembled into at most ``max_tokens`` of context.
+
+    Any object with ``similarity_search`` (e.g. a bare FAISS store) works too; without a
+    ``keyword_search`` method, or with ``hybrid=False``, it is searched densely only.
+    """
+
+    def __init__(self, max_chunks: int = 4, candidate_k: int = 20, rrf_k: int = 60,
+                 mmr_diversity: float = 0.3, mmr_max_similarity: float = 0.8, max_tokens: int = 1500,
+                 chunk_overlap: int = 200, reranker: Any = None, rerank_candidates: int = 20,
+                 hybrid: bool = True):
+        self.max_chunks = max_chunks
+        self.candidate_k = candidate_k
+        self.rrf_k = rrf_k
+        self.mmr_diversity = mmr_diversity
+        self.mmr_max_similarity = mmr_max_similarity
+        self.max_tokens = max_tokens
+        self.chunk_overlap = chunk_overlap
+        self.reranker = reranker
+        self.rerank_candidates = rerank_candidates
+        self.hybrid = hybrid
+
+    @staticmethod
+    def _doc_id(document: Document) -> str:
+        metadata = document.metadata
+        if "doc_hash" in metadata and "chunk" in metadata:
+            return f"{metadata['doc_hash']}:{metadata['chunk']}"
+        return document.page_content
+
+    def candidates(self, store: Any, query: str) -> List[Tuple[Document, float]]:
+        """Fused (and optionally reranked) candidates with their scores, best first."""
+        with tracer.span("rag.dense_search", k=self.candidate_k) as span:
+            dense = store.similarity_search(query, k=self.candidate_k)
+            span.set(chunks=len(dense))
+        by_id = {self._doc_id(document): document for document in dense}
+        rankings = [list(by_id)]
+
+        keyword_search = getattr(store, "keyword_search", None) if self.hybrid else None
+        if keyword_search is not None:
+            with tracer.span("rag.keyword_search", k=self.candidate_k) as span:
+                sparse = keyword_search(query, k=self.candidate_k)
+                span.set(chunks=len(sparse))
+            for document in sparse:
+                by_id.setdefault(self._doc_id(document), document)
+            rankings.append([self._doc_id(document) for document in sparse])
+
+        fused = [(by_id[doc_id], score) for doc_id, score in reciprocal_rank_fusion(rankings, self.rrf_k)]
+        if self.reranker is not None and fused:
+            with tracer.span("rag.rerank", chunks=min(len(fused), self.rerank_candidates)):
+                try:
+                    head = self.reranker.rerank(query, [d for d, _ in fused[:self.rerank_candidates]])
+                    # Cross-encoder logits can be negative; shift them so MMR relevance stays in [0, 1].
+                    low = min(score for _, score in head)
+                    fused = [(document, score - low) for document, score in head]
+                except Exception as e:
+                    logging.warning(f"Reranking failed, using the fused ranking: {e}")
+        return fused
+
+    def retrieve(self, store: Any, query: str) -> Tuple[str, List[Document]]:
+        """Returns the context string and the chunks it was built from."""
+        candidates = self.candidates(store, query)
+        selected = mmr_select(candidates, self.max_chunks, self.mmr_diversity, self.mmr_max_similarity)
+        return assemble_context(selected, self.max_tokens, self.chunk_overlap)
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+# File: services/router.py
+# Description: Routes prompts to the database, document or small-talk handler by embedding similarity.
+
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple
+
+import numpy as np
+
+from config.routing import ROUTE_EXAMPLES, ROUTE_KEYWORDS, ROUTER_CONFIG
+from services.schema_catalog import CatalogSnapshot, _singular
+
+ROUTES = ("database", "documents", "small_talk")
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+class RouteDecision(NamedTuple):
+    route: str                  # database | documents | small_talk
+    confidence: float           # Best cosine similarity, or the classifier's share of the matched weight.
+    method: str                 # embedding | classifier | default
+    scores: Dict[str, float]
+
+
+def _terms(text: str) -> List[str]:
+    """Lowercased, accent-free, singularized words."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return [_singular(word) for word in _WORD.findall(text.replace("_", " "))]
+
+
+class KeywordClassifier:
+    """Cheap fallback: sums the weights of prompt terms that belong to exactly one intent.
+
+    The vocabulary of an intent is its keywords (weight 2) plus the words of its example
+    prompts (weight 1, three letters or more); terms shared by several intents ("what",
+    "show") are dropped, so only distinctive ones score.
+    """
+
+    def __init__(self, examples: Dict[str, List[str]], keywords: Dict[str, List[str]]):
+        owners, weights = defaultdict(set), {}
+        for route in ROUTES:
+            for text in examples.get(route, []):
+                for term in _terms(text):
+                    if len(term) > 2:
+                        owners[term].add(route)
+                        weights.setdefault(term, 1.0)
+            for text in keywords.get(route, []):
+                for term in _terms(text):
+                    owners[term].add(route)
+                    weights[term] = 2.0
+        self._base = {term: (next(iter(routes)), weights[term])
+                      for term, routes in owners.items() if len(routes) == 1}
+        self._shared = {term for term, routes in owners.items() if len(routes) > 1}
+        self._vocabulary = self._base
+
+    def set_catalog_terms(self, terms: List[str]) -> None:
+        """Adds table/column name parts to the database vocabulary (unless another intent owns them)."""
+        vocabulary = dict(self._base)
+        for term in terms:
+            if len(term) > 2 and term not in self._shared:
+                vocabulary.setdefault(term, ("database", 1.0))
+        self._vocabulary = vocabulary
+
+    def scores(self, prompt: str) -> Dict[str, float]:
+        scores = dict.fromkeys(ROUTES, 0.0)
+        for term in set(_terms(prompt)):
+            if term in self._vocabulary:
+                route, weight = self._vocabulary[term]
+                scores[route] += weight
+        return scores
+
+
+class RequestRouter:
+    """Picks the handler for a prompt by comparing its embedding with per-intent centroids.
+
+    Each intent has a centroid, the normalized mean embedding of its example prompts;
+    when ``catalog`` (a callable returning a :class:`CatalogSnapshot`) is given, one sentence
+    per table listing its columns forms a second "database" centroid, so questions about
+    ``order_items`` or ``stock_quantity`` route to the database without any hard-coded word.
+    An intent scores the best cosine similarity among its centroids.
+
+    Centroids are computed once per set of example texts (and catalog), kept in memory and,
+    with ``centroid_cache_file``, on disk. Without an ``embedding_model``, or when the best
+    score is below ``min_similarity`` or within ``min_margin`` of the runner-up, the
+    :class:`KeywordClassifier` decides; ``default_route`` is used when it matches nothing.
+    """
+
+    def __init__(self, embedding_model: Any = None, catalog: Callable[[], CatalogSnapshot] | None = None,
+                 examples: Dict[str, List[str]] | None = None, keywords: Dict[str, List[str]] | None = None,
+                 min_similarity: float = 0.30, min_margin: float = 0.03, default_route: str = "database",
+                 catalog_max_tables: int = 200, centroid_cache_file: str | None = None):
+        if default_route not in ROUTES:
+            raise ValueError(f"default_route must be one of {ROUTES}, got '{default_route}'.")
+        self.embedding_model = embedding_model
+        self.catalog = catalog
+        self.examples = examples if examples is not None else ROUTE_EXAMPLES
+        self.min_similarity = min_similarity
+        self.min_margin = min_margin
+        self.default_route = default_route
+        self.catalog_max_tables = catalog_max_tables
+        self.centroid_cache_file = centroid_cache_file
+        self.classifier = KeywordClassifier(self.examples, keywords if keywords is not None else ROUTE_KEYWORDS)
+
+        self._lock = threading.Lock()
+        # Counters have their own lock: ``_lock`` is held while centroids are embedded.
+        self._stats_lock = threading.Lock()
+        self._snapshot: CatalogSnapshot | None = None
+        self._catalog_sentences: List[str] = []
+        self._centroids: Tuple[str, List[str], np.ndarray] | None = None   # (key, routes, matrix)
+        self._stats = {"routed": 0, "embedding": 0, "classifier": 0, "default": 0,
+                       "embedding_failures": 0, "centroid_builds": 0, "seconds": 0.0}
+        self._stats.update({route: 0 for route in ROUTES})
+
+    # --- Catalog -------------------------------------------------------------
+
+    def _refresh_catalog(self) -> None:
+        """Re-derives the catalog sentences and terms when the catalog snapshot changed."""
+        if self.catalog is None:
+            return
+        try:
+            snapshot = self.catalog()
+        except Exception as e:
+            logging.warning(f"Router could not load the schema catalog: {e}")
+            return
+        if snapshot is self._snapshot:
+            return
+        sentences, terms = [], []
+        for (schema, table), columns in list(snapshot.columns.items())[:self.catalog_max_tables]:
+            names = [column for column, _ in columns]
+            sentences.append(f"{table.replace('_', ' ')} table with "
+                             f"{', '.join(name.replace('_', ' ') for name in names)}")
+            terms.extend(_terms(" ".join([table] + names)))
+        self._snapshot = snapshot
+        self._catalog_sentences = sentences
+        self.classifier.set_catalog_terms(terms)
+
+    # --- Centroids -----------------------------------------------------------
+
+    def _centroid_groups(self) -> List[Tuple[str, List[str]]]:
+        groups = [(route, list(self.examples.get(route, []))) for route in ROUTES]
+        if self._catalog_sentences:
+            groups.append(("database", list(self._catalog_sentences)))
+        return [(route, texts) for route, texts in groups if texts]
+
+    def _load_cached(self, key: str) -> np.ndarray | None:
+        if not self.centroid_cache_file:
+            return None
+        try:
+            with open(self.centroid_cache_file, "r", encoding="utf-8") as f:
+                vectors = json.load(f).get(key)
+        except (OSError, ValueError):
+            return None
+        return np.asarray(vectors, dtype=np.float32) if vectors else None
+
+    def _store_cached(self, key: str, matrix: np.ndarray) -> None:
+        if not self.centroid_cache_file:
+            return
+        try:
+            with open(self.centroid_cache_file, "w", encoding="utf-8") as f:
+                json.dump({key: matrix.tolist()}, f)
+        except OSError as e:
+            logging.warning(f"Could not save router centroids to {self.centroid_cache_file}: {e}")
+
+    def centroids(self) -> Tuple[List[str], np.ndarray]:
+        """Returns the route of each centroid and the centroids as unit-length matrix rows."""
+        self._refresh_catalog()
+        groups = self._centroid_groups()
+        key = hashlib.sha1(json.dumps([str(getattr(self.embedding_model, "model_name", "")), groups])
+                           .encode("utf-8")).hexdigest()
+        cached = self._centroids
+        if cached is not None and cached[0] == key:
+            return cached[1], cached[2]
+        with self._lock:
+            if self._centroids is not None and self._centroids[0] == key:
+                return self._centroids[1], self._centroids[2]
+            routes = [route for route, _ in groups]
+            matrix = self._load_cached(key)
+            if matrix is None or len(matrix) != len(routes):
+                texts = [text for _, group in groups for text in group]
+                vectors = np.asarray(self.embedding_model.embed_documents(texts), dtype=np.float32)
+                rows, start = [], 0
+                for _, group in groups:
+                    rows.append(self._unit(vectors[start:start + len(group)]).mean(axis=0))
+                    start += len(group)
+                matrix = self._unit(np.vstack(rows))
+                self._store_cached(key, matrix)
+                with self._stats_lock:
+                    self._stats["centroid_builds"] += 1
+            self._centroids = (key, routes, matrix)
+            return routes, matrix
+
+    @staticmethod
+    def _unit(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    # --- Routing -------------------------------------------------------------
+
+    def _embedding_scores(self, prompt: str) -> Dict[str, float] | None:
+        if self.embedding_model is None:
+            return None
+        try:
+            routes, matrix = self.centroids()
+            query = self._unit(np.asarray(self.embedding_model.embed_query(prompt), dtype=np.float32))
+        except Exception as e:
+            with self._stats_lock:
+                self._stats["embedding_failures"] += 1
+            logging.warning(f"Embedding routing failed, using the keyword classifier: {e}")
+            return None
+        scores = dict.fromkeys(ROUTES, -1.0)
+        for route, similarity in zip(routes, matrix @ query):
+            scores[route] = max(scores[route], float(similarity))
+        return scores
+
+    def _decide(self, prompt: str) -> RouteDecision:
+        scores = self._embedding_scores(prompt)
+        if scores is not None:
+            best, second = sorted(scores.values(), reverse=True)[:2]
+            if best >= self.min_similarity and best - second >= self.min_margin:
+                return RouteDecision(max(scores, key=scores.get), best, "embedding", scores)
+        else:
+            self._refresh_catalog()
+
+        weights = self.classifier.scores(prompt)
+        total = sum(weights.values())
+        best_route = max(weights, key=weights.get)
+        if total and list(weights.values()).count(weights[best_route]) == 1:
+            return RouteDecision(best_route, weights[best_route] / total, "classifier", weights)
+        if scores is not None:
+            # The classifier could not break the tie: trust the closest centroid after all.
+            return RouteDecision(max(scores, key=scores.get), max(scores.values()), "embedding", scores)
+        return RouteDecision(self.default_route, 0.0, "default", weights)
+
+    def route(self, prompt: str) -> RouteDecision:
+        """Returns the handler for ``prompt`` with its confidence and how it was chosen."""
+        started = time.perf_counter()
+        decision = self._decide(prompt)
+        with self._stats_lock:
+            self._stats["routed"] += 1
+            self._stats[decision.method] += 1
+            self._stats[decision.route] += 1
+            self._stats["seconds"] += time.perf_counter() - started
+        logging.debug(f"Routed to {decision.route} by {decision.method} ({decision.confidence:.2f}).")
+        return decision
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return dict(self._stats)
+
+
+def build_request_router(embedding_model: Any = None,
+                         catalog: Callable[[], CatalogSnapshot] | None = None) -> RequestRouter:
+    """Creates a router configured from ROUTER_CONFIG."""
+    config = ROUTER_CONFIG
+    return RequestRouter(
+        embedding_model=embedding_model,
+        catalog=catalog if config["use_catalog"] else None,
+        min_similarity=config["min_similarity"],
+        min_margin=config["min_margin"],
+        default_route=config["default_route"],
+        catalog_max_tables=config["catalog_max_tables"],
+        centroid_cache_file=config["centroid_cache_file"],
+    )
@@ -0,0 +1,415 @@
+# -*- coding: utf-8 -*-
+# File: services/schema_catalog.py
+# Description: Shared, TTL-based in-memory cache of the database catalog (schemas, tables, columns).
+
+import logging
+import re
+import select
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Tuple
+
+import psycopg2
+
+# One round-trip loads every non-system schema with all of its tables and columns.
+# LEFT JOINs keep empty schemas and tables without columns in the result.
+_CATALOG_QUERY = r"""
+SELECT n.nspname AS schema_name,
+       c.relname AS table_name,
+       a.attname AS column_name,
+       format_type(a.atttypid, NULL) AS data_type
+FROM pg_catalog.pg_namespace n
+LEFT JOIN pg_catalog.pg_class c
+       ON c.relnamespace = n.oid
+      AND c.relkind IN ('r', 'p', 'v', 'm', 'f')
+      AND has_table_privilege(c.oid, 'SELECT')
+LEFT JOIN pg_catalog.pg_attribute a
+       ON a.attrelid = c.oid
+      AND a.attnum > 0
+      AND NOT a.attisdropped
+WHERE n.nspname <> 'information_schema'
+  AND n.nspname NOT LIKE 'pg\_%'
+ORDER BY n.nspname, c.relname, a.attnum;
+"""
+
+# Primary and foreign keys for every visible table, loaded in the same checkout as the columns.
+_CONSTRAINTS_QUERY = r"""
+SELECT n.nspname AS schema_name,
+       c.relname AS table_name,
+       con.contype AS constraint_type,
+       array_agg(a.attname::text ORDER BY k.ord) AS columns,
+       fn.nspname AS ref_schema,
+       fc.relname AS ref_table,
+       (SELECT array_agg(fa.attname::text ORDER BY fk.ord)
+          FROM unnest(con.confkey) WITH ORDINALITY AS fk(attnum, ord)
+          JOIN pg_catalog.pg_attribute fa
+            ON fa.attrelid = con.confrelid AND fa.attnum = fk.attnum) AS ref_columns
+FROM pg_catalog.pg_constraint con
+JOIN pg_catalog.pg_class c ON c.oid = con.conrelid
+JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+CROSS JOIN LATERAL unnest(con.conkey) WITH ORDINALITY AS k(attnum, ord)
+JOIN pg_catalog.pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = k.attnum
+LEFT JOIN pg_catalog.pg_class fc ON fc.oid = con.confrelid
+LEFT JOIN pg_catalog.pg_namespace fn ON fn.oid = fc.relnamespace
+WHERE con.contype IN ('p', 'f')
+  AND n.nspname <> 'information_schema'
+  AND n.nspname NOT LIKE 'pg\_%'
+GROUP BY n.nspname, c.relname, con.oid, con.contype, con.confrelid, con.confkey, fn.nspname, fc.relname
+ORDER BY n.nspname, c.relname, con.contype DESC;
+"""
+
+# Cheap change detector: any DDL rewrites the touched pg_class/pg_attribute rows (new xmin)
+# or adds/removes rows, so the aggregate below changes whenever the visible catalog does.
+_FINGERPRINT_QUERY = r"""
+SELECT md5(string_agg(c.oid::text || ':' || c.xmin::text || ':' || c.relnatts::text, ',' ORDER BY c.oid))
+       || ':' || (SELECT count(*) FROM pg_catalog.pg_namespace)::text AS fingerprint
+FROM pg_catalog.pg_class c
+JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+WHERE c.relkind IN ('r', 'p', 'v', 'm', 'f')
+  AND n.nspname <> 'information_schema'
+  AND n.nspname NOT LIKE 'pg\_%';
+"""
+
+REFRESH_MODES = ("ttl", "fingerprint", "notify")
+
+
+def _singular(word: str) -> str:
+    """Very small English singularizer, good enough to match 'customers' with 'customer'."""
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith("s") and not word.endswith("ss") and len(word) > 3:
+        return word[:-1]
+    return word
+
+
+class CatalogSnapshot:
+    """An immutable view of the catalog as loaded at a point in time."""
+
+    def __init__(self, rows: List[Any], constraint_rows: List[Any] = (), fingerprint: str | None = None):
+        self.loaded_at = time.monotonic()
+        self.fingerprint = fingerprint
+        self.schemas: List[str] = []
+        self.tables: Dict[str, List[str]] = {}
+        self.columns: Dict[Tuple[str, str], List[Tuple[str, str]]] = {}
+        self.primary_keys: Dict[Tuple[str, str], List[str]] = {}
+        # Each foreign key is (columns, (ref_schema, ref_table), ref_columns).
+        self.foreign_keys: Dict[Tuple[str, str],
+                                List[Tuple[List[str], Tuple[str, str], List[str]]]] = {}
+
+        for row in rows:
+            schema, table = row["schema_name"], row["table_name"]
+            if schema not in self.tables:
+                self.schemas.append(schema)
+                self.tables[schema] = []
+            if table is None:
+                continue
+            key = (schema, table)
+            if key not in self.columns:
+                self.tables[schema].append(table)
+                self.columns[key] = []
+            if row["column_name"] is not None:
+                self.columns[key].append(
+                    (row["column_name"], row["data_type"]))
+
+        for row in constraint_rows:
+            key = (row["schema_name"], row["table_name"])
+            if row["constraint_type"] == "p":
+                self.primary_keys[key] = list(row["columns"])
+            else:
+                self.foreign_keys.setdefault(key, []).append(
+                    (list(row["columns"]), (row["ref_schema"], row["ref_table"]), list(row["ref_columns"] or [])))
+
+    def describe_table(self, schema: str, table: str) -> str:
+        """Renders one table as a compact single line, e.g. ``orders(id integer PK, customer_id integer FK->customers.id)``."""
+        key = (schema, table)
+        primary_key = set(self.primary_keys.get(key, []))
+        references = {}
+        for columns, (ref_schema, ref_table), ref_columns in self.foreign_keys.get(key, []):
+            target = ref_table if ref_schema == schema else f"{ref_schema}.{ref_table}"
+            for column, ref_column in zip(columns, ref_columns):
+                references[column] = f"{target}.{ref_column}"
+
+        parts = []
+        for column, data_type in self.columns.get(key, []):
+            part = f"{column} {data_type}"
+            if column in primary_key:
+                part += " PK"
+            if column in references:
+                part += f" FK->{references[column]}"
+            parts.append(part)
+        return f"{schema}.{table}({', '.join(parts)})"
+
+
+class SchemaCatalog:
+    """Serves schema, table and column lookups from a shared in-memory cache.
+
+    The cache is (re)loaded with a single bulk query and expires after ``ttl_seconds``.
+    Depending on ``refresh_mode`` schema changes are also picked up without waiting for
+    the TTL:
+
+    - ``"ttl"``: only the TTL and explicit :meth:`invalidate` calls refresh the cache.
+    - ``"fingerprint"``: every ``check_interval`` seconds a cheap catalog fingerprint
+      query runs and the cache is reloaded when it changed.
+    - ``"notify"``: a background thread LISTENs on ``notify_channel``; the DDL event
+      trigger in ``.devcontainer/postgres/ddl_notify.sql`` publishes to it.
+    """
+
+    def __init__(self, db_manager, ttl_seconds: float = 300.0, refresh_mode: str = "ttl",
+                 check_interval: float = 30.0, notify_channel: str = "schema_catalog_changed",
+                 database: str | None = None):
+        if refresh_mode not in REFRESH_MODES:
+            raise ValueError(
+                f"Unknown refresh_mode '{refresh_mode}'. Expected one of {REFRESH_MODES}.")
+        self._db_manager = db_manager
+        self.database = database  # A DATABASES name; None is the default database.
+        self.ttl_seconds = ttl_seconds
+        self.refresh_mode = refresh_mode
+        self.check_interval = check_interval
+        self.notify_channel = notify_channel
+
+        self._lock = threading.Lock()
+        # Held while (re)loading, so one thread loads and the others wait for its snapshot;
+        # lookups on a fresh snapshot only take ``_lock``, never for a database round-trip.
+        self._load_lock = threading.Lock()
+        self._snapshot: CatalogSnapshot | None = None
+        self._generation = 0  # Bumped by invalidate(); a load started before it is not kept.
+        self._last_check = 0.0
+        self._pins = 0
+        self._listener: threading.Thread | None = None
+        self._stop_listener = threading.Event()
+        self._stats = {"hits": 0, "misses": 0,
+                       "reloads": 0, "invalidations": 0, "fingerprint_checks": 0}
+
+    # --- Loading -------------------------------------------------------------
+
+    def _fetch_fingerprint(self, cursor) -> str | None:
+        cursor.execute(_FINGERPRINT_QUERY)
+        row = cursor.fetchone()
+        return row["fingerprint"] if row else None
+
+    def _load(self) -> CatalogSnapshot:
+        logging.info("Loading database catalog into the schema cache...")
+        with self._db_manager.get_connection(read_only=True, database=self.database) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(_CATALOG_QUERY)
+                rows = cursor.fetchall()
+                cursor.execute(_CONSTRAINTS_QUERY)
+                constraint_rows = cursor.fetchall()
+                fingerprint = self._fetch_fingerprint(
+                    cursor) if self.refresh_mode == "fingerprint" else None
+        snapshot = CatalogSnapshot(rows, constraint_rows, fingerprint)
+        logging.info(
+            f"Schema cache loaded: {len(snapshot.schemas)} schemas, {len(snapshot.columns)} tables.")
+        return snapshot
+
+    def _staleness(self, snapshot: CatalogSnapshot) -> str | None:
+        """``None`` while fresh, ``"expired"``, or ``"check"`` when a fingerprint check is due.
+
+        Must be called with the lock held; claims a due check so concurrent lookups skip it.
+        """
+        if self._pins:
+            return None
+        now = time.monotonic()
+        if now - snapshot.loaded_at > self.ttl_seconds:
+            return "expired"
+        if self.refresh_mode != "fingerprint" or now - self._last_check < self.check_interval:
+            return None
+        self._last_check = now
+        self._stats["fingerprint_checks"] += 1
+        return "check"
+
+    def _fingerprint_changed(self, snapshot: CatalogSnapshot) -> bool:
+        with self._db_manager.get_connection(read_only=True, database=self.database) as conn:
+            with conn.cursor() as cursor:
+                current = self._fetch_fingerprint(cursor)
+        if current != snapshot.fingerprint:
+            logging.info("Catalog fingerprint changed; reloading schema cache.")
+            return True
+        return False
+
+    def snapshot(self) -> CatalogSnapshot:
+        """Returns a fresh catalog snapshot, loading it on a miss.
+
+        The fingerprint query and the catalog load run outside the lock; the new snapshot
+        is swapped in under it.
+        """
+        with self._lock:
+            snapshot = self._snapshot
+            state = "expired" if snapshot is None else self._staleness(snapshot)
+        if state == "check":
+            state = "expired" if self._fingerprint_changed(snapshot) else None
+        if state is None:
+            with self._lock:
+                self._stats["hits"] += 1
+            return snapshot
+
+        with self._load_lock:
+            with self._lock:
+                current = self._snapshot
+                if current is not None and current is not snapshot:
+                    # Reloaded by another thread while this one waited.
+                    self._stats["hits"] += 1
+                    return current
+                self._stats["misses"] += 1
+                generation = self._generation
+            loaded = self._load()
+            with self._lock:
+                if generation == self._generation:
+                    self._snapshot = loaded
+                    self._last_check = loaded.loaded_at
+                self._stats["reloads"] += 1
+            return loaded
+
+    @contextmanager
+    def pinned(self) -> Iterator[CatalogSnapshot]:
+        """Loads the catalog once and serves it without TTL or fingerprint checks until exit.
+
+        Meant for batch jobs, where every request should see the same catalog and none
+        should pay for a reload. :meth:`invalidate` still forces a reload.
+        """
+        snapshot = self.snapshot()
+        with self._lock:
+            self._pins += 1
+        try:
+            yield snapshot
+        finally:
+            with self._lock:
+                self._pins -= 1
+
+    # --- Lookups -------------------------------------------------------------
+
+    def list_schemas(self) -> List[str]:
+        """Returns all non-system schema names."""
+        return list(self.snapshot().schemas)
+
+    def list_tables(self, schema_name: str = "public") -> List[str]:
+        """Returns the tables and views of a schema, sorted by name."""
+        return sorted(self.snapshot().tables.get(schema_name, []))
+
+    def get_columns(self, table_name: str, schema: str = "public") -> List[Tuple[str, str]]:
+        """Returns ``(column_name, data_type)`` pairs in ordinal order, or an empty list."""
+        return list(self.snapshot().columns.get((schema, table_name), []))
+
+    def describe_tables(self, table_names: List[str], schema: str = "public") -> List[str]:
+        """Returns compact descriptions (columns, PK/FK) for the given tables; unknown tables are skipped."""
+        snapshot = self.snapshot()
+        return [snapshot.describe_table(schema, table) for table in table_names
+                if (schema, table) in snapshot.columns]
+
+    def relevant_schema_summary(self, question: str, schema: str = "public", max_tables: int = 8) -> str:
+        """Builds a compact schema summary of the tables most likely needed to answer ``question``.
+
+        Small schemas are summarized in full. Larger ones are ranked by how many question
+        terms match table and column names; tables referenced by a matched table's foreign
+        keys are pulled in as well so JOIN paths are visible.
+        """
+        snapshot = self.snapshot()
+        tables = snapshot.tables.get(schema, [])
+        if len(tables) > max_tables:
+            tables = self._rank_tables(snapshot, question, schema, max_tables)
+        return "\n".join(snapshot.describe_table(schema, table) for table in sorted(tables))
+
+    def referenced_tables(self, sql: str) -> List[str]:
+        """Returns the known tables that appear as identifiers in ``sql``, as ``schema.table``.
+
+        A qualified identifier names one table; an unqualified one names every known table
+        of that name, since the search path decides which one the query reads.
+        """
+        snapshot = self.snapshot()
+        found = set()
+        for identifier in re.findall(r'[A-Za-z_"][A-Za-z0-9_$."]*', sql):
+            parts = [part.strip('"') for part in identifier.split(".")]
+            table, schema = parts[-1], parts[-2] if len(parts) > 1 else None
+            for schema_name, tables in snapshot.tables.items():
+                if schema is not None and schema_name not in (schema, schema.lower()):
+                    continue
+                found |= {f"{schema_name}.{name}" for name in (table, table.lower()) if name in tables}
+        return sorted(found)
+
+    @staticmethod
+    def _rank_tables(snapshot: CatalogSnapshot, question: str, schema: str, max_tables: int) -> List[str]:
+        terms = {_singular(term) for term in re.findall(r"[a-z0-9_]{3,}", question.lower())}
+        scores = {}
+        for table in snapshot.tables.get(schema, []):
+            table_terms = {_singular(part) for part in table.lower().split("_")}
+            column_terms = {_singular(part)
+                            for column, _ in snapshot.columns.get((schema, table), [])
+                            for part in column.lower().split("_")}
+            score = 3 * len(terms & table_terms) + len(terms & column_terms)
+            if score:
+                scores[table] = score
+
+        selected = sorted(scores, key=lambda table: (-scores[table], table))[:max_tables]
+        for table in list(selected):
+            for _, (ref_schema, ref_table), _ in snapshot.foreign_keys.get((schema, table), []):
+                if ref_schema == schema and ref_table not in selected and len(selected) < max_tables:
+                    selected.append(ref_table)
+        return selected
+
+    # --- Invalidation --------------------------------------------------------
+
+    def invalidate(self) -> None:
+        """Drops the cached catalog so the next lookup reloads it."""
+        with self._lock:
+            self._snapshot = None
+            self._generation += 1
+            self._stats["invalidations"] += 1
+        logging.info("Schema cache invalidated.")
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns cache hit/miss counters."""
+        with self._lock:
+            snapshot = dict(self._stats)
+            loaded = self._snapshot
+        lookups = snapshot["hits"] + snapshot["misses"]
+        snapshot["hit_ratio"] = snapshot["hits"] / lookups if lookups else 0.0
+        snapshot["age_seconds"] = time.monotonic() - \
+            loaded.loaded_at if loaded else None
+        snapshot["refresh_mode"] = self.refresh_mode
+        return snapshot
+
+    # --- LISTEN/NOTIFY refresh -----------------------------------------------
+
+    def start_listener(self) -> None:
+        """Starts the background LISTEN thread (``notify`` refresh mode only)."""
+        if self.refresh_mode != "notify" or (self._listener and self._listener.is_alive()):
+            return
+        self._stop_listener.clear()
+        self._listener = threading.Thread(
+            target=self._listen, name="schema-catalog-listener", daemon=True)
+        self._listener.start()
+
+    def stop_listener(self) -> None:
+        """Stops the background LISTEN thread."""
+        self._stop_listener.set()
+        if self._listener:
+            self._listener.join(timeout=5)
+            self._listener = None
+
+    def _listen(self) -> None:
+        while not self._stop_listener.is_set():
+            conn = None
+            try:
+                # A dedicated connection: LISTEN state must not leak into the pool.
+                conn = self._db_manager.open_dedicated_connection(self.database)
+                conn.set_isolation_level(
+                    psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cursor:
+                    cursor.execute(
+                        f"LISTEN {psycopg2.extensions.quote_ident(self.notify_channel, conn)};")
+                logging.info(
+                    f"Listening for catalog changes on '{self.notify_channel}'.")
+                while not self._stop_listener.is_set():
+                    if select.select([conn], [], [], 1.0) == ([], [], []):
+                        continue
+                    conn.poll()
+                    if conn.notifies:
+                        conn.notifies.clear()
+                        self.invalidate()
+            except psycopg2.Error as e:
+                logging.error(f"Schema catalog listener error: {e}")
+                self._stop_listener.wait(self.check_interval)
+            finally:
+                if conn is not None and not conn.closed:
+                    conn.close()
@@ -0,0 +1,363 @@
+# -*- coding: utf-8 -*-
+# File: services/serving.py
+# Description: Production serving of agents over HTTP: admission control with a bounded queue,
+#              per-session agent runs, health/readiness endpoints and a pre-fork worker supervisor.
+
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+from uuid import uuid4
+
+from agno.run.response import RunResponseErrorEvent
+from fastapi import FastAPI, File, Form, UploadFile
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+
+from services.agent_pool import AgentSession, SessionAgents
+from services.tracing import metrics, tracer
+
+
+class Overloaded(RuntimeError):
+    """Raised when a request cannot be admitted: the queue is full or the wait timed out."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Bounds the agent runs of a worker, with a bounded queue in front of them.
+
+    Up to ``max_in_flight`` requests run at once and up to ``max_queue`` more wait for a slot,
+    each for at most ``queue_timeout`` seconds. Anything beyond that is refused right away
+    with :class:`Overloaded`, so a saturated worker answers 503 instead of piling up
+    requests (and their memory) until every client times out.
+    """
+
+    def __init__(self, max_in_flight: int = 8, max_queue: int = 32, queue_timeout: float = 30.0):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore: asyncio.Semaphore | None = None
+        self._in_flight = 0
+        self._queued = 0
+        self._stats = {"admitted": 0, "completed": 0, "rejected_queue_full": 0, "rejected_timeout": 0,
+                       "queue_wait_total": 0.0, "queue_wait_max": 0.0}
+
+    @property
+    def saturated(self) -> bool:
+        """Whether new requests would be refused."""
+        return self._in_flight + self._queued >= self.max_in_flight + self.max_queue
+
+    def _retry_after(self) -> int:
+        return max(1, int(self.queue_timeout / 2))
+
+    async def acquire(self) -> None:
+        """Waits for a run slot, or raises :class:`Overloaded`."""
+        if self._semaphore is None:
+            # Created on first use, inside the worker's event loop.
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        if self.saturated:
+            self._stats["rejected_queue_full"] += 1
+            raise Overloaded("The server is at capacity; please retry shortly.", self._retry_after())
+        started = time.perf_counter()
+        self._queued += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._stats["rejected_timeout"] += 1
+            raise Overloaded(f"No capacity within {self.queue_timeout:g}s; please retry shortly.",
+                             self._retry_after()) from None
+        finally:
+            self._queued -= 1
+        waited = time.perf_counter() - started
+        self._in_flight += 1
+        self._stats["admitted"] += 1
+        self._stats["queue_wait_total"] += waited
+        self._stats["queue_wait_max"] = max(self._stats["queue_wait_max"], waited)
+
+    def release(self) -> None:
+        self._in_flight -= 1
+        self._stats["completed"] += 1
+        self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {**self._stats, "in_flight": self._in_flight, "queued": self._queued,
+                                 "max_in_flight": self.max_in_flight, "max_queue": self.max_queue}
+        admitted = stats["admitted"]
+        stats["queue_wait_avg"] = stats["queue_wait_total"] / admitted if admitted else 0.0
+        return stats
+
+
+class Readiness:
+    """Whether a worker should receive traffic: warmed up, not saturated and its database reachable.
+
+    ``check`` raises when a dependency is down; its outcome is reused for ``interval`` seconds
+    so probes do not cost a database round-trip each.
+    """
+
+    def __init__(self, check: Callable[[], None], interval: float = 5.0):
+        self.check = check
+        self.interval = interval
+        self.warm = False
+        self._checked_at = 0.0
+        self._error: str | None = None
+        self._lock = threading.Lock()
+
+    def mark_warm(self) -> None:
+        self.warm = True
+
+    def dependency_error(self) -> str | None:
+        """The last ``check`` failure (``None`` when healthy), rechecking when it is stale."""
+        with self._lock:
+            if time.monotonic() - self._checked_at >= self.interval:
+                try:
+                    self.check()
+                    self._error = None
+                except Exception as e:
+                    self._error = str(e)
+                self._checked_at = time.monotonic()
+            return self._error
+
+
+class _ClosingStreamingResponse(StreamingResponse):
+    """Runs ``on_close`` once the response is over, even when the client left before the first chunk."""
+
+    def __init__(self, content: AsyncIterator[str], on_close: Callable[[], None], **kwargs: Any):
+        super().__init__(content, **kwargs)
+        self._on_close = on_close
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self._on_close()
+
+
+def _run_session(session: AgentSession, message: str, monitoring: bool, **kwargs: Any) -> Any:
+    # Runs of one session take turns on its agent; other sessions run in parallel.
+    with session.lock:
+        session.last_used = time.monotonic()
+        session.agent.monitoring = monitoring
+        return session.agent.run(message, stream=False, **kwargs)
+
+
+def _stream_session(session: AgentSession, message: str, monitoring: bool, emit: Callable[[Any], None],
+                    cancelled: threading.Event, **kwargs: Any) -> None:
+    with session.lock:
+        session.last_used = time.monotonic()
+        session.agent.monitoring = monitoring
+        try:
+            for event in session.agent.run(message, stream=True, stream_intermediate_steps=True, **kwargs):
+                if cancelled.is_set():
+                    break
+                emit(event.to_json())
+        except Exception as e:
+            logging.error(f"Agent run failed: {e}", exc_info=True)
+            emit(RunResponseErrorEvent(content=str(e)).to_json())
+
+
+def add_serving_routes(app: FastAPI, sessions: SessionAgents, admission: AdmissionController,
+                       readiness: Readiness, prefix: str = "/v1/playground") -> None:
+    """Adds the agent run, ``/health``, ``/ready`` and ``/metrics`` routes to ``app``.
+
+    The run route takes the Playground's ``POST {prefix}/agents/{agent_id}/runs`` form, so it
+    must be added before the Playground router. Every session runs on its own agent from
+    ``sessions``, in a thread pool of ``admission.max_in_flight`` threads: the agents' tools
+    are blocking database calls and would otherwise stall the event loop. A request's
+    admission slot is held until its run thread finishes, not until its response ends, so a
+    client that leaves early never lets more runs in than there are threads.
+    """
+    executor = ThreadPoolExecutor(max_workers=admission.max_in_flight, thread_name_prefix="agent-run")
+    metrics.register_collector("serving", lambda: {**admission.stats(), **sessions.stats()})
+
+    def start_run(func: Callable, *args: Any, **kwargs: Any) -> "asyncio.Future[Any]":
+        """Runs ``func`` in the pool and releases the admission slot when it has finished."""
+        loop = asyncio.get_running_loop()
+        # Carry the current trace into the worker thread.
+        context = contextvars.copy_context()
+        try:
+            future = executor.submit(functools.partial(context.run, func, *args, **kwargs))
+        except BaseException:
+            admission.release()
+            raise
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(admission.release))
+        return asyncio.wrap_future(future)
+
+    def stream_events(session: AgentSession, message: str, monitoring: bool, cancelled: threading.Event,
+                      **kwargs: Any) -> AsyncIterator[str]:
+        loop = asyncio.get_running_loop()
+        chunks: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        def run() -> None:
+            try:
+                _stream_session(session, message, monitoring, lambda chunk: loop.call_soon_threadsafe(chunks.put_nowait, chunk),
+                                cancelled, **kwargs)
+            finally:
+                loop.call_soon_threadsafe(chunks.put_nowait, done)
+
+        # Started right away: the slot is released by the run, even if the body is never read.
+        future = start_run(run)
+
+        async def events() -> AsyncIterator[str]:
+            while (chunk := await chunks.get()) is not done:
+                yield chunk
+            await future
+
+        return events()
+
+    @app.post(f"{prefix}/agents/{{agent_id}}/runs")
+    async def create_agent_run(
+        agent_id: str,
+        message: str = Form(...),
+        stream: bool = Form(True),
+        monitor: bool = Form(False),
+        session_id: Optional[str] = Form(None),
+        user_id: Optional[str] = Form(None),
+        files: Optional[List[UploadFile]] = File(None),
+    ):
+        if agent_id not in sessions.pools:
+            return JSONResponse(status_code=404, content={"detail": "Agent not found"})
+        if files:
+            return JSONResponse(status_code=400, content={"detail": "File uploads are not supported."})
+        session_id = session_id or str(uuid4())
+        try:
+            with tracer.span("serving.admission"):
+                await admission.acquire()
+        except Overloaded as e:
+            logging.warning(f"Request refused: {e}")
+            return JSONResponse(status_code=503, content={"detail": str(e)},
+                                headers={"Retry-After": str(e.retry_after)})
+
+        try:
+            # A session's first request may build its agent when the pool is empty; not on the event loop.
+            session = await asyncio.get_running_loop().run_in_executor(
+                executor, sessions.lease, agent_id, session_id)
+        except BaseException:
+            admission.release()
+            raise
+        if stream:
+            cancelled = threading.Event()
+            # When the response ends early (the client went away), the run stops at its next event.
+            return _ClosingStreamingResponse(
+                stream_events(session, message, monitor, cancelled, session_id=session_id, user_id=user_id),
+                on_close=cancelled.set, media_type="text/event-stream")
+        response = await start_run(_run_session, session, message, monitor, session_id=session_id, user_id=user_id)
+        return response.to_dict()
+
+    @app.get("/health")
+    async def health():
+        """Liveness: the worker's event loop answers."""
+        return {"status": "ok", "pid": os.getpid()}
+
+    @app.get("/ready")
+    async def ready():
+        """Readiness: warmed up, accepting requests and with a reachable database."""
+        load = admission.stats()
+        status: Dict[str, Any] = {"pid": os.getpid(), "warm": readiness.warm,
+                                  "in_flight": load["in_flight"], "queued": load["queued"]}
+        error = await asyncio.get_running_loop().run_in_executor(None, readiness.dependency_error)
+        if error:
+            status["error"] = error
+        is_ready = readiness.warm and not admission.saturated and not error
+        status["status"] = "ready" if is_ready else "unavailable"
+        return JSONResponse(status_code=200 if is_ready else 503, content=status)
+
+    @app.get("/metrics")
+    async def prometheus_metrics():
+        """This worker's metrics in the Prometheus text format."""
+        return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+def _run_worker(app: Any, sock: socket.socket, after_fork: Callable[[], None] | None,
+                uvicorn_options: Dict[str, Any]) -> None:
+    import uvicorn
+
+    if after_fork is not None:
+        after_fork()
+    uvicorn.Server(uvicorn.Config(app, **uvicorn_options)).run(sockets=[sock])
+
+
+def serve_prefork(app: Any, host: str, port: int, workers: int,
+                  before_fork: Callable[[], None] | None = None,
+                  after_fork: Callable[[], None] | None = None, **uvicorn_options: Any) -> None:
+    """Serves ``app`` with uvicorn on ``workers`` processes forked from this one.
+
+    ``before_fork`` runs once in this process: whatever it loads (imports, prebuilt agents,
+    the schema catalog) is shared by the workers copy-on-write instead of being loaded by
+    each. It must close its database connections and start no threads, which do not survive
+    a fork. ``after_fork`` runs in each worker before it accepts connections (open the
+    worker's own pool, start background threads). The workers share one listening socket;
+    one that dies is replaced until this process receives SIGTERM or SIGINT, which it
+    passes on to the workers for a graceful shutdown. Without ``os.fork`` (Windows) or with
+    a single worker, the app is served in this process.
+    """
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    # Listen before the workers start, so the kernel queues connections made meanwhile.
+    sock.listen(uvicorn_options.setdefault("backlog", 2048))
+    sock.set_inheritable(True)
+    uvicorn_options.setdefault("log_level", "info")
+
+    if before_fork is not None:
+        before_fork()
+    if workers <= 1 or not hasattr(os, "fork"):
+        _run_worker(app, sock, after_fork, uvicorn_options)
+        return
+
+    children: Dict[int, float] = {}
+    stopping = False
+
+    def spawn() -> None:
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 0
+            try:
+                _run_worker(app, sock, after_fork, uvicorn_options)
+            except BaseException:
+                logging.exception("Worker failed.")
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = time.monotonic()
+
+    def stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    for _ in range(workers):
+        spawn()
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    logging.info(f"Serving on http://{host}:{port} with {workers} workers: {sorted(children)}")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        started = children.pop(pid, None)
+        if stopping or started is None:
+            continue
+        logging.warning(f"Worker {pid} exited with code {os.waitstatus_to_exitcode(status)}; replacing it.")
+        if time.monotonic() - started < 1.0:
+            time.sleep(1.0)  # Do not spin when workers crash on startup.
+        spawn()
+    sock.close()
+    logging.info("All workers stopped.")
@@ -0,0 +1,398 @@
+# -*- coding: utf-8 -*-
+# File: services/tracing.py
+# Description: Lightweight request tracing, Prometheus-style metrics and a sampling profiler for slow requests.
+
+import contextvars
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Deque, Dict, Generator, Iterator, List
+
+from config.observability import TRACING_CONFIG
+
+# Upper bounds (seconds) of the span duration histogram buckets.
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Numeric span attributes that are also exported as per-span counters.
+COUNTED_ATTRIBUTES = ("input_tokens", "output_tokens", "history_tokens_saved", "rows", "bytes", "chunks", "pages")
+# Span attributes holding seconds since the span started (see Span.mark), exported as histograms.
+TIMED_ATTRIBUTES = ("time_to_first_token",)
+
+_current_span: contextvars.ContextVar["Span | None"] = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """A timed operation within a trace, with free-form attributes."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start", "end", "attributes", "error",
+                 "_started", "_trace")
+
+    def __init__(self, name: str, parent: "Span | None", attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.start = time.time()
+        self.end: float | None = None
+        self.attributes = dict(attributes)
+        self.error: str | None = None
+        self._started = time.perf_counter()
+        self._trace: "_Trace" = parent._trace if parent else _Trace(self)
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def add(self, key: str, amount: float) -> None:
+        """Increments a numeric attribute (e.g. rows seen across several batches)."""
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def mark(self, key: str) -> None:
+        """Records the seconds elapsed since the span started, the first time ``key`` is marked."""
+        if key not in self.attributes:
+            self.attributes[key] = time.perf_counter() - self._started
+
+    @property
+    def duration(self) -> float | None:
+        return None if self.end is None else self.end - self.start
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "trace_id": self.trace_id, "span_id": self.span_id,
+                "parent_id": self.parent_id, "start": self.start, "duration": self.duration,
+                "attributes": self.attributes, "error": self.error}
+
+
+class _NoopSpan:
+    """Stands in for :class:`Span` while tracing is disabled."""
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def add(self, key: str, amount: float) -> None:
+        pass
+
+    def mark(self, key: str) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Trace:
+    """The spans of one root operation."""
+
+    def __init__(self, root: Span):
+        self.root = root
+        self.spans: List[Span] = []
+        self.dropped = 0
+        self.lock = threading.Lock()
+
+
+class MetricsRegistry:
+    """Span duration histograms, error counters, attribute counters and gauge collectors."""
+
+    def __init__(self, prefix: str = "pgagent"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, List[int]] = defaultdict(lambda: [0] * (len(DURATION_BUCKETS) + 1))
+        self._sums: Dict[str, float] = defaultdict(float)
+        self._errors: Dict[str, int] = defaultdict(int)
+        self._counters: Dict[tuple, float] = defaultdict(float)
+        self._timings: Dict[tuple, List[int]] = defaultdict(lambda: [0] * (len(DURATION_BUCKETS) + 1))
+        self._timing_sums: Dict[tuple, float] = defaultdict(float)
+        self._collectors: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+    @staticmethod
+    def _bucket(seconds: float) -> int:
+        return next((i for i, bound in enumerate(DURATION_BUCKETS) if seconds <= bound), len(DURATION_BUCKETS))
+
+    def observe(self, span: Span) -> None:
+        with self._lock:
+            self._buckets[span.name][self._bucket(span.duration)] += 1
+            self._sums[span.name] += span.duration
+            if span.error:
+                self._errors[span.name] += 1
+            for key in COUNTED_ATTRIBUTES:
+                value = span.attributes.get(key)
+                if isinstance(value, (int, float)):
+                    self._counters[(span.name, key)] += value
+            for key in TIMED_ATTRIBUTES:
+                value = span.attributes.get(key)
+                if isinstance(value, (int, float)):
+                    self._timings[(span.name, key)][self._bucket(value)] += 1
+                    self._timing_sums[(span.name, key)] += value
+
+    def register_collector(self, name: str, collector: Callable[[], Dict[str, Any]]) -> None:
+        """Exports the numeric values returned by ``collector`` as ``<prefix>_<name>_<key>`` gauges."""
+        self._collectors[name] = collector
+
+    def render_prometheus(self) -> str:
+        """Renders every metric in the Prometheus text exposition format."""
+        p = self.prefix
+        lines = [f"# HELP {p}_span_duration_seconds Duration of traced operations.",
+                 f"# TYPE {p}_span_duration_seconds histogram"]
+        with self._lock:
+            for name, buckets in sorted(self._buckets.items()):
+                cumulative = 0
+                for bound, count in zip(DURATION_BUCKETS + (float("inf"),), buckets):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{p}_span_duration_seconds_bucket{{span="{name}",le="{le}"}} {cumulative}')
+                lines.append(f'{p}_span_duration_seconds_sum{{span="{name}"}} {self._sums[name]}')
+                lines.append(f'{p}_span_duration_seconds_count{{span="{name}"}} {cumulative}')
+            lines += [f"# HELP {p}_span_errors_total Traced operations that raised.",
+                      f"# TYPE {p}_span_errors_total counter"]
+            lines += [f'{p}_span_errors_total{{span="{name}"}} {count}'
+                      for name, count in sorted(self._errors.items())]
+            for key in COUNTED_ATTRIBUTES:
+                samples = sorted((name, value) for (name, k), value in self._counters.items() if k == key)
+                if samples:
+                    lines.append(f"# TYPE {p}_{key}_total counter")
+                    lines += [f'{p}_{key}_total{{span="{name}"}} {value}' for name, value in samples]
+            for key in TIMED_ATTRIBUTES:
+                series = sorted((name, buckets) for (name, k), buckets in self._timings.items() if k == key)
+                if series:
+                    lines.append(f"# TYPE {p}_{key}_seconds histogram")
+                for name, buckets in series:
+                    cumulative = 0
+                    for bound, count in zip(DURATION_BUCKETS + (float("inf"),), buckets):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f'{p}_{key}_seconds_bucket{{span="{name}",le="{le}"}} {cumulative}')
+                    lines.append(f'{p}_{key}_seconds_sum{{span="{name}"}} {self._timing_sums[(name, key)]}')
+                    lines.append(f'{p}_{key}_seconds_count{{span="{name}"}} {cumulative}')
+            collectors = dict(self._collectors)
+        for source, collector in sorted(collectors.items()):
+            try:
+                values = collector()
+            except Exception as e:
+                logging.warning(f"Metrics collector '{source}' failed: {e}")
+                continue
+            for key, value in sorted(values.items()):
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines.append(f"# TYPE {p}_{source}_{key} gauge")
+                    lines.append(f"{p}_{source}_{key} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class SamplingProfiler:
+    """Samples one thread's Python stack at a fixed interval into collapsed-stack counts.
+
+    The output (``frame;frame;frame count`` lines) can be fed to flamegraph.pl or speedscope.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.samples
+
+    def write(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class Tracer:
+    """Creates nested spans (propagated through ``contextvars``) and keeps recent traces."""
+
+    def __init__(self, metrics: MetricsRegistry, enabled: bool = True, max_traces: int = 200,
+                 max_spans_per_trace: int = 1000, profile_slow_requests: bool = False,
+                 slow_request_seconds: float = 10.0, profile_interval: float = 0.005,
+                 profile_dir: str = "profiles"):
+        self.metrics = metrics
+        self.enabled = enabled
+        self.max_spans_per_trace = max_spans_per_trace
+        self.profile_slow_requests = profile_slow_requests
+        self.slow_request_seconds = slow_request_seconds
+        self.profile_interval = profile_interval
+        self.profile_dir = profile_dir
+        self._traces: Deque[_Trace] = deque(maxlen=max_traces)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, profile: bool = False, **attributes: Any) -> Iterator[Span]:
+        """Times the enclosed block as a child of the current span (or as a new trace).
+
+        With ``profile=True`` and slow-request profiling enabled, the block is sampled and a
+        collapsed-stack profile is written when it takes longer than ``slow_request_seconds``.
+        """
+        if not self.enabled:
+            yield _NOOP_SPAN
+            return
+        span = Span(name, _current_span.get(), attributes)
+        token = _current_span.set(span)
+        profiler = None
+        if profile and self.profile_slow_requests:
+            profiler = SamplingProfiler(threading.get_ident(), self.profile_interval)
+            profiler.start()
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.end = span.start + (time.perf_counter() - span._started)
+            _current_span.reset(token)
+            if profiler is not None:
+                profiler.stop()
+                if span.duration >= self.slow_request_seconds:
+                    path = os.path.join(self.profile_dir, f"{span.trace_id}.folded")
+                    profiler.write(path)
+                    span.set(profile=path)
+                    logging.warning(f"Slow request ({span.duration:.1f}s), profile written to {path}.")
+            self._finish(span)
+
+    def _finish(self, span: Span) -> None:
+        trace = span._trace
+        with trace.lock:
+            if len(trace.spans) < self.max_spans_per_trace:
+                trace.spans.append(span)
+            else:
+                trace.dropped += 1
+        self.metrics.observe(span)
+        if trace.root is span:
+            with self._lock:
+                self._traces.append(trace)
+
+    def traces(self, limit: int | None = None) -> List[Dict[str, Any]]:
+        """Recent finished traces, newest last, as JSON-serializable dicts."""
+        with self._lock:
+            traces = list(self._traces)[-limit:] if limit else list(self._traces)
+        return [{"trace_id": t.root.trace_id, "name": t.root.name, "duration": t.root.duration,
+                 "dropped_spans": t.dropped, "spans": [s.to_dict() for s in t.spans]} for t in traces]
+
+    def dump(self, path: str, limit: int | None = None) -> None:
+        """Writes recent traces to ``path`` as JSON."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.traces(limit), f, indent=2, default=str)
+
+
+def current_span() -> Span | None:
+    """The innermost active span, if any."""
+    return _current_span.get()
+
+
+def annotate(**attributes: Any) -> None:
+    """Sets attributes on the current span; a no-op outside of a trace."""
+    span = _current_span.get()
+    if span is not None:
+        span.set(**attributes)
+
+
+def traced(name: str | None = None) -> Callable[[Callable], Callable]:
+    """Decorator that runs the function inside a span (named after it by default)."""
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with tracer.span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class _ContextGenerator:
+    """Drives a generator with every step run inside one private :class:`contextvars.Context`."""
+
+    def __init__(self, generator: Generator, context: contextvars.Context):
+        self._generator = generator
+        self._context = context
+
+    def __iter__(self) -> "_ContextGenerator":
+        return self
+
+    def __next__(self) -> Any:
+        return self._context.run(next, self._generator)
+
+    def send(self, value: Any) -> Any:
+        return self._context.run(self._generator.send, value)
+
+    def throw(self, *args: Any) -> Any:
+        return self._context.run(self._generator.throw, *args)
+
+    def close(self) -> None:
+        self._context.run(self._generator.close)
+
+
+def isolated_context(func: Callable[..., Generator]) -> Callable[..., Generator]:
+    """Decorator for generators that hold a span or :func:`tools.database_tools.use_database` across ``yield``.
+
+    The generator runs in a copy of the caller's context, so the context variables it sets
+    neither leak into the consumer between items nor fail to reset ("created in a different
+    Context") when it is closed from another thread or task.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return _ContextGenerator(func(*args, **kwargs), contextvars.copy_context())
+    return wrapper
+
+
+class _ExporterHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/metrics":
+            body, content_type = metrics.render_prometheus(), "text/plain; version=0.0.4"
+        elif path == "/traces":
+            body, content_type = json.dumps(tracer.traces(), default=str), "application/json"
+        else:
+            self.send_error(404)
+            return
+        payload = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):  # Scrapes are too frequent for the INFO log.
+        logging.debug(format % args)
+
+
+def start_exporter(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serves ``/metrics`` and ``/traces`` from a daemon thread."""
+    server = ThreadingHTTPServer((host, port), _ExporterHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-exporter", daemon=True).start()
+    logging.info(f"Metrics exporter listening on http://{host}:{port}/metrics")
+    return server
+
+
+metrics = MetricsRegistry()
+tracer = Tracer(
+    metrics,
+    enabled=TRACING_CONFIG["enabled"],
+    max_traces=TRACING_CONFIG["max_traces"],
+    max_spans_per_trace=TRACING_CONFIG["max_spans_per_trace"],
+    profile_slow_requests=TRACING_CONFIG["profile_slow_requests"],
+    slow_request_seconds=TRACING_CONFIG["slow_request_seconds"],
+    profile_interval=TRACING_CONFIG["profile_interval"],
+    profile_dir=TRACING_CONFIG["profile_dir"],
+)
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+# File: services/validation.py
+# Description: Compiled prompt filter (one combined regex) and token-based read-only SQL check.
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple
+
+from config.security import REQUEST_VALIDATION_CONFIG
+
+
+def _phrase_char(char: str) -> str:
+    return r"\s+" if char == " " else re.escape(char)
+
+
+def _trie_node_pattern(node: Dict[str, Any]) -> str:
+    terminal = "" in node
+    branches = [_phrase_char(char) + _trie_node_pattern(child)
+                for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    return f"(?:{body})?" if terminal else body
+
+
+def build_phrase_pattern(phrases: Iterable[str]) -> str:
+    """Compiles phrases into one prefix-shared alternation, e.g. ``a(?:ct\\s+as|ja\\s+como)``.
+
+    Branches are merged on common prefixes, so at each position of the text the regex engine
+    follows one path down the trie instead of trying every phrase: the cost per request depends
+    on the text and the alphabet, not on the number of phrases.
+    """
+    trie: Dict[str, Any] = {}
+    for phrase in phrases:
+        phrase = " ".join(phrase.lower().split())
+        if not phrase:
+            continue
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    return _trie_node_pattern(trie)
+
+
+def _pattern_lists(data: Any, defaults: tuple) -> List[List[str]]:
+    """The phrases, patterns and keywords of a patterns file; raises ``ValueError`` on a bad shape."""
+    if not isinstance(data, dict):
+        raise ValueError("expected a JSON object")
+    lists = []
+    for key, default in zip(("blocked_phrases", "blocked_patterns", "blocked_keywords"), defaults):
+        values = data.get(key, default)
+        if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+            raise ValueError(f"'{key}' must be a list of strings")
+        lists.append(values)
+    return lists
+
+
+class RequestValidator:
+    """Validates user requests against blocked keywords, phrases and patterns in a single regex pass.
+
+    All are case-insensitive. ``blocked_keywords`` match whole words only; ``blocked_phrases``
+    must start a word but may run into a longer one ("roleplay" blocks "roleplaying");
+    ``blocked_patterns`` are raw regular expressions. They are compiled into one expression.
+    When ``patterns_file`` is set, its lists replace the configured ones and the file is re-read when its modification time changes
+    (checked at most every ``reload_check_interval`` seconds); :meth:`reload` forces it.
+    """
+
+    def __init__(self, blocked_phrases: List[str] | None = None, blocked_patterns: List[str] | None = None,
+                 patterns_file: str | None = None, reload_check_interval: float | None = None,
+                 blocked_keywords: List[str] | None = None):
+        config = REQUEST_VALIDATION_CONFIG
+        self.patterns_file = patterns_file or config["patterns_file"]
+        self.reload_check_interval = reload_check_interval if reload_check_interval is not None \
+            else config["reload_check_interval"]
+        self._defaults = (list(config["blocked_phrases"] if blocked_phrases is None else blocked_phrases),
+                          list(config["blocked_patterns"] if blocked_patterns is None else blocked_patterns),
+                          list(config["blocked_keywords"] if blocked_keywords is None else blocked_keywords))
+        self._lock = threading.Lock()
+        self._file_mtime: float | None = None
+        self._checked_at = 0.0
+        self.set_patterns(*self._defaults)
+        if self.patterns_file:
+            self.reload()
+
+    def set_patterns(self, blocked_phrases: List[str], blocked_patterns: List[str] | None = None,
+                     blocked_keywords: List[str] | None = None) -> None:
+        """Recompiles the filter; requests already being checked finish with the old one."""
+        alternatives = []
+        keyword_pattern = build_phrase_pattern(blocked_keywords or [])
+        if keyword_pattern:
+            alternatives.append(rf"\b(?:{keyword_pattern})\b")
+        phrase_pattern = build_phrase_pattern(blocked_phrases)
+        if phrase_pattern:
+            alternatives.append(rf"\b(?:{phrase_pattern})")
+        alternatives.extend(f"(?:{pattern})" for pattern in blocked_patterns or [])
+        compiled = re.compile("|".join(alternatives), re.IGNORECASE) if alternatives else None
+        self.blocked_keywords = list(blocked_keywords or [])
+        self.blocked_phrases = list(blocked_phrases)
+        self.blocked_patterns = list(blocked_patterns or [])
+        self._compiled = compiled
+
+    def reload(self) -> bool:
+        """Re-reads ``patterns_file`` if it changed; returns whether the filter was rebuilt."""
+        if not self.patterns_file:
+            return False
+        with self._lock:
+            self._checked_at = time.monotonic()
+            try:
+                mtime = os.stat(self.patterns_file).st_mtime
+            except OSError:
+                if self._file_mtime is not None:
+                    logging.warning(f"Validation patterns file {self.patterns_file} disappeared; using defaults.")
+                    self._file_mtime = None
+                    self.set_patterns(*self._defaults)
+                    return True
+                return False
+            if mtime == self._file_mtime:
+                return False
+            try:
+                with open(self.patterns_file, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                self.set_patterns(*_pattern_lists(data, self._defaults))
+            except (OSError, ValueError, re.error) as e:
+                logging.error(f"Could not load validation patterns from {self.patterns_file}: {e}")
+                return False
+            self._file_mtime = mtime
+            logging.info(f"Loaded {len(self.blocked_keywords)} blocked keywords, {len(self.blocked_phrases)} "
+                         f"phrases and {len(self.blocked_patterns)} patterns from {self.patterns_file}.")
+            return True
+
+    def is_safe(self, request: str) -> bool:
+        """Checks if the request is safe to process."""
+        if self.patterns_file and time.monotonic() - self._checked_at >= self.reload_check_interval:
+            self.reload()
+        compiled = self._compiled
+        match = compiled.search(request) if compiled is not None else None
+        if match is not None:
+            logging.error(
+                f"Validation failed: Malicious pattern '{match.group(0)}' detected in request.")
+            return False
+        return True
+
+
+class UnsafeQueryError(ValueError):
+    """Raised when agent-written SQL is not a single read-only SELECT/WITH statement."""
+
+
+class SqlToken(NamedTuple):
+    kind: str       # word | quoted | string | number | param | op | semicolon
+    value: str
+    position: int
+
+
+_SQL_TOKEN = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<word>(?![EeBbXxNn]'|[Uu]&")[^\W\d][\w$]*)
+  | (?P<line_comment>--[^\n]*)
+  | (?P<block_comment>/\*.*?\*/)
+  | (?P<escape_string>[Ee]'(?:[^'\\]|\\.|'')*')
+  | (?P<string>[BbXxNn]?'(?:[^']|'')*')
+  | (?P<dollar>\$(?P<tag>(?:[A-Za-z_][A-Za-z0-9_]*)?)\$.*?\$(?P=tag)\$)
+  | (?P<quoted>(?:[Uu]&)?"(?:[^"]|"")*")
+  | (?P<param>\$\d+)
+  | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<semicolon>;)
+  | (?P<op>::|<=|>=|<>|!=|\|\||->>|->|(?!/\*)[^\s\w'"])
+  | (?P<error>.)
+""", re.VERBOSE | re.DOTALL)
+_SKIPPED = frozenset(("space", "line_comment", "block_comment"))
+_STRINGS = frozenset(("escape_string", "dollar"))
+
+
+def tokenize_sql(sql: str) -> Iterator[SqlToken]:
+    """Splits PostgreSQL text into tokens, skipping whitespace and comments.
+
+    String literals (including ``E''`` and dollar-quoted ones) and quoted identifiers are
+    single tokens, so nothing inside them is mistaken for a keyword. A block comment ends at
+    its first ``*/``: Postgres nests them, so this can only expose more text to the checks,
+    never hide any. Raises :class:`UnsafeQueryError` on unterminated strings or comments.
+    """
+    for match in _SQL_TOKEN.finditer(sql):
+        kind = match.lastgroup
+        if kind in _SKIPPED:
+            continue
+        if kind == "error":
+            raise UnsafeQueryError(f"Security Error: Could not parse the query near position {match.start()} "
+                                   "(unterminated string, identifier or comment).")
+        yield SqlToken("string" if kind in _STRINGS else kind, match.group(0), match.start())
+
+
+class SqlValidator:
+    """Accepts only a single statement starting with one of ``allowed_statements``.
+
+    Every unquoted word is compared against ``forbidden_keywords``, which catches
+    data-modifying CTEs (``WITH d AS (DELETE ...)``) and ``SELECT ... INTO``, while column
+    names such as ``created_at`` and literals such as ``'update'`` pass.
+    """
+
+    def __init__(self, allowed_statements: Iterable[str] = ("SELECT", "WITH"),
+                 forbidden_keywords: Iterable[str] = ()):
+        self.allowed_statements = frozenset(word.upper() for word in allowed_statements)
+        self.forbidden_keywords = frozenset(word.upper() for word in forbidden_keywords)
+
+    def check(self, sql: str) -> None:
+        """Raises :class:`UnsafeQueryError` unless ``sql`` is a single read-only statement."""
+        tokens = list(tokenize_sql(sql))
+        while tokens and tokens[-1].kind == "semicolon":
+            tokens.pop()
+        if not tokens:
+            raise UnsafeQueryError("Security Error: The query is empty.")
+        if any(token.kind == "semicolon" for token in tokens):
+            raise UnsafeQueryError("Security Error: Only a single SQL statement is permitted.")
+
+        first = next((token for token in tokens if token.value != "("), tokens[0])
+        if first.kind != "word" or first.value.upper() not in self.allowed_statements:
+            raise UnsafeQueryError(
+                f"Security Error: Only read-only {'/'.join(sorted(self.allowed_statements))} queries "
+                f"are permitted (the query starts with '{first.value}').")
+        for token in tokens:
+            if token.kind == "word" and token.value.upper() in self.forbidden_keywords:
+                raise UnsafeQueryError(
+                    f"Security Error: Only read-only SELECT queries are permitted "
+                    f"('{token.value.upper()}' is not allowed).")
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+# File: tests/test_answer_renderer.py
+# Description: Number formatting of locally rendered answers.
+#
+# Usage (from src/):
+#   python -m pytest tests
+
+from services.answer_renderer import AnswerRenderer
+
+
+def test_identifier_columns_are_not_grouped():
+    renderer = AnswerRenderer()
+    row = '{"columns":["order_id","year","zip_code","total_orders","number_of_orders"],' \
+          '"rows":[[10045,2024,90210,12500,1500]]}'
+    answer = renderer.render(row, "Show the latest order")
+    assert "**order id**: 10045" in answer
+    assert "**year**: 2024" in answer
+    assert "**zip code**: 90210" in answer
+    assert "**total orders**: 12,500" in answer
+    assert "**number of orders**: 1,500" in answer
+
+
+def test_scalar_measures_and_small_numbers():
+    renderer = AnswerRenderer()
+    assert "**12,500**" in renderer.render('{"columns":["count"],"rows":[[12500]]}', "How many orders?")
+    assert "**2024**" in renderer.render('{"columns":["ano"],"rows":[[2024]]}', "Qual o ano do pedido mais recente?")
+    assert "**0.0012**" in renderer.render('{"columns":["rate"],"rows":[[0.0012]]}', "What is the rate?")
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+# File: tests/test_model_cascade.py
+# Description: Escalation checks of the data analyst cascade on the tool results agno actually stores.
+#
+# Usage (from src/):
+#   python -m pytest tests
+
+from types import SimpleNamespace
+
+from agents.model_cascade import escalation_reason
+from tools.database_tools import run_read_only_query
+
+
+def _run(result, content="The answer is 42."):
+    # agno keeps str() of the tool's return value in ToolExecution.result.
+    tool = SimpleNamespace(tool_name="execute_sql_query", tool_call_error=False, result=str(result))
+    return SimpleNamespace(content=content, tools=[tool])
+
+
+def test_failed_query_escalates():
+    # Fails whether or not a database is reachable: connection refused or missing relation.
+    result = run_read_only_query("SELECT * FROM cascade_test_missing_table")
+    assert isinstance(result, list) and "error" in result[0]
+    assert escalation_reason(_run(result)) == "sql_error"
+
+
+def test_successful_and_empty_results():
+    rows = '{"columns":["count"],"rows":[[3]]}'
+    assert escalation_reason(_run(rows)) is None
+    empty = '{"columns":["count"],"rows":[]}'
+    assert escalation_reason(_run(empty)) is None
+    assert escalation_reason(_run(empty), escalate_on_empty=True) == "empty_result"
+
+
+def test_catalog_tool_errors_escalate():
+    assert escalation_reason(_run(["Database error: connection refused"])) == "sql_error"
+    assert escalation_reason(_run("Error: Table 'public.x' not found.")) == "sql_error"
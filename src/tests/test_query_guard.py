@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+# File: tests/test_query_guard.py
+# Description: LIMIT rewriting of queries above the row guardrail.
+#
+# Usage (from src/):
+#   python -m pytest tests
+
+from services.query_guard import QueryGuard, strip_statement_end
+
+
+class PlanStub(QueryGuard):
+    """Plans every query as too many rows unless the guardrail already limited it."""
+
+    @staticmethod
+    def explain(conn, query):
+        limited = "guardrail_limited" in query
+        return {"Node Type": "Seq Scan", "Total Cost": 10.0, "Plan Rows": 10 if limited else 10_000_000}
+
+
+def test_limit_wraps_a_query_ending_in_a_comment():
+    query = "SELECT * FROM orders -- every order\n;  -- done\n"
+    check = PlanStub(limit_rows=50).check(None, query)
+    assert check.rewritten
+    assert check.query == "SELECT * FROM (\nSELECT * FROM orders\n) AS guardrail_limited LIMIT 50"
+
+
+def test_strip_statement_end_keeps_quoted_text():
+    assert strip_statement_end("SELECT ';' AS a, '--' AS b; /* end */") == "SELECT ';' AS a, '--' AS b"
+    assert strip_statement_end('SELECT 1 AS "x;" ;;') == 'SELECT 1 AS "x;"'
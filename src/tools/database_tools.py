@@ -2,106 +2,757 @@
 # File: tools/database_tools.py
 # Description: Object-oriented, clean tools for database interaction.
 
+import contextvars
+import json
 import logging
+import threading
+import time
+import uuid
+from collections import deque
 from contextlib import contextmanager
-from typing import Any, Dict, List, Iterator
+from typing import Any, Deque, Dict, List, Iterator, Sequence, Tuple
 
 import psycopg2
+import psycopg2.pool
 from psycopg2.extras import DictCursor
 from agno.tools import tool
 
-from config.database import DB_CONFIG
+from config.database import (DB_CONFIG, DB_ENDPOINTS, ROUTING_CONFIG, DATABASES, POOL_CONFIG,
+                             CATALOG_CACHE_CONFIG, QUERY_LIMITS_CONFIG, QUERY_GUARDRAILS_CONFIG)
+from config.security import SQL_VALIDATION_CONFIG
+from services.query_guard import QueryGuard, QueryRejected
+from services.result_set import ResultSet, ResultSetBuilder
+from services.schema_catalog import SchemaCatalog
+from services.tracing import annotate, metrics, traced
+from services.validation import SqlValidator
+
+
+class ConnectionPool:
+    """A thread-safe pool of reusable PostgreSQL connections.
+
+    Connections are opened lazily up to ``max_size``. Callers block (up to
+    ``checkout_timeout`` seconds) once the pool is exhausted instead of opening
+    extra connections, which keeps us well below the server's ``max_connections``.
+    """
+
+    def __init__(self, db_config: Dict[str, Any], min_size: int = 1, max_size: int = 10,
+                 checkout_timeout: float = 30.0, max_idle_seconds: float = 300.0,
+                 max_lifetime_seconds: float = 3600.0, health_check_after: float = 30.0):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(
+                f"Invalid pool size: min_size={min_size}, max_size={max_size}")
+        self._db_config = db_config
+        self.min_size = min_size
+        self.max_size = max_size
+        self.checkout_timeout = checkout_timeout
+        self.max_idle_seconds = max_idle_seconds
+        self.max_lifetime_seconds = max_lifetime_seconds
+        self.health_check_after = health_check_after
+
+        self._lock = threading.Condition()
+        # Each idle entry is (connection, created_at, last_used_at).
+        self._idle: Deque[Tuple[Any, float, float]] = deque()
+        self._created_at: Dict[int, float] = {}
+        self._size = 0
+        self._closed = False
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "timeouts": 0,
+            "connections_created": 0,
+            "connections_discarded": 0,
+            "health_check_failures": 0,
+        }
+
+    def _connect(self) -> psycopg2.extensions.connection:
+        """Opens a new physical connection."""
+        conn = psycopg2.connect(**self._db_config, cursor_factory=DictCursor)
+        with self._lock:
+            self._created_at[id(conn)] = time.monotonic()
+            self._stats["connections_created"] += 1
+        return conn
+
+    def _discard(self, conn: psycopg2.extensions.connection) -> None:
+        """Closes a connection and frees its slot. Must be called without the lock."""
+        try:
+            if not conn.closed:
+                conn.close()
+        except psycopg2.Error:
+            pass
+        with self._lock:
+            self._created_at.pop(id(conn), None)
+            self._size -= 1
+            self._stats["connections_discarded"] += 1
+            self._lock.notify()
+
+    def _is_healthy(self, conn: psycopg2.extensions.connection, idle_for: float) -> bool:
+        """Cheap liveness check; only round-trips when the connection sat idle for a while."""
+        if conn.closed:
+            return False
+        if idle_for < self.health_check_after:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def warm_up(self) -> None:
+        """Opens ``min_size`` connections ahead of the first request."""
+        while True:
+            with self._lock:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn = self._connect()
+            except psycopg2.Error:
+                with self._lock:
+                    self._size -= 1
+                    self._lock.notify()
+                raise
+            now = time.monotonic()
+            with self._lock:
+                self._idle.append((conn, self._created_at[id(conn)], now))
+                self._lock.notify()
+
+    def acquire(self) -> psycopg2.extensions.connection:
+        """Checks out a healthy connection, opening or waiting for one as needed."""
+        deadline = time.monotonic() + self.checkout_timeout
+        waited = False
+        wait_started = 0.0
+        while True:
+            candidate = None
+            open_new = False
+            with self._lock:
+                if self._closed:
+                    raise psycopg2.pool.PoolError("Connection pool is closed.")
+                if self._idle:
+                    candidate = self._idle.pop()  # LIFO keeps hot connections hot.
+                elif self._size < self.max_size:
+                    self._size += 1
+                    open_new = True
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise psycopg2.pool.PoolError(
+                            f"Timed out after {self.checkout_timeout}s waiting for a database connection.")
+                    if not waited:
+                        waited = True
+                        wait_started = time.monotonic()
+                        self._stats["waits"] += 1
+                    self._lock.wait(remaining)
+                    continue
+
+            if open_new:
+                try:
+                    conn = self._connect()
+                except psycopg2.Error:
+                    with self._lock:
+                        self._size -= 1
+                        self._lock.notify()
+                    raise
+                break
+
+            conn, created_at, last_used = candidate
+            now = time.monotonic()
+            if now - created_at > self.max_lifetime_seconds:
+                self._discard(conn)
+                continue
+            if not self._is_healthy(conn, now - last_used):
+                with self._lock:
+                    self._stats["health_check_failures"] += 1
+                self._discard(conn)
+                continue
+            break
+
+        with self._lock:
+            self._stats["checkouts"] += 1
+            if waited:
+                wait_time = time.monotonic() - wait_started
+                self._stats["wait_time_total"] += wait_time
+                self._stats["wait_time_max"] = max(
+                    self._stats["wait_time_max"], wait_time)
+        return conn
+
+    def release(self, conn: psycopg2.extensions.connection, discard: bool = False) -> None:
+        """Returns a connection to the pool, resetting any open transaction."""
+        if not discard and not conn.closed:
+            try:
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                discard = True
+        if discard or conn.closed:
+            self._discard(conn)
+            return
+
+        with self._lock:
+            if self._closed:
+                closing = True
+            else:
+                closing = False
+                self._idle.append(
+                    (conn, self._created_at.get(id(conn), time.monotonic()), time.monotonic()))
+                self._lock.notify()
+        if closing:
+            self._discard(conn)
+            return
+        self.recycle_idle()
+
+    def recycle_idle(self) -> int:
+        """Closes connections idle for longer than ``max_idle_seconds``, keeping ``min_size``."""
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            # The left end of the deque holds the least recently used connections.
+            while (self._idle and self._size - len(expired) > self.min_size
+                   and now - self._idle[0][2] > self.max_idle_seconds):
+                expired.append(self._idle.popleft()[0])
+        for conn in expired:
+            self._discard(conn)
+        return len(expired)
+
+    def close_all(self) -> None:
+        """Closes every idle connection and refuses further checkouts."""
+        with self._lock:
+            self._closed = True
+            idle = [entry[0] for entry in self._idle]
+            self._idle.clear()
+            self._lock.notify_all()
+        for conn in idle:
+            self._discard(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns a snapshot of pool usage counters."""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot.update(
+                size=self._size,
+                idle=len(self._idle),
+                in_use=self._size - len(self._idle),
+                min_size=self.min_size,
+                max_size=self.max_size,
+            )
+        checkouts = snapshot["checkouts"]
+        snapshot["wait_time_avg"] = snapshot["wait_time_total"] / \
+            snapshot["waits"] if snapshot["waits"] else 0.0
+        snapshot["wait_ratio"] = snapshot["waits"] / \
+            checkouts if checkouts else 0.0
+        return snapshot
+
+
+_REPLICATION_LAG_QUERY = (
+    "SELECT CASE WHEN NOT pg_is_in_recovery() "
+    "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END AS lag;"
+)
+
+_current_database: contextvars.ContextVar[str | None] = contextvars.ContextVar(
+    "current_database", default=None)
+
+
+@contextmanager
+def use_database(name: str | None) -> Iterator[None]:
+    """Routes every connection opened in this context (thread/task) to the named database."""
+    token = _current_database.set(name)
+    try:
+        yield
+    finally:
+        _current_database.reset(token)
+
+
+def current_database() -> str | None:
+    """The database name selected with :func:`use_database`, if any."""
+    return _current_database.get()
+
+
+class Endpoint:
+    """One server of the cluster, with a lazily created pool per database it serves."""
+
+    def __init__(self, name: str, role: str, db_config: Dict[str, Any], pool_config: Dict[str, Any],
+                 weight: float = 1.0):
+        if role not in ("primary", "replica"):
+            raise ValueError(
+                f"Unknown role '{role}' for endpoint '{name}'. Expected 'primary' or 'replica'.")
+        self.name = name
+        self.role = role
+        self.weight = weight
+        self._db_config = db_config
+        self._pool_config = pool_config
+        self._pools: Dict[str, ConnectionPool] = {}
+        self._lock = threading.Lock()
+        self.down_until = 0.0
+        self.lag_seconds: float | None = None
+        self.lag_checked_at = 0.0
+        self.lag_lock = threading.Lock()
+
+    def config_for(self, dbname: str) -> Dict[str, Any]:
+        return {**self._db_config, "dbname": dbname}
+
+    def pool(self, dbname: str) -> ConnectionPool:
+        with self._lock:
+            pool = self._pools.get(dbname)
+            if pool is None:
+                pool = ConnectionPool(self.config_for(dbname), **self._pool_config)
+                self._pools[dbname] = pool
+            return pool
+
+    def pools(self) -> Dict[str, ConnectionPool]:
+        with self._lock:
+            return dict(self._pools)
+
+    def drop_pools(self) -> None:
+        """Forgets every pool without touching its connections; new pools are created on next use."""
+        self._lock = threading.Lock()
+        self._pools = {}
+
+    def is_available(self, now: float) -> bool:
+        return now >= self.down_until
+
+    def load(self, dbname: str) -> float:
+        """In-use connections per unit of weight; lower is less busy."""
+        pool = self.pools().get(dbname)
+        return (pool.stats()["in_use"] if pool else 0) / self.weight
 
 
 class DatabaseManager:
-    """Manages the lifecycle of the database connection."""
+    """Routes pooled connections to the primary or to healthy, up-to-date replicas.
+
+    Writes and primary-only reads use the ``primary`` endpoint. Read-only callers
+    (``read_only=True``) are balanced over replicas whose replication lag is within
+    ``max_replication_lag_seconds``, falling back to the primary. An endpoint that fails to
+    connect is skipped for ``failure_backoff_seconds`` and the next candidate is tried.
+    Each endpoint keeps one pool per database, so :func:`use_database` can select a tenant
+    database per request.
+    """
 
-    def __init__(self, db_config: Dict[str, Any]):
+    def __init__(self, db_config: Dict[str, Any], pool_config: Dict[str, Any] | None = None,
+                 endpoints: List[Dict[str, Any]] | None = None, routing: Dict[str, Any] | None = None,
+                 databases: Dict[str, str] | None = None):
         self._db_config = db_config
-        self._connection = None
+        routing = routing or {}
+        self.read_from_replicas = routing.get("read_from_replicas", True)
+        self.max_replication_lag = routing.get("max_replication_lag_seconds", 10.0)
+        self.lag_check_interval = routing.get("lag_check_interval", 5.0)
+        self.failure_backoff = routing.get("failure_backoff_seconds", 30.0)
+        self.fallback_to_primary = routing.get("fallback_to_primary", True)
+        self.databases = dict(databases or {})
+        self._stats = {"primary_reads": 0, "replica_reads": 0, "failovers": 0, "lagging_skips": 0}
+        self._stats_lock = threading.Lock()
+
+        self.endpoints: List[Endpoint] = []
+        for spec in endpoints or [{"name": "primary", "role": "primary"}]:
+            spec = dict(spec)
+            name = spec.pop("name", spec.get("host", "primary"))
+            role = spec.pop("role", "primary")
+            weight = spec.pop("weight", 1.0)
+            endpoint_pool = {**(pool_config or {}), **spec.pop("pool", {})}
+            self.endpoints.append(Endpoint(name, role, {**db_config, **spec}, endpoint_pool, weight))
+        primaries = [e for e in self.endpoints if e.role == "primary"]
+        if len(primaries) != 1:
+            raise ValueError(
+                f"Expected exactly one primary endpoint, found {len(primaries)}.")
+        self.primary = primaries[0]
+        self.replicas = [e for e in self.endpoints if e.role == "replica"]
+
+    @property
+    def pool(self) -> ConnectionPool:
+        """The primary's pool for the default database."""
+        return self.primary.pool(self._db_config["dbname"])
+
+    def _resolve_database(self, database: str | None) -> str:
+        name = database or _current_database.get()
+        if name is None:
+            return self._db_config["dbname"]
+        if name not in self.databases:
+            raise ValueError(
+                f"Unknown database '{name}'. Configured databases: {sorted(self.databases)}.")
+        return self.databases[name]
+
+    def _count(self, key: str) -> None:
+        with self._stats_lock:
+            self._stats[key] += 1
+
+    def _replication_lag(self, endpoint: Endpoint, dbname: str) -> float | None:
+        """The replica's lag in seconds, re-probed at most every ``lag_check_interval``."""
+        now = time.monotonic()
+        if now - endpoint.lag_checked_at < self.lag_check_interval:
+            return endpoint.lag_seconds
+        # Only one caller probes; the others keep using the last known value.
+        if not endpoint.lag_lock.acquire(blocking=False):
+            return endpoint.lag_seconds
+        try:
+            pool = endpoint.pool(dbname)
+            conn = pool.acquire()
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute(_REPLICATION_LAG_QUERY)
+                    endpoint.lag_seconds = float(cursor.fetchone()[0])
+            finally:
+                pool.release(conn)
+        except psycopg2.Error as e:
+            logging.warning(f"Replication lag check failed on '{endpoint.name}': {e}")
+            endpoint.lag_seconds = None
+            endpoint.down_until = now + self.failure_backoff
+        finally:
+            endpoint.lag_checked_at = now
+            endpoint.lag_lock.release()
+        return endpoint.lag_seconds
+
+    def _candidates(self, read_only: bool, dbname: str) -> List[Endpoint]:
+        """Endpoints to try, best first."""
+        if not read_only or not self.read_from_replicas or not self.replicas:
+            return [self.primary]
+        now = time.monotonic()
+        replicas = []
+        for replica in self.replicas:
+            if not replica.is_available(now):
+                continue
+            lag = self._replication_lag(replica, dbname)
+            if lag is None or lag > self.max_replication_lag:
+                self._count("lagging_skips")
+                continue
+            replicas.append(replica)
+        replicas.sort(key=lambda endpoint: endpoint.load(dbname))
+        return replicas + [self.primary] if self.fallback_to_primary or not replicas else replicas
 
     @contextmanager
-    def get_connection(self) -> Iterator[psycopg2.extensions.connection]:
-        """Provides a database connection as a context manager."""
+    def get_connection(self, read_only: bool = False,
+                       database: str | None = None) -> Iterator[psycopg2.extensions.connection]:
+        """Provides a pooled database connection as a context manager.
+
+        Each caller gets its own connection, so concurrent tool calls never share a handle.
+        The connection is returned to the pool (with any open transaction rolled back) on exit.
+        ``read_only`` callers may be served by a replica; ``database`` (or the current
+        :func:`use_database`) selects a configured tenant database.
+        """
+        dbname = self._resolve_database(database)
+        candidates = self._candidates(read_only, dbname)
+        conn, pool, last_error = None, None, None
+        for endpoint in candidates:
+            pool = endpoint.pool(dbname)
+            try:
+                conn = pool.acquire()
+                break
+            except psycopg2.Error as e:
+                last_error = e
+                if isinstance(e, psycopg2.OperationalError):
+                    endpoint.down_until = time.monotonic() + self.failure_backoff
+                if endpoint is not candidates[-1]:
+                    self._count("failovers")
+                    logging.warning(f"Endpoint '{endpoint.name}' unavailable ({e}); failing over.")
+        if conn is None:
+            logging.error(f"Database connection error: {last_error}")
+            raise last_error
+        if read_only:
+            self._count("replica_reads" if endpoint.role == "replica" else "primary_reads")
+
+        discard = False
         try:
-            self._connection = psycopg2.connect(
-                **self._db_config, cursor_factory=DictCursor)
-            yield self._connection
+            yield conn
         except psycopg2.Error as e:
             logging.error(f"Database connection error: {e}")
+            # Broken connections must not go back into the pool; recoverable errors
+            # (e.g. a cancelled statement) are cleaned up by the rollback in release().
+            discard = bool(conn.closed) or isinstance(e, psycopg2.InterfaceError)
             raise
         finally:
-            if self._connection:
-                self._connection.close()
-                self._connection = None
+            pool.release(conn, discard=discard)
+
+    def open_dedicated_connection(self, database: str | None = None) -> psycopg2.extensions.connection:
+        """Opens a primary connection outside the pool for long-lived sessions (e.g. LISTEN)."""
+        return psycopg2.connect(**self.primary.config_for(self._resolve_database(database)),
+                                cursor_factory=DictCursor)
+
+    def warm_up(self) -> None:
+        """Opens the minimum number of connections of every endpoint's default-database pool."""
+        for endpoint in self.endpoints:
+            try:
+                endpoint.pool(self._db_config["dbname"]).warm_up()
+            except psycopg2.Error as e:
+                if endpoint is self.primary:
+                    raise
+                logging.warning(f"Could not warm up replica '{endpoint.name}': {e}")
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Returns pool statistics summed over every endpoint and database, plus routing counters."""
+        totals: Dict[str, Any] = {}
+        for endpoint in self.endpoints:
+            for pool in endpoint.pools().values():
+                for key, value in pool.stats().items():
+                    if key == "wait_time_max":
+                        totals[key] = max(totals.get(key, 0.0), value)
+                    elif isinstance(value, (int, float)):
+                        totals[key] = totals.get(key, 0) + value
+        waits, checkouts = totals.get("waits", 0), totals.get("checkouts", 0)
+        totals["wait_time_avg"] = totals.get("wait_time_total", 0.0) / waits if waits else 0.0
+        totals["wait_ratio"] = waits / checkouts if checkouts else 0.0
+        with self._stats_lock:
+            totals.update(self._stats)
+        return totals
+
+    def endpoint_stats(self) -> List[Dict[str, Any]]:
+        """Per-endpoint role, availability, replication lag and pool statistics."""
+        now = time.monotonic()
+        return [{"name": e.name, "role": e.role, "weight": e.weight, "available": e.is_available(now),
+                 "lag_seconds": e.lag_seconds,
+                 "pools": {dbname: pool.stats() for dbname, pool in e.pools().items()}}
+                for e in self.endpoints]
+
+    def close(self) -> None:
+        """Closes all pooled connections."""
+        for endpoint in self.endpoints:
+            for pool in endpoint.pools().values():
+                pool.close_all()
+
+    def reset_after_fork(self) -> None:
+        """Starts with fresh pools in a forked worker process.
+
+        Connections must not be shared across processes, so the parent closes its own before
+        forking (see :meth:`close`) and each worker opens new ones, starting with
+        :meth:`warm_up`.
+        """
+        for endpoint in self.endpoints:
+            endpoint.drop_pools()
+            endpoint.lag_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
 
 
 # Create a single instance of the manager to be used by all tools.
-db_manager = DatabaseManager(DB_CONFIG)
+db_manager = DatabaseManager(DB_CONFIG, POOL_CONFIG, endpoints=DB_ENDPOINTS, routing=ROUTING_CONFIG,
+                             databases=DATABASES)
+
+# Shared catalog cache serving the exploration tools from memory.
+schema_catalog = SchemaCatalog(db_manager, **CATALOG_CACHE_CONFIG)
+schema_catalog.start_listener()
+
+# Catalogs of the other DATABASES, created on first use.
+_database_catalogs: Dict[str, SchemaCatalog] = {}
+_database_catalogs_lock = threading.Lock()
+
+
+def get_schema_catalog(database: str | None = None) -> SchemaCatalog:
+    """The catalog of ``database`` (default: the one selected with :func:`use_database`)."""
+    name = database or current_database()
+    if name is None:
+        return schema_catalog
+    with _database_catalogs_lock:
+        catalog = _database_catalogs.get(name)
+        if catalog is None:
+            catalog = SchemaCatalog(db_manager, **CATALOG_CACHE_CONFIG, database=name)
+            catalog.start_listener()
+            _database_catalogs[name] = catalog
+        return catalog
+
+# Token-based SELECT/WITH-only check for agent-written SQL.
+sql_validator = SqlValidator(**SQL_VALIDATION_CONFIG)
+
+# EXPLAIN-based cost checks for agent-written SQL.
+query_guard = QueryGuard(**QUERY_GUARDRAILS_CONFIG)
+
+metrics.register_collector("db_pool", db_manager.pool_stats)
+metrics.register_collector("schema_catalog", schema_catalog.stats)
+metrics.register_collector("query_guard", query_guard.stats)
 
 
 @tool
+@traced("tool.list_available_schemas")
 def list_available_schemas() -> List[str]:
     """Lists all non-system schemas available in the database."""
     logging.info("Executing list_available_schemas")
-    query = "SELECT schema_name FROM information_schema.schemata WHERE schema_name NOT IN ('pg_catalog', 'information_schema', 'pg_toast');"
     try:
-        with db_manager.get_connection() as conn:
-            with conn.cursor() as cursor:
-                cursor.execute(query)
-                return [row['schema_name'] for row in cursor.fetchall()]
+        return get_schema_catalog().list_schemas()
     except psycopg2.Error as e:
         return [f"Database error: {e}"]
 
 
 @tool
+@traced("tool.list_tables_in_schema")
 def list_tables_in_schema(schema_name: str = "public") -> List[str]:
     """Lists all available tables within a specific schema."""
     logging.info(f"Executing list_tables_in_schema for schema: {schema_name}")
-    query = "SELECT table_name FROM information_schema.tables WHERE table_schema = %s ORDER BY table_name;"
     try:
-        with db_manager.get_connection() as conn:
-            with conn.cursor() as cursor:
-                cursor.execute(query, (schema_name,))
-                return [row['table_name'] for row in cursor.fetchall()]
+        return get_schema_catalog().list_tables(schema_name)
     except psycopg2.Error as e:
         return [f"Database error: {e}"]
 
 
 @tool
+@traced("tool.fetch_table_schema")
 def fetch_table_schema(table_name: str, schema: str = "public") -> str:
     """Fetches the schema (columns and data types) for a specific table."""
     logging.info(f"Executing fetch_table_schema for: {schema}.{table_name}")
-    query = "SELECT column_name, data_type FROM information_schema.columns WHERE table_schema = %s AND table_name = %s ORDER BY ordinal_position;"
     try:
-        with db_manager.get_connection() as conn:
-            with conn.cursor() as cursor:
-                cursor.execute(query, (schema, table_name))
-                schema_info = cursor.fetchall()
+        schema_info = get_schema_catalog().get_columns(table_name, schema)
 
         if not schema_info:
             return f"Error: Table '{schema}.{table_name}' not found."
 
-        return "\n".join(f"- {col['column_name']} ({col['data_type']})" for col in schema_info)
+        return "\n".join(f"- {column_name} ({data_type})" for column_name, data_type in schema_info)
     except psycopg2.Error as e:
         return f"Database error: {e}"
 
 
 @tool
-def execute_sql_query(query: str) -> List[Dict[str, Any]]:
-    """Executes a final, read-only SQL SELECT query and returns the results."""
+@traced("tool.fetch_table_schemas")
+def fetch_table_schemas(table_names: List[str], schema: str = "public") -> str:
+    """Fetches the columns, data types, primary keys and foreign keys of several tables in one call."""
+    logging.info(f"Executing fetch_table_schemas for: {schema}.{table_names}")
+    try:
+        descriptions = get_schema_catalog().describe_tables(table_names, schema)
+        found = {description.split("(", 1)[0] for description in descriptions}
+        missing = [table for table in table_names if f"{schema}.{table}" not in found]
+        lines = list(descriptions)
+        lines.extend(f"Error: Table '{schema}.{table}' not found." for table in missing)
+        return "\n".join(lines)
+    except psycopg2.Error as e:
+        return f"Database error: {e}"
+
+
+def _estimate_row_bytes(row: Sequence[Any]) -> int:
+    """Approximates the compact JSON size of a row (column names are sent once, in the header)."""
+    return sum(len(str(value)) + 1 for value in row) + 2
+
+
+def _estimate_total_rows(conn: psycopg2.extensions.connection, query: str) -> int | None:
+    """Asks the planner for the estimated row count of a query."""
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {query}")
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+    except (psycopg2.Error, KeyError, IndexError, TypeError, ValueError) as e:
+        logging.warning(f"Could not estimate total rows: {e}")
+        return None
+
+
+def begin_read_only(conn: psycopg2.extensions.connection, statement_timeout_ms: int, work_mem: str) -> None:
+    """Makes the current transaction read-only and bounds its runtime and sort/hash memory.
+
+    Must run before any other statement of the transaction. The settings only last for this
+    transaction; the pool rolls it back on release.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("SET TRANSACTION READ ONLY; SET LOCAL statement_timeout = %s; SET LOCAL work_mem = %s",
+                       (int(statement_timeout_ms), work_mem))
+
+
+def fetch_bounded(conn: psycopg2.extensions.connection, query: str, max_rows: int, max_bytes: int,
+                  batch_size: int, total_estimate: int | None = None) -> ResultSet:
+    """Streams a query through a server-side cursor into a :class:`ResultSet`.
+
+    Fetching stops at the row or byte budget; the result is then flagged ``truncated`` and
+    carries ``total_estimate``, the planner's estimate for the full result (asked for only when
+    the caller does not already know it).
+    """
+    used_bytes = 0
+    truncated = False
+    with conn.cursor(name=f"execute_sql_query_{uuid.uuid4().hex}") as cursor:
+        cursor.itersize = batch_size
+        cursor.execute(query)
+        builder = None
+        while not truncated:
+            batch = cursor.fetchmany(batch_size)
+            if builder is None:
+                # Named cursors only describe their columns after the first fetch.
+                builder = ResultSetBuilder([column[0] for column in cursor.description or []])
+            if not batch:
+                break
+            fits = 0
+            for row in batch:
+                row_bytes = _estimate_row_bytes(row)
+                if builder.row_count + fits >= max_rows or used_bytes + row_bytes > max_bytes:
+                    truncated = True
+                    break
+                fits += 1
+                used_bytes += row_bytes
+            builder.extend(batch[:fits])
+
+    annotate(rows=builder.row_count, bytes=used_bytes, truncated=truncated)
+    if not truncated:
+        return builder.build()
+
+    logging.warning(
+        f"Query result truncated at {builder.row_count} rows (~{used_bytes} bytes).")
+    return builder.build(
+        truncated=True,
+        total_estimate=total_estimate if total_estimate is not None else _estimate_total_rows(conn, query),
+    )
+
+
+@traced("db.query")
+def run_read_only_query(query: str) -> ResultSet | List[Dict[str, str]]:
+    """Validates and runs a read-only query; the plain-Python core of ``execute_sql_query``."""
     logging.info(f"Executing SQL query: {query}")
-    forbidden_keywords = ['INSERT', 'UPDATE', 'DELETE',
-                          'DROP', 'CREATE', 'ALTER', 'TRUNCATE', 'GRANT', 'REVOKE']
-    if any(keyword in query.upper() for keyword in forbidden_keywords):
-        raise ValueError(
-            "Security Error: Only read-only SELECT queries are permitted.")
+    sql_validator.check(query)
 
+    limits = QUERY_LIMITS_CONFIG
     try:
-        with db_manager.get_connection() as conn:
-            with conn.cursor() as cursor:
-                cursor.execute(query)
-                return [dict(row) for row in cursor.fetchall()]
+        with db_manager.get_connection(read_only=True) as conn:
+            begin_read_only(conn, limits["statement_timeout_ms"], limits["work_mem"])
+            check = query_guard.check(conn, query.strip().rstrip(";"))
+            annotate(plan_cost=check.total_cost, plan_rows=check.plan_rows, rewritten=check.rewritten)
+            started = time.perf_counter()
+            result = fetch_bounded(conn, check.query, limits["max_rows"], limits["max_bytes"],
+                                   limits["batch_size"], total_estimate=check.plan_rows)
+            query_guard.record(check, time.perf_counter() - started, len(result))
+    except QueryRejected as e:
+        logging.warning(str(e))
+        return [{"error": str(e)}]
     except psycopg2.Error as e:
         logging.error(f"Error executing SQL query: {e}")
         return [{"error": f"Error executing SQL query: {e}"}]
+
+    if not check.rewritten:
+        return result
+    # Tell the agent its result was cut by the guardrail, not by the data.
+    if not result.truncated:
+        if len(result) < query_guard.limit_rows:
+            return result
+        result.truncated, result.total_estimate = True, check.plan_rows
+    result.note = check.note
+    return result
+
+
+def table_change_counters(table_names: List[str]) -> Dict[str, int]:
+    """Returns a per-table write counter from ``pg_stat_user_tables``; it grows whenever rows change.
+
+    Names are ``schema.table`` (as returned by ``SchemaCatalog.referenced_tables``); a bare
+    name counts the tables of that name in the connection's search path.
+    """
+    if not table_names:
+        return {}
+    schemas = [name.split(".", 1)[0] if "." in name else None for name in table_names]
+    tables = [name.split(".", 1)[-1] for name in table_names]
+    # Inserted, updated and deleted rows only: n_live_tup would cancel out every DELETE.
+    query = (
+        "SELECT t.name, COALESCE(sum(s.n_tup_ins + s.n_tup_upd + s.n_tup_del), 0) AS changes "
+        "FROM unnest(%s::text[], %s::text[], %s::text[]) AS t(name, schemaname, relname) "
+        "JOIN pg_stat_user_tables s ON s.relname = t.relname "
+        "AND (s.schemaname = t.schemaname OR (t.schemaname IS NULL AND s.schemaname = ANY(current_schemas(false)))) "
+        "GROUP BY t.name;"
+    )
+    # Standbys do not track write counters, so this always reads the primary.
+    with db_manager.get_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(query, (list(table_names), schemas, tables))
+            return {row["name"]: int(row["changes"]) for row in cursor.fetchall()}
+
+
+@tool
+@traced("tool.execute_sql_query")
+def execute_sql_query(query: str) -> ResultSet | List[Dict[str, str]]:
+    """Executes a final, read-only SQL SELECT query and returns the results.
+
+    Results come back as compact JSON: ``{"columns": [...], "rows": [[...], ...]}``. Large
+    results are truncated to a row/byte budget and flagged with ``"truncated": true``.
+    """
+    return run_read_only_query(query)